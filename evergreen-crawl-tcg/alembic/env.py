@@ -1,29 +1,31 @@
+import os
+import sys
 from logging.config import fileConfig
 
-from sqlalchemy import engine_from_config
-from sqlalchemy import pool
+from sqlalchemy import engine_from_config, pool
 
 from alembic import context
 
-import sys
-import os
-
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 # Import all models here
+from app.models.battler_card import BattlerCard  # noqa: F401
+from app.models.card_effect import CardEffect  # noqa: F401
 from app.models.database import Base
-from app.models.player import Player
-from app.models.deck import Deck
-from app.models.dungeon import DungeonInstance
-from app.models.battler_card import BattlerCard
-from app.models.tag import Tag
-from app.models.card_effect import CardEffect
-from app.models.shop import Shop, CardPack
+from app.models.deck import Deck  # noqa: F401
+from app.models.dungeon import DungeonInstance  # noqa: F401
+from app.models.player import Player  # noqa: F401
+from app.models.shop import CardPack, Shop  # noqa: F401
+from app.models.tag import Tag  # noqa: F401
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
 
+# DATABASE_URL takes precedence over the URL in alembic.ini
+if os.getenv("DATABASE_URL"):
+    config.set_main_option("sqlalchemy.url", os.environ["DATABASE_URL"])
+
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
 if config.config_file_name is not None:
@@ -0,0 +1,47 @@
+"""add dungeon path
+
+Revision ID: 3c1f0a9d52e4
+Revises: e7b94762ea5a
+Create Date: 2026-10-18 11:02:17.730164
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '3c1f0a9d52e4'
+down_revision: Union[str, None] = 'e7b94762ea5a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'dungeon_instances', sa.Column('path', sa.LargeBinary(), nullable=True)
+    )
+
+    # Existing dungeons start their path at the current position (revision 0)
+    dungeons = sa.table(
+        'dungeon_instances',
+        sa.column('id', sa.Integer()),
+        sa.column('current_position', sa.Integer()),
+        sa.column('path', sa.LargeBinary()),
+    )
+    connection = op.get_bind()
+    rows = connection.execute(
+        sa.select(dungeons.c.id, dungeons.c.current_position)
+    ).all()
+    for row in rows:
+        connection.execute(
+            dungeons.update()
+            .where(dungeons.c.id == row.id)
+            .values(path=(row.current_position or 0).to_bytes(4, "little"))
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('dungeon_instances') as batch_op:
+        batch_op.drop_column('path')
@@ -0,0 +1,64 @@
+"""sync schema with models
+
+Brings the migration chain in line with the models, which until now were
+only ever materialized by create_all: player level (previously the
+unchained app/migrations/add_player_level.py), deck timestamps and shop
+prices, and drops the unused players.card_collection column.
+
+Revision ID: 9d4e1b7c2a60
+Revises: 3c1f0a9d52e4
+Create Date: 2026-10-18 12:41:09.518203
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '9d4e1b7c2a60'
+down_revision: Union[str, None] = '3c1f0a9d52e4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('players') as batch_op:
+        batch_op.add_column(
+            sa.Column('level', sa.Integer(), nullable=False, server_default='1')
+        )
+        batch_op.drop_column('card_collection')
+
+    op.add_column('decks', sa.Column('created_at', sa.DateTime(), nullable=True))
+
+    op.add_column(
+        'shops',
+        sa.Column(
+            'featured_card_price', sa.Integer(), nullable=True, server_default='100'
+        ),
+    )
+    op.add_column(
+        'shops',
+        sa.Column(
+            'random_card_price', sa.Integer(), nullable=True, server_default='50'
+        ),
+    )
+    op.add_column(
+        'shops',
+        sa.Column('pack_price', sa.Integer(), nullable=True, server_default='150'),
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('shops') as batch_op:
+        batch_op.drop_column('pack_price')
+        batch_op.drop_column('random_card_price')
+        batch_op.drop_column('featured_card_price')
+
+    with op.batch_alter_table('decks') as batch_op:
+        batch_op.drop_column('created_at')
+
+    with op.batch_alter_table('players') as batch_op:
+        batch_op.add_column(sa.Column('card_collection', sa.JSON(), nullable=True))
+        batch_op.drop_column('level')
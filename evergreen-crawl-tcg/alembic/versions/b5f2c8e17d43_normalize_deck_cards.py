@@ -0,0 +1,128 @@
+"""normalize deck cards
+
+Moves deck contents out of the decks.cards JSON blob into a deck_cards
+(deck_id, card_id, quantity) table, so decks are edited row by row and
+their size is summed in SQL.
+
+Revision ID: b5f2c8e17d43
+Revises: 9d4e1b7c2a60
+Create Date: 2026-10-18 15:20:44.102981
+
+"""
+import json
+from collections import Counter
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5f2c8e17d43'
+down_revision: Union[str, None] = '9d4e1b7c2a60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+decks = sa.table(
+    'decks',
+    sa.column('id', sa.Integer()),
+    sa.column('cards', sa.JSON()),
+)
+battler_cards = sa.table(
+    'battler_cards',
+    sa.column('id', sa.Integer()),
+    sa.column('name', sa.String()),
+    sa.column('power_level', sa.Integer()),
+    sa.column('rarity', sa.String()),
+)
+
+
+def _quantities(cards) -> Counter:
+    """Card quantities from any of the JSON shapes decks were saved in"""
+    if isinstance(cards, str):
+        try:
+            cards = json.loads(cards)
+        except json.JSONDecodeError:
+            return Counter()
+    quantities = Counter()
+    for card in cards or []:
+        if isinstance(card, dict) and card.get('id') is not None:
+            quantities[int(card['id'])] += int(card.get('quantity') or 1)
+        elif isinstance(card, int):
+            quantities[card] += 1
+    return quantities
+
+
+def upgrade() -> None:
+    deck_cards = op.create_table(
+        'deck_cards',
+        sa.Column('deck_id', sa.Integer(), nullable=False),
+        sa.Column('card_id', sa.Integer(), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['card_id'], ['battler_cards.id']),
+        sa.ForeignKeyConstraint(['deck_id'], ['decks.id']),
+        sa.PrimaryKeyConstraint('deck_id', 'card_id'),
+    )
+    op.create_index('ix_deck_cards_card_id', 'deck_cards', ['card_id'])
+    op.create_index(
+        'ix_deck_cards_deck_id_quantity', 'deck_cards', ['deck_id', 'quantity']
+    )
+
+    connection = op.get_bind()
+    known = set(connection.execute(sa.select(battler_cards.c.id)).scalars())
+    rows = [
+        {'deck_id': deck.id, 'card_id': card_id, 'quantity': quantity}
+        for deck in connection.execute(sa.select(decks.c.id, decks.c.cards))
+        for card_id, quantity in _quantities(deck.cards).items()
+        if card_id in known
+    ]
+    if rows:
+        op.bulk_insert(deck_cards, rows)
+
+    with op.batch_alter_table('decks') as batch_op:
+        batch_op.drop_column('cards')
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('decks') as batch_op:
+        batch_op.add_column(sa.Column('cards', sa.JSON(), nullable=True))
+
+    deck_cards = sa.table(
+        'deck_cards',
+        sa.column('deck_id', sa.Integer()),
+        sa.column('card_id', sa.Integer()),
+        sa.column('quantity', sa.Integer()),
+    )
+    connection = op.get_bind()
+    rows = connection.execute(
+        sa.select(
+            deck_cards.c.deck_id,
+            deck_cards.c.quantity,
+            battler_cards.c.id,
+            battler_cards.c.name,
+            battler_cards.c.power_level,
+            battler_cards.c.rarity,
+        )
+        .join(battler_cards, battler_cards.c.id == deck_cards.c.card_id)
+        .order_by(deck_cards.c.deck_id, deck_cards.c.card_id)
+    )
+    contents = {}
+    for row in rows:
+        contents.setdefault(row.deck_id, []).append(
+            {
+                'id': row.id,
+                'name': row.name,
+                'power_level': row.power_level,
+                'rarity': row.rarity,
+                'quantity': row.quantity,
+            }
+        )
+    for deck_id, cards in contents.items():
+        connection.execute(
+            decks.update().where(decks.c.id == deck_id).values(cards=cards)
+        )
+
+    op.drop_index('ix_deck_cards_deck_id_quantity', table_name='deck_cards')
+    op.drop_index('ix_deck_cards_card_id', table_name='deck_cards')
+    op.drop_table('deck_cards')
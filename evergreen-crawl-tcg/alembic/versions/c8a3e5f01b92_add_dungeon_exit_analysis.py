@@ -0,0 +1,39 @@
+"""add dungeon exit analysis
+
+Stores each floor's risk-weighted distance field to the exit and the
+cheapest route from the start alongside the layout. Existing dungeons are
+left unanalyzed and get their analysis the first time a route is asked for.
+
+Revision ID: c8a3e5f01b92
+Revises: b5f2c8e17d43
+Create Date: 2026-10-18 18:05:12.417305
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8a3e5f01b92'
+down_revision: Union[str, None] = 'b5f2c8e17d43'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'dungeon_instances',
+        sa.Column('exit_distances', sa.LargeBinary(), nullable=True),
+    )
+    op.add_column(
+        'dungeon_instances',
+        sa.Column('exit_route', sa.LargeBinary(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('dungeon_instances') as batch_op:
+        batch_op.drop_column('exit_route')
+        batch_op.drop_column('exit_distances')
@@ -0,0 +1,165 @@
+"""compact dungeon layout
+
+Revision ID: e7b94762ea5a
+Revises: 84201b4c032d
+Create Date: 2026-10-18 09:12:41.508113
+
+"""
+import json
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7b94762ea5a'
+down_revision: Union[str, None] = '84201b4c032d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Frozen copy of app.models.dungeon.CELL_CODES at the time of this migration
+CELL_CODES = {
+    "empty": 0,
+    "monster": 1,
+    "treasure": 2,
+    "trap": 3,
+    "exit": 4,
+    "merchant": 5,
+    "shrine": 6,
+    "miniboss": 7,
+    "safe": 8,
+}
+CELL_VALUES = {code: value for value, code in CELL_CODES.items()}
+
+
+def _load_legacy(value, default):
+    """Legacy columns hold JSON-encoded strings inside a JSON column"""
+    while isinstance(value, str):
+        value = json.loads(value)
+    return default if value is None else value
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('dungeon_instances') as batch_op:
+        batch_op.add_column(sa.Column('layout_packed', sa.LargeBinary(), nullable=True))
+        batch_op.add_column(
+            sa.Column('visited_packed', sa.LargeBinary(), nullable=True)
+        )
+        batch_op.add_column(sa.Column('position_packed', sa.Integer(), nullable=True))
+
+    dungeons = sa.table(
+        'dungeon_instances',
+        sa.column('id', sa.Integer()),
+        sa.column('grid_size', sa.Integer()),
+        sa.column('layout', sa.JSON()),
+        sa.column('visited_cells', sa.JSON()),
+        sa.column('current_position', sa.JSON()),
+        sa.column('layout_packed', sa.LargeBinary()),
+        sa.column('visited_packed', sa.LargeBinary()),
+        sa.column('position_packed', sa.Integer()),
+    )
+    connection = op.get_bind()
+    rows = connection.execute(
+        sa.select(
+            dungeons.c.id,
+            dungeons.c.grid_size,
+            dungeons.c.layout,
+            dungeons.c.visited_cells,
+            dungeons.c.current_position,
+        )
+    ).all()
+    for row in rows:
+        size = row.grid_size or 10
+        layout = _load_legacy(row.layout, [])
+        position = _load_legacy(row.current_position, {"x": 0, "y": 0})
+
+        bits = bytearray((size * size + 7) // 8)
+        for cell in _load_legacy(row.visited_cells, []):
+            inside = 0 <= cell["x"] < size and 0 <= cell["y"] < size
+            if cell.get("is_visited", True) and inside:
+                index = cell["y"] * size + cell["x"]
+                bits[index >> 3] |= 1 << (index & 7)
+
+        connection.execute(
+            dungeons.update()
+            .where(dungeons.c.id == row.id)
+            .values(
+                layout_packed=(
+                    bytes(CELL_CODES[cell] for line in layout for cell in line)
+                    if layout
+                    else None
+                ),
+                visited_packed=bytes(bits),
+                position_packed=(position["y"] << 16) | position["x"],
+            )
+        )
+
+    with op.batch_alter_table('dungeon_instances') as batch_op:
+        batch_op.drop_column('layout')
+        batch_op.drop_column('visited_cells')
+        batch_op.drop_column('current_position')
+        batch_op.alter_column('layout_packed', new_column_name='layout')
+        batch_op.alter_column('visited_packed', new_column_name='visited_cells')
+        batch_op.alter_column('position_packed', new_column_name='current_position')
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('dungeon_instances') as batch_op:
+        batch_op.add_column(sa.Column('layout_json', sa.JSON(), nullable=True))
+        batch_op.add_column(sa.Column('visited_json', sa.JSON(), nullable=True))
+        batch_op.add_column(sa.Column('position_json', sa.JSON(), nullable=True))
+
+    dungeons = sa.table(
+        'dungeon_instances',
+        sa.column('id', sa.Integer()),
+        sa.column('grid_size', sa.Integer()),
+        sa.column('layout', sa.LargeBinary()),
+        sa.column('visited_cells', sa.LargeBinary()),
+        sa.column('current_position', sa.Integer()),
+        sa.column('layout_json', sa.JSON()),
+        sa.column('visited_json', sa.JSON()),
+        sa.column('position_json', sa.JSON()),
+    )
+    connection = op.get_bind()
+    rows = connection.execute(
+        sa.select(
+            dungeons.c.id,
+            dungeons.c.grid_size,
+            dungeons.c.layout,
+            dungeons.c.visited_cells,
+            dungeons.c.current_position,
+        )
+    ).all()
+    for row in rows:
+        size = row.grid_size or 10
+        layout = None
+        if row.layout:
+            layout = [
+                [CELL_VALUES[code] for code in row.layout[y * size : (y + 1) * size]]
+                for y in range(size)
+            ]
+        bits = row.visited_cells or b""
+        visited = [
+            {"x": index % size, "y": index // size}
+            for index in range(size * size)
+            if index >> 3 < len(bits) and bits[index >> 3] & (1 << (index & 7))
+        ]
+        packed = row.current_position or 0
+        connection.execute(
+            dungeons.update()
+            .where(dungeons.c.id == row.id)
+            .values(
+                layout_json=json.dumps(layout) if layout else None,
+                visited_json=json.dumps(visited),
+                position_json=json.dumps({"x": packed & 0xFFFF, "y": packed >> 16}),
+            )
+        )
+
+    with op.batch_alter_table('dungeon_instances') as batch_op:
+        batch_op.drop_column('layout')
+        batch_op.drop_column('visited_cells')
+        batch_op.drop_column('current_position')
+        batch_op.alter_column('layout_json', new_column_name='layout')
+        batch_op.alter_column('visited_json', new_column_name='visited_cells')
+        batch_op.alter_column('position_json', new_column_name='current_position')
@@ -1,12 +1,102 @@
+import logging
+from contextlib import asynccontextmanager
+from datetime import UTC, datetime
+
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from .routes import game
-from .models.database import engine, Base, SessionLocal, init_db
-from .models.shop import Shop
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from .config import get_settings
+from .metrics import MetricsMiddleware, instrument_sqlalchemy, registry
 from .models.battler_card import BattlerCard, Rarity
-from datetime import datetime, UTC
+from .models.database import AsyncSessionLocal, SessionLocal
+from .models.shop import Shop
+from .routes import game
+from .services.card_catalog import card_catalog
+from .services.deck_estimator import deck_estimator
+from .services.dungeon_buffer import dungeon_buffer
+from .services.floor_pool import floor_pool
+from .services.shop_service import shop_service
+
+logger = logging.getLogger(__name__)
+
+
+STARTER_CARDS = [
+    {"name": "Basic Warrior", "power_level": 3, "rarity": Rarity.COMMON},
+    {"name": "Basic Mage", "power_level": 2, "rarity": Rarity.COMMON},
+    {"name": "Basic Healer", "power_level": 2, "rarity": Rarity.COMMON},
+    {"name": "Elite Guard", "power_level": 4, "rarity": Rarity.UNCOMMON},
+    {"name": "Fire Mage", "power_level": 4, "rarity": Rarity.UNCOMMON},
+    {"name": "High Priest", "power_level": 4, "rarity": Rarity.UNCOMMON},
+    {"name": "Dragon Knight", "power_level": 6, "rarity": Rarity.RARE},
+    {"name": "Archmage", "power_level": 6, "rarity": Rarity.RARE},
+    {"name": "Divine Healer", "power_level": 6, "rarity": Rarity.RARE},
+    {"name": "Ancient Dragon", "power_level": 8, "rarity": Rarity.LEGENDARY},
+    {"name": "Supreme Wizard", "power_level": 8, "rarity": Rarity.LEGENDARY},
+    {"name": "Angel of Light", "power_level": 8, "rarity": Rarity.LEGENDARY},
+]
+
+
+def init_required_data(db: Session) -> None:
+    """Seed the shop and starter cards
+
+    Idempotent and safe to run from several workers at once: rows that
+    already exist are left alone, so existing data is never touched. The
+    schema itself is managed by Alembic (alembic upgrade head).
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    cards = db.execute(
+        insert(BattlerCard)
+        .values(STARTER_CARDS)
+        .on_conflict_do_nothing(index_elements=[BattlerCard.name])
+    )
+    db.execute(
+        insert(Shop)
+        .values(
+            id=1,
+            featured_card_price=100,
+            random_card_price=50,
+            pack_price=150,
+            last_refresh=datetime.now(UTC),
+        )
+        .on_conflict_do_nothing(index_elements=[Shop.id])
+    )
+    db.commit()
+
+    # Raw inserts skip the ORM events that keep the catalog fresh
+    if cards.rowcount:
+        card_catalog.invalidate()
 
-app = FastAPI(title="Evergreen Crawl TCG API")
+
+def seed_database() -> None:
+    with SessionLocal() as db:
+        init_required_data(db)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        await run_in_threadpool(seed_database)
+    except OperationalError as e:
+        logger.error(f"Failed to seed data, is the schema migrated? {e}")
+        raise
+    shop_service.start(AsyncSessionLocal)
+    deck_estimator.start()
+    yield
+    await shop_service.stop()
+    await run_in_threadpool(deck_estimator.stop)
+    floor_pool.stop()
+    await run_in_threadpool(dungeon_buffer.stop)
+
+
+app = FastAPI(title="Evergreen Crawl TCG API", lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -18,67 +108,21 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
-# Initialize database
-init_db()
-
-
-# Initialize data
-def init_data():
-    db = SessionLocal()
-    try:
-        # Initialize shop
-        shop = db.query(Shop).first()
-        if not shop:
-            shop = Shop(
-                featured_card_price=100,
-                random_card_price=50,
-                pack_price=150,
-                last_refresh=datetime.now(UTC),
-            )
-            db.add(shop)
-
-        # Initialize cards if they don't exist
-        if not db.query(BattlerCard).first():
-            starter_cards = [
-                {"name": "Basic Warrior", "power_level": 3, "rarity": Rarity.COMMON},
-                {"name": "Basic Mage", "power_level": 2, "rarity": Rarity.COMMON},
-                {"name": "Basic Healer", "power_level": 2, "rarity": Rarity.COMMON},
-                {"name": "Elite Guard", "power_level": 4, "rarity": Rarity.UNCOMMON},
-                {"name": "Fire Mage", "power_level": 4, "rarity": Rarity.UNCOMMON},
-                {"name": "High Priest", "power_level": 4, "rarity": Rarity.UNCOMMON},
-                {"name": "Dragon Knight", "power_level": 6, "rarity": Rarity.RARE},
-                {"name": "Archmage", "power_level": 6, "rarity": Rarity.RARE},
-                {"name": "Divine Healer", "power_level": 6, "rarity": Rarity.RARE},
-                {
-                    "name": "Ancient Dragon",
-                    "power_level": 8,
-                    "rarity": Rarity.LEGENDARY,
-                },
-                {
-                    "name": "Supreme Wizard",
-                    "power_level": 8,
-                    "rarity": Rarity.LEGENDARY,
-                },
-                {
-                    "name": "Angel of Light",
-                    "power_level": 8,
-                    "rarity": Rarity.LEGENDARY,
-                },
-            ]
-            for card_data in starter_cards:
-                card = BattlerCard(**card_data)
-                db.add(card)
-
-        db.commit()
-    except Exception as e:
-        print(f"Error initializing data: {e}")
-        db.rollback()
-    finally:
-        db.close()
-
-
-# Initialize all data
-init_data()
+# Per-request SQL counts and timings, served from /metrics
+instrument_sqlalchemy()
+app.add_middleware(
+    MetricsMiddleware,
+    registry=registry,
+    slow_request_ms=get_settings().slow_request_ms,
+)
 
 # Include routers
 app.include_router(game.router, prefix="/api/game", tags=["game"])
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Per-route request, SQL and serialization metrics for Prometheus"""
+    return PlainTextResponse(
+        registry.render(), media_type="text/plain; version=0.0.4"
+    )
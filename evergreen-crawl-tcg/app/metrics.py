@@ -0,0 +1,298 @@
+"""Per-request SQL and latency instrumentation
+
+SQLAlchemy cursor events count statements and time spent in the database
+for whichever request is running, tracked through a context variable
+that follows the request into greenlets and threadpool calls.
+MetricsMiddleware times each request, adds the figures to the response
+as Server-Timing and X-DB-Queries headers and folds them into per-route
+totals served by /metrics in Prometheus text format.
+"""
+
+import asyncio
+import logging
+import threading
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import wraps
+from time import perf_counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the request duration histogram, in seconds
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# Most statements kept per request for the slow-request log
+MAX_CAPTURED_STATEMENTS = 50
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+@dataclass
+class RequestStats:
+    """What one request spent in the database and in serialization"""
+
+    capture: bool = False
+    route: str = UNMATCHED_ROUTE
+    queries: int = 0
+    db_seconds: float = 0.0
+    statements: List[Tuple[str, float]] = field(default_factory=list)
+    # Set when the endpoint returns; serialization runs from here to the
+    # start of the response
+    endpoint_done: Optional[float] = None
+    serialization_seconds: float = 0.0
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar(
+    "request_stats", default=None
+)
+
+
+def current_stats() -> Optional[RequestStats]:
+    """Stats for the request being served, if any"""
+    return _current.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, params, context, executemany):
+    if context is not None and _current.get() is not None:
+        context._metrics_start = perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, params, context, executemany):
+    stats = _current.get()
+    start = getattr(context, "_metrics_start", None)
+    if stats is None or start is None:
+        return
+    elapsed = perf_counter() - start
+    stats.queries += 1
+    stats.db_seconds += elapsed
+    if stats.capture and len(stats.statements) < MAX_CAPTURED_STATEMENTS:
+        stats.statements.append((statement, elapsed))
+
+
+def instrument_sqlalchemy() -> None:
+    """Listen to every engine, sync or async, for the current request's stats"""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _timed_endpoint(endpoint: Callable, path: str) -> Callable:
+    """Wrap an endpoint to label the request and mark when it returns"""
+
+    def done():
+        stats = _current.get()
+        if stats is not None:
+            stats.endpoint_done = perf_counter()
+
+    if asyncio.iscoroutinefunction(endpoint):
+
+        @wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            _label(path)
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                done()
+
+    else:
+
+        @wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            _label(path)
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                done()
+
+    wrapper.__instrumented__ = endpoint
+    return wrapper
+
+
+def _label(path: str) -> None:
+    stats = _current.get()
+    if stats is not None:
+        stats.route = path
+
+
+class InstrumentedRoute(APIRoute):
+    """APIRoute that reports its path template and serialization time"""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        # include_router re-adds routes under their prefix; wrap only once
+        endpoint = getattr(endpoint, "__instrumented__", endpoint)
+        super().__init__(path, _timed_endpoint(endpoint, path), **kwargs)
+
+
+@dataclass
+class _Series:
+    requests: Dict[int, int] = field(default_factory=dict)
+    buckets: List[int] = field(
+        default_factory=lambda: [0] * len(DURATION_BUCKETS)
+    )
+    count: int = 0
+    seconds: float = 0.0
+    queries: int = 0
+    db_seconds: float = 0.0
+    serialization_seconds: float = 0.0
+
+
+class MetricsRegistry:
+    """Per-route totals, rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, str], _Series] = {}
+
+    def observe(
+        self, method: str, status: int, seconds: float, stats: RequestStats
+    ):
+        with self._lock:
+            series = self._series.setdefault((method, stats.route), _Series())
+            series.requests[status] = series.requests.get(status, 0) + 1
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if seconds <= bound:
+                    series.buckets[index] += 1
+            series.count += 1
+            series.seconds += seconds
+            series.queries += stats.queries
+            series.db_seconds += stats.db_seconds
+            series.serialization_seconds += stats.serialization_seconds
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def render(self) -> str:
+        with self._lock:
+            series = sorted(self._series.items())
+            lines = [
+                "# HELP http_requests_total Requests served",
+                "# TYPE http_requests_total counter",
+            ]
+            for (method, route), s in series:
+                for status, count in sorted(s.requests.items()):
+                    labels = _labels(method, route, status=str(status))
+                    lines.append(f"http_requests_total{{{labels}}} {count}")
+
+            lines += [
+                "# HELP http_request_duration_seconds Request latency",
+                "# TYPE http_request_duration_seconds histogram",
+            ]
+            name = "http_request_duration_seconds"
+            for (method, route), s in series:
+                bounds = [str(bound) for bound in DURATION_BUCKETS] + ["+Inf"]
+                for bound, count in zip(bounds, s.buckets + [s.count]):
+                    labels = _labels(method, route, le=bound)
+                    lines.append(f"{name}_bucket{{{labels}}} {count}")
+                labels = _labels(method, route)
+                lines.append(f"{name}_sum{{{labels}}} {s.seconds}")
+                lines.append(f"{name}_count{{{labels}}} {s.count}")
+
+            for name, help_text, attr in (
+                ("http_request_db_queries", "SQL statements per request", "queries"),
+                ("http_request_db_seconds", "Database time per request", "db_seconds"),
+                (
+                    "http_request_serialization_seconds",
+                    "Response serialization time per request",
+                    "serialization_seconds",
+                ),
+            ):
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} summary"]
+                for (method, route), s in series:
+                    labels = _labels(method, route)
+                    lines.append(f"{name}_sum{{{labels}}} {getattr(s, attr)}")
+                    lines.append(f"{name}_count{{{labels}}} {s.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(method: str, route: str, **extra: str) -> str:
+    pairs = {"method": method, "route": route, **extra}
+    return ",".join(f'{key}="{_escape(value)}"' for key, value in pairs.items())
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = MetricsRegistry()
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording SQL counts and timings per request
+
+    Args:
+        app: The wrapped ASGI app
+        registry: Where per-route totals are kept
+        slow_request_ms: Log requests slower than this, with their
+            statements; 0 disables the log
+        exclude: Paths that are not recorded, such as /metrics itself
+    """
+
+    def __init__(
+        self,
+        app,
+        registry: MetricsRegistry = registry,
+        slow_request_ms: float = 0.0,
+        exclude: Tuple[str, ...] = ("/metrics",),
+    ):
+        self.app = app
+        self.registry = registry
+        self.slow_request_ms = slow_request_ms
+        self.exclude = exclude
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(capture=self.slow_request_ms > 0)
+        token = _current.set(stats)
+        start = perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                now = perf_counter()
+                if stats.endpoint_done is not None:
+                    stats.serialization_seconds = now - stats.endpoint_done
+                headers = list(message.get("headers", []))
+                headers += [
+                    (b"x-db-queries", str(stats.queries).encode()),
+                    (b"server-timing", _server_timing(stats).encode()),
+                ]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            elapsed = perf_counter() - start
+            _current.reset(token)
+            self.registry.observe(scope["method"], status, elapsed, stats)
+            if self.slow_request_ms and elapsed * 1000 >= self.slow_request_ms:
+                _log_slow_request(scope, status, elapsed, stats)
+
+
+def _server_timing(stats: RequestStats) -> str:
+    return (
+        f"db;dur={stats.db_seconds * 1000:.2f};desc=\"{stats.queries} queries\", "
+        f"serialize;dur={stats.serialization_seconds * 1000:.2f}"
+    )
+
+
+def _log_slow_request(scope, status: int, elapsed: float, stats: RequestStats):
+    statements = "\n".join(
+        f"  {seconds * 1000:.2f} ms  {statement}"
+        for statement, seconds in stats.statements
+    )
+    logger.warning(
+        f"Slow request {scope['method']} {scope['path']} ({stats.route}) "
+        f"{status} in {elapsed * 1000:.1f} ms: {stats.queries} queries, "
+        f"{stats.db_seconds * 1000:.1f} ms in the database, "
+        f"{stats.serialization_seconds * 1000:.1f} ms serializing\n{statements}"
+    )
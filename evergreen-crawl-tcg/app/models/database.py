@@ -1,38 +1,160 @@
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, DeclarativeBase
+from typing import Dict
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./evergreen_crawl.db"
-
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    async_sessionmaker,
+    create_async_engine,
 )
+from sqlalchemy.orm import DeclarativeBase, sessionmaker
+
+from ..config import Settings, get_settings
+
+# sqlite-basic is the untuned engine, kept for comparison; sqlite-tuned adds
+# WAL and connection pragmas; postgres uses a pre-pinged connection pool
+ENGINE_PROFILES = ("sqlite-basic", "sqlite-tuned", "postgres")
+
+
+def sqlite_pragmas(settings: Settings) -> Dict[str, object]:
+    """Pragmas the sqlite-tuned profile runs on every new connection"""
+    return {
+        # Readers no longer block the writer (or each other)
+        "journal_mode": "WAL",
+        # Safe with WAL: a crash can lose the last commits but never corrupts
+        "synchronous": "NORMAL",
+        # Wait for the write lock instead of failing with "database is locked"
+        "busy_timeout": settings.sqlite_busy_timeout_ms,
+        # Negative means KiB rather than pages
+        "cache_size": -settings.sqlite_cache_size_kib,
+        "mmap_size": settings.sqlite_mmap_size,
+        "temp_store": "MEMORY",
+    }
+
+
+def default_profile(url: str) -> str:
+    is_sqlite = make_url(url).get_backend_name() == "sqlite"
+    return "sqlite-tuned" if is_sqlite else "postgres"
+
+
+def _engine_options(url: str, profile: str, settings: Settings):
+    """Engine keyword arguments and connect pragmas for a profile"""
+    if profile not in ENGINE_PROFILES:
+        raise ValueError(f"Unknown database profile: {profile}")
+
+    parsed = make_url(url)
+    is_sqlite = parsed.get_backend_name() == "sqlite"
+    if is_sqlite != profile.startswith("sqlite"):
+        raise ValueError(f"Profile {profile} can't be used with {parsed.drivername}")
+
+    if profile == "sqlite-basic":
+        return {"connect_args": {"check_same_thread": False}}, None
+
+    pool_args = {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+    }
+    if profile == "postgres":
+        return {
+            "pool_pre_ping": True,
+            "pool_recycle": settings.db_pool_recycle,
+            **pool_args,
+        }, None
+
+    # In-memory databases get a single-connection pool that can't be sized
+    in_memory = parsed.database in (None, "", ":memory:")
+    options = {
+        "connect_args": {
+            "check_same_thread": False,
+            "timeout": settings.sqlite_busy_timeout_ms / 1000,
+        },
+        **({} if in_memory else pool_args),
+    }
+    return options, sqlite_pragmas(settings)
+
+
+def _apply_pragmas(engine: Engine, pragmas: Dict[str, object]) -> None:
+    @event.listens_for(engine, "connect")
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+def build_engine(
+    url: str = None, profile: str = None, settings: Settings = None
+) -> Engine:
+    """Create an engine for a URL using one of ENGINE_PROFILES
+
+    Args:
+        url: Database URL, defaults to the DATABASE_URL setting
+        profile: Engine profile, defaults to DB_PROFILE or one matching the URL
+        settings: Settings to size pools and tune SQLite from
+    """
+    settings = settings or get_settings()
+    url = url or settings.database_url
+    profile = profile or settings.db_profile or default_profile(url)
+    options, pragmas = _engine_options(url, profile, settings)
+
+    engine = create_engine(url, **options)
+    if pragmas:
+        _apply_pragmas(engine, pragmas)
+    return engine
+
+
+# Async drivers used for each backend when building an AsyncEngine
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+psycopg"}
+
+
+def async_url(url: str) -> str:
+    """Swap a database URL's driver for its async counterpart"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend}")
+    return parsed.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(
+        hide_password=False
+    )
+
+
+def build_async_engine(
+    url: str = None, profile: str = None, settings: Settings = None
+) -> AsyncEngine:
+    """Create an AsyncEngine with the same profiles as build_engine"""
+    settings = settings or get_settings()
+    url = url or settings.database_url
+    profile = profile or settings.db_profile or default_profile(url)
+    options, pragmas = _engine_options(url, profile, settings)
+
+    engine = create_async_engine(async_url(url), **options)
+    if pragmas:
+        _apply_pragmas(engine.sync_engine, pragmas)
+    return engine
+
+
+SQLALCHEMY_DATABASE_URL = get_settings().database_url
+
+# The sync engine serves background workers, seeding and scripts; request
+# handlers go through the async engine
+engine = build_engine(SQLALCHEMY_DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = build_async_engine(SQLALCHEMY_DATABASE_URL)
+# Objects stay loaded after commit; expired attributes can't lazy load here
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False
+)
+
 
 class Base(DeclarativeBase):
     pass
 
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
-
-
-def init_db():
-    """Initialize the database, creating all tables."""
-    import logging
-
-    logger = logging.getLogger(__name__)
 
-    try:
-        logger.info("Creating database tables...")
-        Base.metadata.drop_all(bind=engine)  # Drop all tables
-        Base.metadata.create_all(bind=engine)  # Create all tables with new schema
-        logger.info("Database tables created successfully")
-    except Exception as e:
-        logger.error(f"Error creating database tables: {e}")
-        raise
@@ -1,10 +1,42 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, JSON, DateTime
-from sqlalchemy.orm import relationship
-import json
-from datetime import datetime, UTC
+from collections import defaultdict
+from datetime import UTC, datetime
+from typing import Dict, Iterable, Mapping
+
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Table,
+    delete,
+    func,
+    select,
+)
+from sqlalchemy.orm import column_property, relationship
+from sqlalchemy.orm.session import Session
 
 from .database import Base
 
+# Constructed decks must hold between these many cards (starter decks are exempt)
+MIN_DECK_SIZE = 13
+MAX_DECK_SIZE = 104
+
+# Junction table for the cards in a deck
+deck_cards = Table(
+    "deck_cards",
+    Base.metadata,
+    Column("deck_id", Integer, ForeignKey("decks.id"), primary_key=True),
+    Column(
+        "card_id", Integer, ForeignKey("battler_cards.id"), primary_key=True, index=True
+    ),
+    Column("quantity", Integer, nullable=False, default=1),
+    # Covers SUM(quantity) per deck, so size checks never read the table
+    Index("ix_deck_cards_deck_id_quantity", "deck_id", "quantity"),
+)
+
 
 class Deck(Base):
     __tablename__ = "decks"
@@ -13,31 +45,91 @@ class Deck(Base):
     name = Column(String)
     player_id = Column(Integer, ForeignKey("players.id"))
     is_starter = Column(Boolean, default=False)
-    cards = Column(JSON, default=list)  # Stores a list of card IDs and quantities
     created_at = Column(DateTime, default=lambda: datetime.now(UTC))
 
+    # Total number of cards, summed in SQL from deck_cards
+    card_count = column_property(
+        select(func.coalesce(func.sum(deck_cards.c.quantity), 0))
+        .where(deck_cards.c.deck_id == id)
+        .correlate_except(deck_cards)
+        .scalar_subquery()
+    )
+
     # Relationships
     player = relationship("Player", back_populates="decks")
 
     @property
-    def card_count(self) -> int:
-        """Get the total number of cards in the deck"""
-        if not self.cards:
-            return 0
-        try:
-            cards = (
-                json.loads(self.cards) if isinstance(self.cards, str) else self.cards
+    def has_legal_size(self) -> bool:
+        """Whether the deck is within the size limits for its kind"""
+        return self.is_starter or MIN_DECK_SIZE <= self.card_count <= MAX_DECK_SIZE
+
+
+def get_deck_cards(db: Session, deck_ids: Iterable[int]) -> Dict[int, Dict[int, int]]:
+    """Load card quantities for several decks in one query
+
+    Returns:
+        Mapping of deck ID to a mapping of card ID to quantity
+    """
+    decks = defaultdict(dict)
+    stmt = (
+        select(deck_cards.c.deck_id, deck_cards.c.card_id, deck_cards.c.quantity)
+        .where(deck_cards.c.deck_id.in_(list(deck_ids)))
+        .order_by(deck_cards.c.deck_id, deck_cards.c.card_id)
+    )
+    for row in db.execute(stmt):
+        decks[row.deck_id][row.card_id] = row.quantity
+    return decks
+
+
+def set_deck_cards(db: Session, deck_id: int, quantities: Mapping[int, int]):
+    """Set card quantities in a deck with row-level upserts
+
+    Only the cards named are touched; a quantity of 0 removes the card.
+
+    Args:
+        db: The database session
+        deck_id: The ID of the deck to edit
+        quantities: Mapping of card ID to the number of copies wanted
+    """
+    removed = [card_id for card_id, quantity in quantities.items() if quantity <= 0]
+    kept = {
+        card_id: quantity for card_id, quantity in quantities.items() if quantity > 0
+    }
+
+    if removed:
+        db.execute(
+            delete(deck_cards).where(
+                deck_cards.c.deck_id == deck_id, deck_cards.c.card_id.in_(removed)
             )
-            return len(cards)
-        except (json.JSONDecodeError, TypeError):
-            return 0
+        )
+    if not kept:
+        return
 
-    @property
-    def cards_list(self) -> list:
-        """Get the cards as a list for API responses"""
-        if not self.cards:
-            return []
-        try:
-            return json.loads(self.cards) if isinstance(self.cards, str) else self.cards
-        except (json.JSONDecodeError, TypeError):
-            return []
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    stmt = insert(deck_cards).values(
+        [
+            {"deck_id": deck_id, "card_id": card_id, "quantity": quantity}
+            for card_id, quantity in kept.items()
+        ]
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[deck_cards.c.deck_id, deck_cards.c.card_id],
+        set_={"quantity": stmt.excluded.quantity},
+    )
+    db.execute(stmt)
+
+
+def replace_deck_cards(db: Session, deck_id: int, quantities: Mapping[int, int]):
+    """Make a deck hold exactly the given cards, upserting only what changed"""
+    current = get_deck_cards(db, [deck_id]).get(deck_id, {})
+    changes = {card_id: 0 for card_id in current if card_id not in quantities}
+    changes.update(
+        (card_id, quantity)
+        for card_id, quantity in quantities.items()
+        if current.get(card_id) != quantity
+    )
+    set_deck_cards(db, deck_id, changes)
@@ -1,7 +1,9 @@
-from sqlalchemy import Boolean, Column, Integer, JSON, ForeignKey, Enum
-from sqlalchemy.orm import relationship
 from enum import Enum as PyEnum
-import json
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import JSON, Boolean, Column, Enum, ForeignKey, Integer, LargeBinary
+from sqlalchemy.ext.mutable import Mutable
+from sqlalchemy.orm import relationship
 
 from .database import Base
 
@@ -18,54 +20,254 @@ class CellType(str, PyEnum):
     SAFE = "safe"
 
 
+# Stored one byte per cell; codes must never be renumbered
+CELL_CODES = {
+    CellType.EMPTY: 0,
+    CellType.MONSTER: 1,
+    CellType.TREASURE: 2,
+    CellType.TRAP: 3,
+    CellType.EXIT: 4,
+    CellType.MERCHANT: 5,
+    CellType.SHRINE: 6,
+    CellType.MINIBOSS: 7,
+    CellType.SAFE: 8,
+}
+CELL_VALUES_BY_CODE = tuple(
+    cell_type.value for cell_type, _ in sorted(CELL_CODES.items(), key=lambda i: i[1])
+)
+
+
+# Bytes per cell in DungeonInstance.exit_distances (unsigned, little-endian)
+EXIT_DISTANCE_SIZE = 4
+
+
+def encode_layout(rows: List[List[str]]) -> bytes:
+    """Encode a 2D grid of cell type values as one byte per cell, row-major"""
+    codes = {cell_type.value: code for cell_type, code in CELL_CODES.items()}
+    return bytes(codes[cell] for row in rows for cell in row)
+
+
+def decode_layout(data: bytes, size: int) -> List[List[str]]:
+    """Decode a packed layout back into a 2D grid of cell type values"""
+    return [
+        [CELL_VALUES_BY_CODE[code] for code in data[y * size : (y + 1) * size]]
+        for y in range(size)
+    ]
+
+
+def pack_position(x: int, y: int) -> int:
+    """Pack a grid position into a single integer"""
+    return (y << 16) | x
+
+
+def unpack_position(packed: int) -> Tuple[int, int]:
+    """Unpack a position created by pack_position into (x, y)"""
+    return packed & 0xFFFF, packed >> 16
+
+
+def empty_bitset(size: int) -> bytes:
+    """Create a cleared visited-cell bitset for a size x size grid"""
+    return bytes((size * size + 7) // 8)
+
+
+class _MutableBytes(Mutable, bytearray):
+    """Bytearray column value that flags its owning row as dirty on change"""
+
+    @classmethod
+    def coerce(cls, key, value):
+        if value is None or isinstance(value, cls):
+            return value
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return cls(value)
+        return Mutable.coerce(key, value)
+
+    def __reduce_ex__(self, protocol):
+        return (self.__class__, (bytes(self),))
+
+
+class VisitedBitset(_MutableBytes):
+    """Mutable bitset of visited cells, one bit per cell in row-major order
+
+    Setting a bit updates the buffer in place and flags the owning row as
+    dirty, so the in-memory set and the persisted column never diverge and
+    a move does not have to copy the whole bitset.
+    """
+
+    def __contains__(self, index: int) -> bool:
+        byte = index >> 3
+        return byte < len(self) and bool(self[byte] & (1 << (index & 7)))
+
+    def add(self, index: int) -> None:
+        byte = index >> 3
+        if byte >= len(self):
+            self.extend(bytes(byte + 1 - len(self)))
+        mask = 1 << (index & 7)
+        if not self[byte] & mask:
+            self[byte] |= mask
+            self.changed()
+
+    def indices(self) -> Iterator[int]:
+        """Iterate over the indices of all set bits"""
+        for byte_index, byte in enumerate(self):
+            while byte:
+                low = byte & -byte
+                yield (byte_index << 3) + low.bit_length() - 1
+                byte ^= low
+
+
+class PositionLog(_MutableBytes):
+    """Append-only log of packed positions, four bytes per entry"""
+
+    ENTRY_SIZE = 4
+
+    @property
+    def entries(self) -> int:
+        return len(self) // self.ENTRY_SIZE
+
+    def append_position(self, packed: int) -> None:
+        self.extend(packed.to_bytes(self.ENTRY_SIZE, "little"))
+        self.changed()
+
+    def position_at(self, entry: int) -> int:
+        start = entry * self.ENTRY_SIZE
+        return int.from_bytes(self[start : start + self.ENTRY_SIZE], "little")
+
+    def positions(self, start: int = 0, stop: int = None) -> Iterator[int]:
+        """Iterate over packed positions for entries in [start, stop)"""
+        stop = self.entries if stop is None else stop
+        for entry in range(start, stop):
+            yield self.position_at(entry)
+
+
 class DungeonInstance(Base):
     __tablename__ = "dungeon_instances"
 
     id = Column(Integer, primary_key=True, index=True)
     player_id = Column(Integer, ForeignKey("players.id"))
     current_floor = Column(Integer, default=1)
-    current_position = Column(JSON, default=lambda: json.dumps({"x": 0, "y": 0}))
-    visited_cells = Column(JSON, default=list)
+    current_position = Column(Integer, default=0)  # Packed with pack_position
+    visited_cells = Column(VisitedBitset.as_mutable(LargeBinary))
     grid_size = Column(Integer, default=10)
-    layout = Column(JSON)  # Stores the dungeon layout as a 2D array
+    layout = Column(LargeBinary)  # One CellType code byte per cell, row-major
+    path = Column(PositionLog.as_mutable(LargeBinary))  # Position after each move
+    # Set with the layout by services.floor_analysis: each cell's risk-weighted
+    # distance to the exit, row-major, and the cheapest route from the start
+    exit_distances = Column(LargeBinary)
+    exit_route = Column(LargeBinary)  # Packed positions, as in path
 
     # Relationships
     player = relationship("Player", back_populates="active_dungeon")
 
+    @property
+    def position(self) -> Tuple[int, int]:
+        """Get the current (x, y) position"""
+        return unpack_position(self.current_position or 0)
+
+    def set_position(self, x: int, y: int) -> None:
+        self.current_position = pack_position(x, y)
+
+    def cell_type_at(self, x: int, y: int) -> str:
+        """Get the cell type value at (x, y) without decoding the layout"""
+        return CELL_VALUES_BY_CODE[self.layout[y * self.grid_size + x]]
+
+    def set_layout(self, rows: List[List[str]]) -> None:
+        self.layout = encode_layout(rows)
+
+    def layout_rows(self) -> List[List[str]]:
+        """Decode the full layout into a 2D grid of cell type values"""
+        return decode_layout(self.layout, self.grid_size)
+
+    def distance_to_exit(self, x: int, y: int) -> Optional[int]:
+        """Risk-weighted distance from (x, y) to the exit, if the floor is analyzed"""
+        if not self.exit_distances:
+            return None
+        start = (y * self.grid_size + x) * EXIT_DISTANCE_SIZE
+        return int.from_bytes(
+            self.exit_distances[start : start + EXIT_DISTANCE_SIZE], "little"
+        )
+
+    def exit_route_positions(self) -> List[Tuple[int, int]]:
+        """The (x, y) cells of the cheapest route from the start to the exit"""
+        if not self.exit_route:
+            return []
+        route = PositionLog(self.exit_route)
+        return [unpack_position(packed) for packed in route.positions()]
+
+    @property
+    def revision(self) -> int:
+        """Number of moves made since the dungeon (or its path) was started"""
+        return max(self.path.entries - 1, 0) if self.path else 0
+
+    def start_at(self, x: int, y: int) -> None:
+        """Reset position, visited cells and path to a fresh start at (x, y)"""
+        self.set_position(x, y)
+        self.visited_cells = empty_bitset(self.grid_size)
+        self.visited_cells.add(y * self.grid_size + x)
+        self.path = pack_position(x, y).to_bytes(PositionLog.ENTRY_SIZE, "little")
+
+    def move_to(self, x: int, y: int) -> None:
+        """Move to (x, y), marking it visited and recording a new revision"""
+        self.set_position(x, y)
+        self.mark_visited(x, y)
+        if self.path is None:
+            self.path = b""
+        self.path.append_position(pack_position(x, y))
+
+    def is_visited(self, x: int, y: int) -> bool:
+        return self.visited_cells is not None and (
+            y * self.grid_size + x in self.visited_cells
+        )
+
+    def mark_visited(self, x: int, y: int) -> None:
+        """Set the visited bit for (x, y)"""
+        if self.visited_cells is None:
+            self.visited_cells = empty_bitset(self.grid_size)
+        self.visited_cells.add(y * self.grid_size + x)
+
+    def visited_positions(self) -> List[Tuple[int, int]]:
+        """Get the (x, y) positions of all visited cells"""
+        if self.visited_cells is None:
+            return []
+        size = self.grid_size
+        return [(index % size, index // size) for index in self.visited_cells.indices()]
+
     def is_valid_move(self, x: int, y: int) -> bool:
         """Check if a move to position (x, y) is valid"""
         if not (0 <= x < self.grid_size and 0 <= y < self.grid_size):
             return False
 
-        current = json.loads(self.current_position)
+        current_x, current_y = self.position
         # Can only move to adjacent cells
-        return abs(x - current["x"]) + abs(y - current["y"]) == 1
+        return abs(x - current_x) + abs(y - current_y) == 1
 
     def get_visible_cells(self) -> list:
-        """Get cells visible to the player (implements fog of war)"""
-        current = json.loads(self.current_position)
+        """Get cells visible to the player (implements fog of war)
+
+        Runs in O(grid_size²): each cell costs one bit test and, when
+        revealed, one byte lookup in the packed layout.
+        """
+        current_x, current_y = self.position
         if not self.layout:
             return []
 
-        layout = json.loads(self.layout)
-        visited = json.loads(self.visited_cells) if self.visited_cells else []
+        size = self.grid_size
+        layout = self.layout
+        visited = self.visited_cells or VisitedBitset()
         visible = []
 
-        # Get all cells in the grid
-        for y in range(self.grid_size):
-            for x in range(self.grid_size):
-                # Check if cell is adjacent to current position
-                is_adjacent = abs(x - current["x"]) <= 1 and abs(y - current["y"]) <= 1
-                # Check if cell has been visited
-                is_visited = {"x": x, "y": y} in visited
-
+        for y in range(size):
+            row_start = y * size
+            near_row = abs(y - current_y) <= 1
+            for x in range(size):
+                index = row_start + x
                 # Cell is visible if it's adjacent or has been visited
-                if is_adjacent or is_visited:
+                is_visited = index in visited
+                if is_visited or (near_row and abs(x - current_x) <= 1):
                     visible.append(
                         {
                             "x": x,
                             "y": y,
-                            "type": layout[y][x],
+                            "type": CELL_VALUES_BY_CODE[layout[index]],
                             "is_visible": True,
                             "is_visited": is_visited,
                         }
@@ -84,6 +286,117 @@ class DungeonInstance(Base):
 
         return visible
 
+    def _cell_state(self, x: int, y: int, visible: bool, visited: bool) -> dict:
+        return {
+            "x": x,
+            "y": y,
+            "type": self.cell_type_at(x, y) if visible else "fog",
+            "is_visible": visible,
+            "is_visited": visited,
+        }
+
+    def get_visibility_delta(self, since_revision: int) -> Optional[list]:
+        """Get the cells whose visibility changed after a given revision
+
+        Only cells on the path walked since that revision and the
+        neighbourhoods of the old and new positions can change, so the cost
+        is proportional to the moves made, not to the grid size. Returns
+        None if the revision is unknown and the client needs a snapshot.
+        """
+        revision = self.revision
+        if not self.layout or since_revision is None:
+            return None
+        if since_revision < 0 or since_revision > revision or not self.path:
+            return None
+
+        size = self.grid_size
+        old_x, old_y = unpack_position(self.path.position_at(since_revision))
+        new_x, new_y = self.position
+        seen_before = set(self.path.positions(0, since_revision + 1))
+        walked_after = set(self.path.positions(since_revision + 1)) - seen_before
+
+        candidates = {unpack_position(packed) for packed in walked_after}
+        for center_x, center_y in ((old_x, old_y), (new_x, new_y)):
+            for dy in (-1, 0, 1):
+                for dx in (-1, 0, 1):
+                    x, y = center_x + dx, center_y + dy
+                    if 0 <= x < size and 0 <= y < size:
+                        candidates.add((x, y))
+
+        changed = []
+        for x, y in sorted(candidates, key=lambda cell: (cell[1], cell[0])):
+            visited_now = self.is_visited(x, y)
+            visited_then = visited_now and pack_position(x, y) not in walked_after
+            visible_now = visited_now or (abs(x - new_x) <= 1 and abs(y - new_y) <= 1)
+            visible_then = visited_then or (
+                abs(x - old_x) <= 1 and abs(y - old_y) <= 1
+            )
+            if (visible_now, visited_now) != (visible_then, visited_then):
+                changed.append(self._cell_state(x, y, visible_now, visited_now))
+        return changed
+
+    def get_visibility_snapshot(self) -> list:
+        """Get the full visibility grid with fog run-length encoded
+
+        Cells are listed in row-major order. An integer is a run of that many
+        fog cells; a two-item list is a visible cell as [type, is_visited].
+        """
+        current_x, current_y = self.position
+        if not self.layout:
+            return []
+
+        size = self.grid_size
+        layout = self.layout
+        visited = self.visited_cells or VisitedBitset()
+        runs = []
+        fog = 0
+        for y in range(size):
+            row_start = y * size
+            near_row = abs(y - current_y) <= 1
+            for x in range(size):
+                index = row_start + x
+                is_visited = index in visited
+                if is_visited or (near_row and abs(x - current_x) <= 1):
+                    if fog:
+                        runs.append(fog)
+                        fog = 0
+                    runs.append([CELL_VALUES_BY_CODE[layout[index]], int(is_visited)])
+                else:
+                    fog += 1
+        if fog:
+            runs.append(fog)
+        return runs
+
+
+def expand_snapshot(runs: list, size: int) -> list:
+    """Expand a run-length encoded snapshot into per-cell dictionaries"""
+    cells = []
+    for run in runs:
+        if isinstance(run, int):
+            for _ in range(run):
+                index = len(cells)
+                cells.append(
+                    {
+                        "x": index % size,
+                        "y": index // size,
+                        "type": "fog",
+                        "is_visible": False,
+                        "is_visited": False,
+                    }
+                )
+        else:
+            index = len(cells)
+            cells.append(
+                {
+                    "x": index % size,
+                    "y": index // size,
+                    "type": run[0],
+                    "is_visible": True,
+                    "is_visited": bool(run[1]),
+                }
+            )
+    return cells
+
 
 class DungeonEncounter(Base):
     __tablename__ = "dungeon_encounters"
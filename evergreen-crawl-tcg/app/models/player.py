@@ -1,6 +1,21 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Table, select
+from datetime import UTC, datetime
+from typing import Dict, List, Mapping
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Integer,
+    String,
+    Table,
+    func,
+    literal,
+    select,
+    update,
+)
 from sqlalchemy.orm import relationship
-from datetime import datetime, UTC
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy.orm.session import Session
 
 from .database import Base
@@ -14,13 +29,17 @@ player_cards = Table(
     Column("quantity", Integer, default=1),
 )
 
+# Passive income: 1 gold per 6 seconds
+GOLD_PER_SECOND = 1 / 6.0
+
 
 class Player(Base):
     __tablename__ = "players"
 
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String, unique=True, index=True)
-    gold = Column(Float, default=100.0)
+    # Balance is derived: base_gold as of last_gold_update, plus accrual since
+    base_gold = Column("gold", Float, default=100.0)
     level = Column(Integer, default=1, nullable=False)
     last_gold_update = Column(DateTime, default=lambda: datetime.now(UTC))
     created_at = Column(DateTime, default=lambda: datetime.now(UTC))
@@ -32,40 +51,61 @@ class Player(Base):
         "DungeonInstance", back_populates="player", uselist=False
     )
 
-    def update_gold(self):
-        """Update gold based on time passed (1 gold per 6 seconds)"""
-        if not self.last_gold_update.tzinfo:
-            # Convert naive datetime to UTC if needed
-            self.last_gold_update = self.last_gold_update.replace(tzinfo=UTC)
-        now = datetime.now(UTC)
-        seconds_passed = (now - self.last_gold_update).total_seconds()
-        gold_earned = seconds_passed / 6.0
-        self.gold += gold_earned
-        self.last_gold_update = now
+    @property
+    def gold(self) -> float:
+        """Current balance, computed at read time without touching the row"""
+        return self.gold_at(datetime.now(UTC))
+
+    @gold.setter
+    def gold(self, value: float):
+        """Reset the balance, restarting accrual from now"""
+        self.base_gold = value
+        self.last_gold_update = datetime.now(UTC)
+
+    def gold_at(self, now: datetime) -> float:
+        """Balance at a given moment: the stored base plus gold accrued since"""
+        base = self.base_gold or 0.0
+        since = self.last_gold_update
+        if since is None:
+            return base
+        if not since.tzinfo:
+            since = since.replace(tzinfo=UTC)
+        return base + max((now - since).total_seconds(), 0.0) * GOLD_PER_SECOND
 
     def add_card(self, card, db: Session):
         """Add a card to the player's collection or increment its quantity"""
-        if card not in self.cards:
-            self.cards.append(card)
-        else:
-            # Fix the select syntax
-            stmt = select(player_cards.c.quantity).where(
-                player_cards.c.player_id == self.id,
-                player_cards.c.card_id == card.id
-            )
-            result = db.execute(stmt).scalar()
-            if result:
-                stmt = player_cards.update().where(
-                    player_cards.c.player_id == self.id,
-                    player_cards.c.card_id == card.id
-                ).values(quantity=result + 1)
-                db.execute(stmt)
+        add_player_cards(db, self.id, {card.id: 1})
+        db.expire(self, ["cards"])
+
+    def spend_gold(self, amount: float, db: Session) -> bool:
+        """Atomically deduct gold, refusing to let the balance go negative
+
+        One conditional UPDATE computes the accrued balance from the stored
+        base, checks it covers the price and rebases it to now, so
+        concurrent purchases never overwrite each other.
+        """
+        now = datetime.now(UTC)
+        balance = Player.base_gold + _seconds_since(db, now) * GOLD_PER_SECOND
+        stmt = (
+            update(Player)
+            .where(Player.id == self.id, balance >= amount)
+            .values(base_gold=balance - amount, last_gold_update=now)
+            .returning(Player.base_gold)
+            .execution_options(synchronize_session=False)
+        )
+        base = db.execute(stmt).scalar_one_or_none()
+        if base is None:
+            db.refresh(self, ["base_gold", "last_gold_update"])
+            return False
+        set_committed_value(self, "base_gold", base)
+        set_committed_value(self, "last_gold_update", now)
+        return True
 
     @property
     def cards_list(self):
         """Get the cards as a list of dictionaries for API responses"""
         from sqlalchemy.orm.session import object_session
-        
+
         db = object_session(self)
         if not db:
             return [
@@ -78,19 +118,101 @@ class Player(Base):
                 }
                 for card in self.cards
             ]
-            
-        result = []
-        for card in self.cards:
-            stmt = select(player_cards.c.quantity).where(
-                player_cards.c.player_id == self.id,
-                player_cards.c.card_id == card.id
-            )
-            quantity = db.execute(stmt).scalar() or 1
-            result.append({
-                "id": card.id,
-                "name": card.name,
-                "power_level": card.power_level,
-                "rarity": card.rarity,
-                "quantity": quantity,
-            })
-        return result
+
+        return get_player_collection(db, self.id)
+
+
+def get_player_collection(db: Session, player_id: int, catalog=None) -> List[Dict]:
+    """Load a player's collection as dictionaries for API responses
+
+    With a card catalog snapshot (anything with get(card_id)), this costs one
+    query on player_cards. Cards the snapshot doesn't know yet, e.g. ones
+    added since it was loaded, are read from battler_cards in one more query
+    rather than dropped. Without a snapshot, cards and quantities come from a
+    single joined query.
+    """
+    from .battler_card import BattlerCard
+
+    columns = (
+        BattlerCard.id,
+        BattlerCard.name,
+        BattlerCard.power_level,
+        BattlerCard.rarity,
+    )
+    if catalog is None:
+        rows = db.execute(
+            select(*columns, player_cards.c.quantity)
+            .join(player_cards, player_cards.c.card_id == BattlerCard.id)
+            .where(player_cards.c.player_id == player_id)
+            .order_by(BattlerCard.id)
+        )
+        return [_collection_entry(row, row.quantity) for row in rows]
+
+    quantities = db.execute(
+        select(player_cards.c.card_id, player_cards.c.quantity)
+        .where(player_cards.c.player_id == player_id)
+        .order_by(player_cards.c.card_id)
+    ).all()
+    cards = {card_id: catalog.get(card_id) for card_id, _ in quantities}
+    missing = [card_id for card_id, card in cards.items() if card is None]
+    if missing:
+        cards.update(
+            (row.id, row)
+            for row in db.execute(select(*columns).where(BattlerCard.id.in_(missing)))
+        )
+    return [
+        _collection_entry(cards[card_id], quantity)
+        for card_id, quantity in quantities
+        if cards[card_id] is not None
+    ]
+
+
+def _collection_entry(card, quantity: int) -> Dict:
+    return {
+        "id": card.id,
+        "name": card.name,
+        "power_level": card.power_level,
+        "rarity": card.rarity,
+        "quantity": quantity or 1,
+    }
+
+
+def _seconds_since(db: Session, now: datetime):
+    """SQL expression for the seconds between last_gold_update and now"""
+    # Timestamps are stored as naive UTC
+    now = literal(now.replace(tzinfo=None), DateTime)
+    if db.get_bind().dialect.name == "postgresql":
+        return func.extract("epoch", now - Player.last_gold_update)
+    return (func.julianday(now) - func.julianday(Player.last_gold_update)) * 86400.0
+
+
+def add_player_cards(db: Session, player_id: int, quantities: Mapping[int, int]):
+    """Add cards to a collection with a single upsert on player_cards
+
+    Args:
+        db: The database session
+        player_id: The ID of the player receiving the cards
+        quantities: Mapping of card ID to the number of copies to add
+    """
+    if not quantities:
+        return
+
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    stmt = insert(player_cards).values(
+        [
+            {"player_id": player_id, "card_id": card_id, "quantity": quantity}
+            for card_id, quantity in quantities.items()
+        ]
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[player_cards.c.player_id, player_cards.c.card_id],
+        set_={
+            "quantity": func.coalesce(player_cards.c.quantity, 1)
+            + stmt.excluded.quantity
+        },
+    )
+    db.execute(stmt)
@@ -1,8 +1,10 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String
 from sqlalchemy.orm import relationship
-from datetime import datetime, timedelta, UTC
-from .database import Base
+
 from .battler_card import Rarity
+from .database import Base
 
 
 class Shop(Base):
@@ -16,16 +18,23 @@ class Shop(Base):
     pack_price = Column(Integer, default=150)
     last_refresh = Column(DateTime(timezone=True), default=lambda: datetime.now(UTC))
 
-    def should_refresh(self) -> bool:
-        """Check if the shop should refresh based on time since last refresh"""
-        # Ensure both datetimes are timezone-aware
-        now = datetime.now(UTC)
+    # How long a featured card stays on offer
+    REFRESH_INTERVAL = timedelta(days=1)
+
+    @property
+    def next_refresh(self) -> datetime:
+        """When the current offer expires"""
+        # Ensure the stored datetime is timezone-aware
         last_refresh = (
             self.last_refresh.replace(tzinfo=UTC)
             if self.last_refresh.tzinfo is None
             else self.last_refresh
         )
-        return now - last_refresh > timedelta(days=1)
+        return last_refresh + self.REFRESH_INTERVAL
+
+    def should_refresh(self) -> bool:
+        """Check if the shop should refresh based on time since last refresh"""
+        return datetime.now(UTC) > self.next_refresh
 
     def refresh(self):
         """Update the last refresh time"""
@@ -1,49 +1,81 @@
-from fastapi import APIRouter, Depends, HTTPException, Body
-from sqlalchemy.orm import Session
-from typing import List
-import json
 import logging
-from datetime import datetime, UTC
-from pydantic import BaseModel
-
+from collections import Counter
+from datetime import UTC, datetime
+from typing import List, Optional
+
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import get_settings
+from ..metrics import InstrumentedRoute
+from ..models.battler_card import Rarity
 from ..models.database import get_db
-from ..models.player import Player
-from ..models.deck import Deck
-from ..models.shop import Shop, CardPack
+from ..models.deck import (
+    MAX_DECK_SIZE,
+    MIN_DECK_SIZE,
+    Deck,
+    deck_cards,
+    get_deck_cards,
+    set_deck_cards,
+)
 from ..models.dungeon import DungeonInstance
+from ..models.player import Player, get_player_collection
 from ..schemas.game import (
-    PlayerCreate,
-    PlayerResponse,
+    BulkPlayerCreate,
+    BulkPlayerResponse,
+    CardSearchResponse,
+    DeckCardsUpdate,
     DeckCreate,
+    DeckEstimateResponse,
     DeckResponse,
-    ShopResponse,
-    PurchaseResponse,
     GameState,
-    DungeonState,
+    PlayerCreate,
+    PlayerResponse,
+    ShopResponse,
 )
+from ..services.card_catalog import card_catalog
+from ..services.card_search import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, card_search
+from ..services.deck_estimator import DEFAULT_FLOORS, MAX_FLOORS, deck_estimator
+from ..services.dungeon_buffer import dungeon_buffer
+from ..services.export_service import EXPORT_FORMATS, gzip_chunks, stream_game_state
+from ..services.floor_analysis import assign_floor, dungeon_route
+from ..services.floor_pool import floor_pool
 from ..services.game_service import (
     create_starter_deck,
-    generate_dungeon_layout,
-    handle_cell_event,
-    refresh_shop,
+    get_decks,
+    move_player,
+    purchase_card_pack,
     purchase_featured_card,
     purchase_random_card,
-    purchase_card_pack,
 )
+from ..services.import_service import (
+    ImportedState,
+    apply_import,
+    from_game_state,
+    from_ndjson,
+)
+from ..services.pack_service import MAX_PACKS_PER_PURCHASE
+from ..services.provisioning import MAX_PLAYERS_PER_REQUEST, provision_players
+from ..services.shop_service import shop_service
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
-router = APIRouter()
+router = APIRouter(route_class=InstrumentedRoute)
 
 
 @router.post("/start", response_model=PlayerResponse)
-async def start_game(player: PlayerCreate, db: Session = Depends(get_db)):
+async def start_game(player: PlayerCreate, db: AsyncSession = Depends(get_db)):
     """Start a new game and create a player"""
     try:
         # Check if username already exists
-        existing_player = (
-            db.query(Player).filter(Player.username == player.username).first()
+        existing_player = await db.scalar(
+            select(Player).where(Player.username == player.username)
         )
         if existing_player:
             logger.warning(f"Username {player.username} already exists")
@@ -62,25 +94,25 @@ async def start_game(player: PlayerCreate, db: Session = Depends(get_db)):
         logger.debug(f"Player object created: {db_player.__dict__}")
 
         db.add(db_player)
-        db.flush()  # Flush to get the player ID
+        await db.flush()  # Flush to get the player ID
         logger.info(f"Player added to database with ID: {db_player.id}")
 
         try:
             # Create starter deck and initialize player's collection
             logger.info(f"Creating starter deck for player {db_player.id}")
-            starter_deck = create_starter_deck(db, db_player.id)
+            starter_deck = await create_starter_deck(db, db_player.id)
             logger.info(f"Starter deck created with ID: {starter_deck.id}")
 
-            # Refresh player to get updated cards
-            db.refresh(db_player)
-            logger.info(
-                f"Player cards initialized with {len(db_player.cards_list)} cards"
+            catalog = await card_catalog.snapshot_async(db)
+            collection = await db.run_sync(
+                get_player_collection, db_player.id, catalog
             )
+            logger.info(f"Player cards initialized with {len(collection)} cards")
         except Exception as deck_error:
             logger.error(f"Failed to create starter deck: {str(deck_error)}")
             raise
 
-        db.commit()
+        await db.commit()
         logger.info(
             f"Successfully created player {player.username} with ID {db_player.id}"
         )
@@ -91,7 +123,7 @@ async def start_game(player: PlayerCreate, db: Session = Depends(get_db)):
             "username": db_player.username,
             "gold": db_player.gold,
             "created_at": db_player.created_at,
-            "cards": db_player.cards_list,
+            "cards": collection,
         }
     except HTTPException:
         raise
@@ -99,109 +131,226 @@ async def start_game(player: PlayerCreate, db: Session = Depends(get_db)):
         logger.error(f"Failed to create player: {str(e)}")
         logger.error(f"Error type: {type(e)}")
         logger.error(f"Error details: {e.__dict__}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=500, detail=f"Failed to create player: {str(e)}"
         )
 
 
+@router.post("/players/bulk", response_model=BulkPlayerResponse)
+async def create_players_bulk(
+    request: BulkPlayerCreate, db: AsyncSession = Depends(get_db)
+):
+    """Create many players with starter decks in one transaction
+
+    Usernames that already exist are skipped and reported back.
+    """
+    if len(request.usernames) > MAX_PLAYERS_PER_REQUEST:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_PLAYERS_PER_REQUEST} players per request",
+        )
+
+    result = await db.run_sync(provision_players, request.usernames, request.gold)
+    await db.commit()
+    logger.info(
+        f"Provisioned {len(result.created)} players, skipped {len(result.skipped)}"
+    )
+    return {"created": result.created, "skipped": result.skipped}
+
+
 @router.get("/player/{player_id}", response_model=PlayerResponse)
-async def get_player(player_id: int, db: Session = Depends(get_db)):
-    """Get player information and update gold"""
-    player = db.query(Player).filter(Player.id == player_id).first()
+async def get_player(player_id: int, db: AsyncSession = Depends(get_db)):
+    """Get player information; gold is derived on read, so nothing is written"""
+    player = await db.get(Player, player_id)
     if not player:
         raise HTTPException(status_code=404, detail="Player not found")
 
-    player.update_gold()
-    db.commit()
-
+    catalog = await card_catalog.snapshot_async(db)
+    collection = await db.run_sync(get_player_collection, player.id, catalog)
     return {
         "id": player.id,
         "username": player.username,
         "gold": player.gold,
         "level": player.level,
         "created_at": player.created_at,
-        "cards": player.cards_list,
+        "cards": collection,
     }
 
 
-@router.get("/shop/{player_id}", response_model=ShopResponse)
-async def get_shop(player_id: int, db: Session = Depends(get_db)):
-    """Get shop information"""
-    shop = db.query(Shop).first()
-    if not shop:
-        # Create shop if it doesn't exist
-        shop = Shop(
-            featured_card_price=100,
-            random_card_price=50,
-            pack_price=150,
-            last_refresh=datetime.now(UTC),
-        )
-        db.add(shop)
-        db.commit()
-        db.refresh(shop)
-
-    # Check if shop needs refresh and has no featured card
-    if shop.should_refresh() or not shop.featured_card:
-        refresh_shop(db, shop)
-        db.refresh(shop)
-
-    # Convert featured card to dictionary format
-    featured_card_dict = None
-    if shop.featured_card:
-        featured_card_dict = {
-            "id": shop.featured_card.id,
-            "name": shop.featured_card.name,
-            "power_level": shop.featured_card.power_level,
-            "rarity": shop.featured_card.rarity.value,
-        }
+def _etags(header: Optional[str]) -> List[str]:
+    """Entity tags listed in an If-None-Match header, weak or strong"""
+    if not header:
+        return []
+    return [tag.strip().removeprefix("W/") for tag in header.split(",")]
 
-    return {
-        "featured_card": featured_card_dict
-        or {},  # Return empty dict if no featured card
-        "featured_card_price": shop.featured_card_price,
-        "random_card_price": shop.random_card_price,
-        "pack_price": shop.pack_price,
+
+@router.get("/shop/{player_id}", response_model=ShopResponse)
+async def get_shop(
+    player_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+):
+    """Get shop information, served from the in-memory shop offer"""
+    offer = await shop_service.current(db)
+    headers = {
+        "ETag": offer.etag,
+        "Cache-Control": f"public, max-age={offer.max_age()}",
     }
+    etags = _etags(request.headers.get("if-none-match"))
+    if offer.etag in etags or "*" in etags:
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return offer.to_dict()
 
 
 @router.post("/shop/{player_id}/buy")
 async def buy_shop_item(
     player_id: int,
     item_type: str = Body(..., embed=True),  # Change from Query to Body
-    db: Session = Depends(get_db)
+    quantity: int = Body(1, embed=True, ge=1, le=MAX_PACKS_PER_PURCHASE),
+    db: AsyncSession = Depends(get_db)
 ):
     """Purchase an item from the shop"""
-    player = db.query(Player).filter(Player.id == player_id).first()
+    player = await db.get(Player, player_id)
     if not player:
         raise HTTPException(status_code=404, detail="Player not found")
 
-    player.update_gold()
-    shop = db.query(Shop).first()
+    if item_type not in ("featured", "random", "pack"):
+        raise HTTPException(status_code=400, detail="Invalid item type")
 
+    # Charge the prices the shop is showing
+    offer = await shop_service.current(db)
     if item_type == "featured":
-        return purchase_featured_card(db, player, shop)
+        return await purchase_featured_card(db, player, offer)
     elif item_type == "random":
-        return purchase_random_card(db, player)
-    elif item_type == "pack":
-        return purchase_card_pack(db, player)
-    else:
-        raise HTTPException(status_code=400, detail="Invalid item type")
+        return await purchase_random_card(db, player, offer)
+    return await purchase_card_pack(db, player, offer, quantity)
+
+
+@router.get("/cards/search", response_model=CardSearchResponse)
+async def search_cards(
+    tag: List[str] = Query([], description="Cards must carry all of these tags"),
+    any_tag: List[str] = Query([], description="Cards must carry one of these tags"),
+    rarity: List[Rarity] = Query([]),
+    min_power: Optional[int] = None,
+    max_power: Optional[int] = None,
+    cursor: Optional[int] = Query(None, description="next_cursor of the last page"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_db),
+):
+    """Search the card catalog by tags, rarity and power level
+
+    Served from an in-memory index of the catalog, so no query touches
+    card_tags. Results are in card ID order.
+    """
+    catalog = await card_catalog.snapshot_async(db)
+    page = card_search.search(
+        catalog, tag, any_tag, rarity, min_power, max_power, cursor, limit
+    )
+    return {
+        "cards": [{**card.to_dict(), "tags": list(card.tags)} for card in page.cards],
+        "total": page.total,
+        "next_cursor": page.next_cursor,
+    }
+
+
+async def _check_cards_exist(db: AsyncSession, card_ids) -> None:
+    catalog = await card_catalog.snapshot_async(db)
+    missing = sorted(card_id for card_id in card_ids if not catalog.get(card_id))
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Unknown cards: {missing}")
+
+
+def _check_deck_size(deck: Deck) -> None:
+    if not deck.has_legal_size:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Decks must hold {MIN_DECK_SIZE} to {MAX_DECK_SIZE} cards",
+        )
 
 
 @router.post("/deck", response_model=DeckResponse)
-async def create_deck(deck: DeckCreate, db: Session = Depends(get_db)):
-    """Create a new deck"""
-    db_deck = Deck(name=deck.name)
+async def create_deck(deck: DeckCreate, db: AsyncSession = Depends(get_db)):
+    """Create a new deck from a list of card IDs (repeat an ID for copies)"""
+    if not MIN_DECK_SIZE <= len(deck.cards) <= MAX_DECK_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Decks must hold {MIN_DECK_SIZE} to {MAX_DECK_SIZE} cards",
+        )
+    quantities = Counter(deck.cards)
+    await _check_cards_exist(db, quantities)
+
+    db_deck = Deck(name=deck.name, player_id=deck.player_id)
     db.add(db_deck)
-    db.commit()
-    db.refresh(db_deck)
-    return db_deck
+    await db.flush()
+    await db.run_sync(set_deck_cards, db_deck.id, quantities)
+    await db.commit()
+    await db.refresh(db_deck)
+    return (await get_decks(db, [db_deck]))[0]
+
+
+@router.patch("/deck/{deck_id}/cards", response_model=DeckResponse)
+async def update_deck_cards(
+    deck_id: int, update: DeckCardsUpdate, db: AsyncSession = Depends(get_db)
+):
+    """Set the quantity of some cards in a deck, leaving the rest untouched"""
+    deck = await db.get(Deck, deck_id)
+    if not deck:
+        raise HTTPException(status_code=404, detail="Deck not found")
+    await _check_cards_exist(
+        db, [card_id for card_id, quantity in update.cards.items() if quantity > 0]
+    )
+
+    await db.run_sync(set_deck_cards, deck_id, update.cards)
+    # The size is summed in SQL from deck_cards, never by decoding the deck
+    await db.refresh(deck, ["card_count"])
+    try:
+        _check_deck_size(deck)
+    except HTTPException:
+        await db.rollback()
+        raise
+    await db.commit()
+    return (await get_decks(db, [deck]))[0]
+
+
+@router.get("/deck/{deck_id}/estimate", response_model=DeckEstimateResponse)
+async def estimate_deck(
+    deck_id: int,
+    floors: int = Query(DEFAULT_FLOORS, ge=100, le=MAX_FLOORS),
+    seed: Optional[int] = Query(None, ge=0),
+    db: AsyncSession = Depends(get_db),
+):
+    """Estimate a deck's floor win rate by simulating dungeon floors
+
+    Results are memoized by the deck's contents, so repeat queries return
+    straight away until the deck or the card rules change.
+
+    Args:
+        deck_id: The ID of the deck
+        floors: Number of floors to simulate
+        seed: Optional seed; by default one is derived from the deck
+    """
+    deck = await db.get(Deck, deck_id)
+    if not deck:
+        raise HTTPException(status_code=404, detail="Deck not found")
+    cards = (await db.run_sync(get_deck_cards, [deck_id])).get(deck_id, {})
+    catalog = await card_catalog.snapshot_async(db)
+
+    try:
+        result = await run_in_threadpool(
+            deck_estimator.estimate, catalog, cards, floors, seed
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"deck_id": deck_id, **result.to_dict()}
 
 
 @router.post("/dungeon/{player_id}/start")
 async def start_dungeon(
-    player_id: int, seed: int = None, db: Session = Depends(get_db)
+    player_id: int, seed: int = None, db: AsyncSession = Depends(get_db)
 ):
     """Start a new dungeon instance
 
@@ -212,47 +361,43 @@ async def start_dungeon(
     try:
         logger.info(f"Starting dungeon for player {player_id} with seed {seed}")
 
-        player = db.query(Player).filter(Player.id == player_id).first()
+        player = await db.get(Player, player_id)
         if not player:
             logger.error(f"Player {player_id} not found")
             raise HTTPException(status_code=404, detail="Player not found")
 
-        # Delete any existing dungeon instance
-        db.query(DungeonInstance).filter(
-            DungeonInstance.player_id == player_id
-        ).delete()
-
-        # Create new dungeon instance
-        dungeon = DungeonInstance(
-            player_id=player_id,
-            current_floor=1,
-            current_position=json.dumps({"x": 0, "y": 0}),
-            visited_cells=json.dumps([{"x": 0, "y": 0}]),
+        # Reuse the player's dungeon row instead of deleting and re-inserting
+        await run_in_threadpool(dungeon_buffer.discard, player_id)
+        dungeon = await db.scalar(
+            select(DungeonInstance).where(DungeonInstance.player_id == player_id)
         )
-        logger.info("Created new dungeon instance")
-
-        # Add dungeon to database first to get its ID
-        db.add(dungeon)
-        db.flush()
-        logger.info(f"Added dungeon to database with ID: {dungeon.id}")
-
-        # Generate the dungeon layout with optional seed
-        generate_dungeon_layout(dungeon, seed)
-        logger.info(f"Generated dungeon layout with seed: {seed}")
+        if not dungeon:
+            dungeon = DungeonInstance(player_id=player_id)
+            db.add(dungeon)
+        dungeon.current_floor = 1
+        dungeon.grid_size = 10
+
+        # Take a ready-made layout from the pool, or the shared seeded floor
+        assign_floor(
+            dungeon,
+            floor_pool.take(dungeon.grid_size, dungeon.current_floor, seed=seed),
+        )
+        dungeon.start_at(0, 0)
+        logger.info(f"Assigned dungeon layout with seed: {seed}")
 
-        # Commit changes and refresh the instance
-        db.commit()
-        db.refresh(dungeon)
-        logger.info("Saved dungeon to database")
+        await db.commit()
+        logger.info(f"Saved dungeon to database with ID: {dungeon.id}")
 
         # Get visible cells
         visible_cells = dungeon.get_visible_cells()
         logger.info(f"Returning {len(visible_cells)} visible cells")
         return visible_cells
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error starting dungeon: {str(e)}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=500, detail=f"Failed to start dungeon: {str(e)}"
         )
@@ -261,211 +406,276 @@ async def start_dungeon(
 class MoveRequest(BaseModel):
     x: int
     y: int
+    since_revision: Optional[int] = None
 
 
 @router.post("/dungeon/{player_id}/move")
 async def move_in_dungeon(
-    player_id: int, move: MoveRequest, db: Session = Depends(get_db)
+    player_id: int, move: MoveRequest, db: AsyncSession = Depends(get_db)
 ):
     """Move to a new position in the dungeon and get updated cell data"""
     logger.info(f"Moving player {player_id} to position ({move.x}, {move.y})")
 
-    dungeon = (
-        db.query(DungeonInstance).filter(DungeonInstance.player_id == player_id).first()
+    buffer = dungeon_buffer if get_settings().dungeon_write_behind else None
+    result = await move_player(
+        db, player_id, move.x, move.y, move.since_revision, buffer
+    )
+    logger.info(
+        f"Move successful, returning {len(result['cells'])} newly visible cells"
     )
+    return result
+
+
+@router.post("/dungeon/{player_id}/leave")
+async def leave_dungeon(player_id: int):
+    """Write any buffered dungeon state when a player disconnects"""
+    await run_in_threadpool(dungeon_buffer.evict, player_id)
+    return {"message": "Dungeon state saved"}
+
+
+@router.get("/dungeon/{player_id}/cells")
+async def sync_dungeon_cells(
+    player_id: int, since: Optional[int] = None, db: AsyncSession = Depends(get_db)
+):
+    """Resync fog of war after a reconnect
 
+    Returns the cells that changed since the given revision, or a compact
+    run-length encoded snapshot if no usable revision was supplied.
+    """
+    await run_in_threadpool(dungeon_buffer.flush_player, player_id)
+    dungeon = await db.scalar(
+        select(DungeonInstance).where(DungeonInstance.player_id == player_id)
+    )
     if not dungeon:
-        logger.error(f"No active dungeon found for player {player_id}")
         raise HTTPException(status_code=404, detail="No active dungeon")
 
-    if not dungeon.is_valid_move(move.x, move.y):
-        logger.error(
-            f"Invalid move to ({move.x}, {move.y}) from current position {dungeon.current_position}"
-        )
-        raise HTTPException(status_code=400, detail="Invalid move")
-
-    # Update position and handle cell event
-    dungeon.current_position = json.dumps({"x": move.x, "y": move.y})
-    visited = json.loads(dungeon.visited_cells)
-    visited.append({"x": move.x, "y": move.y})
-    dungeon.visited_cells = json.dumps(visited)
-
-    db.commit()
-
-    # Get only the cells that are newly visible
-    layout = json.loads(dungeon.layout)
-    newly_visible_cells = []
-    for dy in [-1, 0, 1]:
-        for dx in [-1, 0, 1]:
-            x, y = move.x + dx, move.y + dy
-            if 0 <= x < dungeon.grid_size and 0 <= y < dungeon.grid_size:
-                newly_visible_cells.append(
-                    {
-                        "x": x,
-                        "y": y,
-                        "type": layout[y][x],
-                        "is_visible": True,
-                        "is_visited": {"x": x, "y": y} in visited,
-                    }
-                )
-
-    # Get the event for the new cell
-    event = handle_cell_event(dungeon, move.x, move.y)
-    logger.info(
-        f"Move successful, returning {len(newly_visible_cells)} newly visible cells"
+    current_x, current_y = dungeon.position
+    response = {
+        "revision": dungeon.revision,
+        "grid_size": dungeon.grid_size,
+        "position": {"x": current_x, "y": current_y},
+    }
+
+    cells = dungeon.get_visibility_delta(since) if since is not None else None
+    if cells is not None:
+        response.update(mode="delta", cells=cells)
+    else:
+        response.update(mode="snapshot", cells=dungeon.get_visibility_snapshot())
+    return response
+
+
+@router.get("/dungeon/{player_id}/route")
+async def get_exit_route(player_id: int, db: AsyncSession = Depends(get_db)):
+    """Get the cheapest route from the current position to the exit
+
+    Cells are weighted by risk (see floor_analysis.CELL_COSTS), so the
+    route avoids monsters and traps when a short detour exists. Clients can
+    auto-walk it by moving to each cell in turn.
+    """
+    await run_in_threadpool(dungeon_buffer.flush_player, player_id)
+    dungeon = await db.scalar(
+        select(DungeonInstance).where(DungeonInstance.player_id == player_id)
     )
+    if not dungeon:
+        raise HTTPException(status_code=404, detail="No active dungeon")
 
+    analyzed = bool(dungeon.exit_distances)
+    route = dungeon_route(dungeon)
+    if not analyzed and dungeon.exit_distances:
+        # Keep the analysis for dungeons stored before floors were analyzed
+        await db.commit()
+
+    current_x, current_y = dungeon.position
     return {
-        "cells": newly_visible_cells,
-        "event": event,
-        "position": {"x": move.x, "y": move.y},
+        "position": {"x": current_x, "y": current_y},
+        "exit_distance": dungeon.distance_to_exit(current_x, current_y),
+        "route": [{"x": x, "y": y} for x, y in route],
     }
 
 
 @router.get("/state/{player_id}", response_model=GameState)
-async def export_game_state(player_id: int, db: Session = Depends(get_db)):
+async def export_game_state(player_id: int, db: AsyncSession = Depends(get_db)):
     """Export the full game state"""
-    player = db.query(Player).filter(Player.id == player_id).first()
+    await run_in_threadpool(dungeon_buffer.flush_player, player_id)
+    player = await db.get(Player, player_id)
     if not player:
         raise HTTPException(status_code=404, detail="Player not found")
 
     # Format active dungeon data if it exists
     active_dungeon_data = None
-    if player.active_dungeon:
-        current_pos = json.loads(player.active_dungeon.current_position)
+    dungeon = await db.scalar(
+        select(DungeonInstance).where(DungeonInstance.player_id == player_id)
+    )
+    if dungeon:
+        current_x, current_y = dungeon.position
         active_dungeon_data = {
-            "floor": player.active_dungeon.current_floor,
-            "position": {"x": current_pos["x"], "y": current_pos["y"]},
-            "visible_cells": player.active_dungeon.get_visible_cells(),
+            "floor": dungeon.current_floor,
+            "position": {"x": current_x, "y": current_y},
+            "visible_cells": dungeon.get_visible_cells(),
             "player_stats": {
                 "health": 100,  # Default stats, can be expanded later
                 "gold": player.gold,
             },
+            "layout": dungeon.layout_rows() if dungeon.layout else None,
         }
 
     # Format deck data
-    formatted_decks = []
-    for deck in player.decks:
-        try:
-            cards = (
-                json.loads(deck.cards) if isinstance(deck.cards, str) else deck.cards
-            )
-            formatted_decks.append(
-                {
-                    "id": deck.id,
-                    "name": deck.name,
-                    "card_count": len(cards),
-                    "cards": cards,
-                }
-            )
-        except (json.JSONDecodeError, TypeError):
-            logger.error(f"Failed to decode cards for deck {deck.id}")
-            formatted_decks.append(
-                {"id": deck.id, "name": deck.name, "card_count": 0, "cards": []}
-            )
+    decks = await db.scalars(select(Deck).where(Deck.player_id == player_id))
+    formatted_decks = await get_decks(db, decks.all())
 
+    catalog = await card_catalog.snapshot_async(db)
+    collection = await db.run_sync(get_player_collection, player_id, catalog)
     return {
         "player": {
             "id": player.id,
             "username": player.username,
             "gold": player.gold,
             "created_at": player.created_at,
-            "cards": player.cards_list,
+            "cards": collection,
         },
         "decks": formatted_decks,
         "active_dungeon": active_dungeon_data,
-        "collection": player.cards_list,
+        "collection": collection,
     }
 
 
-@router.post("/state/import")
-async def import_game_state(state: GameState, db: Session = Depends(get_db)):
-    """Import a game state"""
-    # Implementation would need careful validation and security checks
-    pass
+@router.get("/state/{player_id}/stream")
+async def stream_game_state_export(
+    player_id: int,
+    format: str = "ndjson",
+    gzip: bool = False,
+    db: AsyncSession = Depends(get_db),
+):
+    """Stream the full game state as it is read from the database
+
+    Args:
+        player_id: The ID of the player
+        format: "ndjson" for one typed record per line (player, card, deck,
+            dungeon), or "json" for a single GameState document
+        gzip: Compress the download with gzip
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Invalid export format")
+
+    await run_in_threadpool(dungeon_buffer.flush_player, player_id)
+    player = await db.get(Player, player_id)
+    if not player:
+        raise HTTPException(status_code=404, detail="Player not found")
+
+    media_type = "application/x-ndjson" if format == "ndjson" else "application/json"
+    filename = f"player-{player_id}.{format}"
+    body = stream_game_state(db, player, format)
+    if gzip:
+        media_type, filename = "application/gzip", f"{filename}.gz"
+        body = gzip_chunks(body)
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+_NDJSON_TYPES = ("application/x-ndjson", "application/ndjson")
+
+
+async def _read_import(request: Request) -> ImportedState:
+    """Parse an import body, streaming NDJSON rather than buffering it"""
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    try:
+        if content_type in _NDJSON_TYPES:
+            return await from_ndjson(request.stream())
+        return from_game_state(GameState.model_validate_json(await request.body()))
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+async def _apply_state(db: AsyncSession, player: Player, state: ImportedState) -> dict:
+    """Apply an imported state in one transaction, rolling back on failure"""
+    if state.dungeon is not None:
+        await run_in_threadpool(dungeon_buffer.discard, player.id)
+    try:
+        summary = await db.run_sync(apply_import, player, state)
+        await db.commit()
+        return summary
+    except ValueError as e:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+_IMPORT_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {"schema": {"$ref": "#/components/schemas/GameState"}},
+            "application/x-ndjson": {"schema": {"type": "string"}},
+        },
+    }
+}
+
+
+@router.post("/state/import", openapi_extra=_IMPORT_BODY)
+async def import_game_state(request: Request, db: AsyncSession = Depends(get_db)):
+    """Import a game state, creating the player if the username is new
+
+    Accepts a GameState JSON document, or NDJSON records as written by
+    GET /state/{player_id}/stream, which are read as they arrive.
+    """
+    state = await _read_import(request)
+    if not state.username:
+        raise HTTPException(status_code=400, detail="Import has no player record")
+
+    player = await db.scalar(select(Player).where(Player.username == state.username))
+    if not player:
+        player = Player(username=state.username)
+        db.add(player)
+    return await _apply_state(db, player, state)
 
 
 @router.delete("/player/{player_id}")
-async def delete_player(player_id: int, db: Session = Depends(get_db)):
+async def delete_player(player_id: int, db: AsyncSession = Depends(get_db)):
     """Delete a player and all associated data"""
     try:
-        player = db.query(Player).filter(Player.id == player_id).first()
+        player = await db.get(Player, player_id)
         if not player:
             raise HTTPException(status_code=404, detail="Player not found")
 
         # Delete associated data
-        db.query(Deck).filter(Deck.player_id == player_id).delete()
-        db.query(DungeonInstance).filter(
-            DungeonInstance.player_id == player_id
-        ).delete()
-        db.delete(player)
-        db.commit()
+        await run_in_threadpool(dungeon_buffer.discard, player_id)
+        player_decks = select(Deck.id).where(Deck.player_id == player_id)
+        await db.execute(
+            delete(deck_cards).where(deck_cards.c.deck_id.in_(player_decks))
+        )
+        await db.execute(delete(Deck).where(Deck.player_id == player_id))
+        await db.execute(
+            delete(DungeonInstance).where(DungeonInstance.player_id == player_id)
+        )
+        await db.delete(player)
+        await db.commit()
 
         return {"message": "Player deleted successfully"}
     except Exception as e:
         logger.error(f"Failed to delete player: {str(e)}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=500, detail=f"Failed to delete player: {str(e)}"
         )
 
 
-@router.put("/state/{player_id}")
+@router.put("/state/{player_id}", openapi_extra=_IMPORT_BODY)
 async def save_game_state(
-    player_id: int, state: GameState, db: Session = Depends(get_db)
+    player_id: int, request: Request, db: AsyncSession = Depends(get_db)
 ):
-    """Save the current game state"""
-    try:
-        player = db.query(Player).filter(Player.id == player_id).first()
-        if not player:
-            raise HTTPException(status_code=404, detail="Player not found")
+    """Save the current game state
 
-        # Update player data
-        player.gold = state.player.gold
-        player.card_collection = json.dumps(state.collection)
-
-        # Update or create dungeon instance
-        if state.active_dungeon:
-            dungeon = player.active_dungeon
-            if not dungeon:
-                dungeon = DungeonInstance(player_id=player_id)
-                db.add(dungeon)
-
-            dungeon.current_floor = state.active_dungeon.floor
-            dungeon.current_position = json.dumps(
-                {
-                    "x": state.active_dungeon.position.x,
-                    "y": state.active_dungeon.position.y,
-                }
-            )
-            dungeon.visited_cells = json.dumps(
-                [
-                    {
-                        "x": cell.x,
-                        "y": cell.y,
-                        "type": cell.type,
-                        "is_visible": cell.is_visible,
-                        "is_visited": cell.is_visited,
-                    }
-                    for cell in state.active_dungeon.visible_cells
-                ]
-            )
-
-        # Update decks
-        for deck_state in state.decks:
-            deck = (
-                db.query(Deck)
-                .filter(Deck.id == deck_state.id, Deck.player_id == player_id)
-                .first()
-            )
-            if deck:
-                deck.cards = json.dumps(deck_state.cards)
+    Takes the same bodies as POST /state/import and writes only what
+    changed. Decks missing from the state are deleted.
+    """
+    player = await db.get(Player, player_id)
+    if not player:
+        raise HTTPException(status_code=404, detail="Player not found")
 
-        db.commit()
-        return {"message": "Game state saved successfully"}
-    except Exception as e:
-        logger.error(f"Failed to save game state: {str(e)}")
-        db.rollback()
-        raise HTTPException(
-            status_code=500, detail=f"Failed to save game state: {str(e)}"
-        )
+    state = await _read_import(request)
+    await _apply_state(db, player, state)
+    return {"message": "Game state saved successfully"}
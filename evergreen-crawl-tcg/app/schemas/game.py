@@ -1,6 +1,7 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict
 from datetime import datetime
+from typing import Annotated, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
 
 
 class PlayerCreate(BaseModel):
@@ -18,9 +19,26 @@ class PlayerResponse(BaseModel):
         from_attributes = True
 
 
+class BulkPlayerCreate(BaseModel):
+    usernames: List[str] = Field(min_length=1)
+    gold: float = Field(100, ge=0)
+
+
+class BulkPlayerResponse(BaseModel):
+    created: List[Dict]
+    skipped: List[str]
+
+
 class DeckCreate(BaseModel):
     name: str
     cards: List[int] = Field(description="List of card IDs")
+    player_id: Optional[int] = None
+
+
+class DeckCardsUpdate(BaseModel):
+    cards: Dict[int, Annotated[int, Field(ge=0)]] = Field(
+        description="Card ID to quantity wanted; 0 removes the card"
+    )
 
 
 class DeckResponse(BaseModel):
@@ -28,11 +46,31 @@ class DeckResponse(BaseModel):
     name: str
     card_count: int
     cards: List[Dict]
+    is_starter: bool = False
 
     class Config:
         from_attributes = True
 
 
+class CardSearchResponse(BaseModel):
+    cards: List[Dict]
+    total: int
+    next_cursor: Optional[int] = None
+
+
+class DeckEstimateResponse(BaseModel):
+    deck_id: int
+    deck_hash: str
+    seed: int
+    floors: int
+    win_rate: float
+    win_rate_interval: Tuple[float, float]
+    fights: int
+    fight_win_rate: float
+    fight_win_rate_interval: Tuple[float, float]
+    confidence: float
+
+
 class ShopResponse(BaseModel):
     featured_card: Dict
     featured_card_price: float
@@ -64,6 +102,8 @@ class DungeonState(BaseModel):
     position: Position
     visible_cells: List[DungeonCell]
     player_stats: Dict[str, float]
+    # Every cell's type, row by row, so an import can restore the floor
+    layout: Optional[List[List[str]]] = None
 
     class Config:
         from_attributes = True
@@ -0,0 +1,252 @@
+import random
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session, selectinload
+
+from ..models.battler_card import BattlerCard, Rarity
+from ..models.card_effect import CardEffect, EffectType
+from ..models.shop import CardPack
+from ..models.tag import Tag
+
+
+@dataclass(frozen=True)
+class CatalogEffect:
+    """Detached, read-only copy of a CardEffect"""
+
+    id: int
+    effect_type: EffectType
+    speed_value: Optional[int]
+    description: Optional[str]
+    trigger_condition: Optional[str]
+
+
+@dataclass(frozen=True)
+class CatalogCard:
+    """Detached, read-only copy of a BattlerCard with its tags and effects"""
+
+    id: int
+    name: str
+    power_level: int
+    rarity: Rarity
+    effect_description: Optional[str]
+    tags: Tuple[str, ...] = ()
+    effects: Tuple[CatalogEffect, ...] = ()
+
+    def to_dict(self):
+        """Convert card to dictionary for JSON serialization"""
+        return {
+            "id": self.id,
+            "name": self.name,
+            "power_level": self.power_level,
+            "rarity": self.rarity,
+            "effect_description": self.effect_description,
+        }
+
+
+@dataclass
+class CatalogSnapshot:
+    """Immutable view of the card table, bucketed and indexed for lookups"""
+
+    cards: Tuple[CatalogCard, ...]
+    generation: int
+    by_id: Dict[int, CatalogCard] = field(init=False)
+    by_name: Dict[str, CatalogCard] = field(init=False)
+    by_rarity: Dict[Rarity, Tuple[CatalogCard, ...]] = field(init=False)
+
+    def __post_init__(self):
+        self.by_id = {card.id: card for card in self.cards}
+        self.by_name = {card.name: card for card in self.cards}
+        self.by_rarity = {
+            rarity: tuple(card for card in self.cards if card.rarity == rarity)
+            for rarity in Rarity
+        }
+        self._build_alias_table()
+
+    def _build_alias_table(self):
+        """Build a Walker alias table over the non-empty rarity buckets
+
+        Rarities without cards are left out and the remaining weights are
+        renormalized, so every draw lands on a real card.
+        """
+        rarities = [
+            rarity for rarity in CardPack.RARITY_WEIGHTS if self.by_rarity[rarity]
+        ]
+        self._alias_rarities = rarities
+        if not rarities:
+            self._alias_prob, self._alias = [], []
+            return
+
+        total = sum(CardPack.RARITY_WEIGHTS[rarity] for rarity in rarities)
+        count = len(rarities)
+        scaled = [
+            CardPack.RARITY_WEIGHTS[rarity] * count / total for rarity in rarities
+        ]
+        prob, alias = [1.0] * count, list(range(count))
+        small = [i for i, weight in enumerate(scaled) if weight < 1.0]
+        large = [i for i, weight in enumerate(scaled) if weight >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            prob[less], alias[less] = scaled[less], more
+            scaled[more] -= 1.0 - scaled[less]
+            (small if scaled[more] < 1.0 else large).append(more)
+        self._alias_prob, self._alias = prob, alias
+
+    def get(self, card_id: int) -> Optional[CatalogCard]:
+        return self.by_id.get(card_id)
+
+    def get_by_name(self, name: str) -> Optional[CatalogCard]:
+        return self.by_name.get(name)
+
+    def random_card(self, rng: random.Random = None) -> Optional[CatalogCard]:
+        """Pick a card uniformly from the whole catalog"""
+        if not self.cards:
+            return None
+        rng = rng or random
+        return self.cards[rng.randrange(len(self.cards))]
+
+    def weighted_card(self, rng: random.Random = None) -> Optional[CatalogCard]:
+        """Pick a card using CardPack.RARITY_WEIGHTS in O(1)"""
+        if not self._alias_rarities:
+            return None
+        rng = rng or random
+        slot = rng.randrange(len(self._alias_rarities))
+        if rng.random() >= self._alias_prob[slot]:
+            slot = self._alias[slot]
+        bucket = self.by_rarity[self._alias_rarities[slot]]
+        return bucket[rng.randrange(len(bucket))]
+
+    def weighted_cards(
+        self, count: int, rng: random.Random = None
+    ) -> List[CatalogCard]:
+        """Pick several cards using CardPack.RARITY_WEIGHTS"""
+        if not self._alias_rarities:
+            return []
+        return [self.weighted_card(rng) for _ in range(count)]
+
+
+class CardCatalog:
+    """Process-wide, read-mostly cache of the battler card catalog
+
+    The catalog is loaded once (cards, tags and effects in three queries)
+    and served from memory until a card, tag or effect is written through
+    the ORM. Writes made with raw SQL must call invalidate() themselves.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._generation = 0
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._snapshot is not None
+
+    def snapshot(self, db: Session) -> CatalogSnapshot:
+        """Get the current catalog, loading it from the database if needed"""
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot
+
+        with self._lock:
+            if self._snapshot is None:
+                generation = self._generation
+                snapshot = self._load(db, generation)
+                # Only publish if nothing was invalidated while loading
+                if generation == self._generation:
+                    self._snapshot = snapshot
+                return snapshot
+            return self._snapshot
+
+    async def snapshot_async(self, db: AsyncSession) -> CatalogSnapshot:
+        """Async variant of snapshot() for AsyncSession callers
+
+        The thread lock can't be held across an await without stalling the
+        event loop, so concurrent cold loads may each read the catalog;
+        the first to finish publishes its snapshot.
+        """
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot
+
+        generation = self._generation
+        snapshot = await db.run_sync(self._load, generation)
+        with self._lock:
+            if self._snapshot is not None:
+                return self._snapshot
+            if generation == self._generation:
+                self._snapshot = snapshot
+        return snapshot
+
+    def invalidate(self) -> None:
+        """Drop the cached catalog so the next access reloads it"""
+        self._generation += 1
+        self._snapshot = None
+
+    @staticmethod
+    def _load(db: Session, generation: int) -> CatalogSnapshot:
+        cards = db.scalars(
+            select(BattlerCard)
+            .options(selectinload(BattlerCard.tags), selectinload(BattlerCard.effects))
+            .order_by(BattlerCard.id)
+        ).all()
+        return CatalogSnapshot(
+            cards=tuple(
+                CatalogCard(
+                    id=card.id,
+                    name=card.name,
+                    power_level=card.power_level,
+                    rarity=card.rarity,
+                    effect_description=card.effect_description,
+                    tags=tuple(sorted(tag.name for tag in card.tags)),
+                    effects=tuple(
+                        CatalogEffect(
+                            id=effect.id,
+                            effect_type=effect.effect_type,
+                            speed_value=effect.speed_value,
+                            description=effect.description,
+                            trigger_condition=effect.trigger_condition,
+                        )
+                        for effect in sorted(card.effects, key=lambda e: e.id)
+                    ),
+                )
+                for card in cards
+            ),
+            generation=generation,
+        )
+
+
+card_catalog = CardCatalog()
+
+
+@event.listens_for(BattlerCard, "after_insert")
+@event.listens_for(BattlerCard, "after_update")
+@event.listens_for(BattlerCard, "after_delete")
+@event.listens_for(CardEffect, "after_insert")
+@event.listens_for(CardEffect, "after_update")
+@event.listens_for(CardEffect, "after_delete")
+@event.listens_for(Tag, "after_insert")
+@event.listens_for(Tag, "after_update")
+@event.listens_for(Tag, "after_delete")
+def _on_catalog_change(mapper, connection, target):
+    card_catalog.invalidate()
+    # Invalidate again on commit so a reload that raced with this flush
+    # cannot keep serving the pre-commit rows
+    session = object_session(target)
+    if session is not None:
+        session.info["card_catalog_dirty"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _on_commit(session):
+    if session.info.pop("card_catalog_dirty", False):
+        card_catalog.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _on_rollback(session):
+    if session.info.pop("card_catalog_dirty", False):
+        card_catalog.invalidate()
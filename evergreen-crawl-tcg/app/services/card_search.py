@@ -0,0 +1,191 @@
+import threading
+from dataclasses import dataclass
+from functools import reduce
+from operator import and_, or_
+from typing import Dict, Iterable, List, Optional
+
+from ..models.battler_card import Rarity
+from .card_catalog import CatalogCard, CatalogSnapshot
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def _add(buckets: Dict, key, bit: int) -> None:
+    buckets[key] = buckets.get(key, 0) | bit
+
+
+def _discard(buckets: Dict, key, bit: int) -> None:
+    remaining = buckets.get(key, 0) & ~bit
+    if remaining:
+        buckets[key] = remaining
+    else:
+        buckets.pop(key, None)
+
+
+@dataclass
+class SearchPage:
+    cards: List[CatalogCard]
+    total: int
+    # Pass back as cursor for the next page; None on the last page
+    next_cursor: Optional[int]
+
+
+class SearchIndex:
+    """Inverted index over a catalog snapshot
+
+    Every bucket is a bitmap held in a Python int, with bit n set when the
+    card with ID n is in it. Queries are a handful of AND/OR operations on
+    these ints, and since bits are ordered by card ID, a cursor is just the
+    last card ID returned.
+    """
+
+    def __init__(self, catalog: CatalogSnapshot):
+        self.catalog = catalog
+        self.everything = 0
+        self.tags: Dict[str, int] = {}
+        self.rarities: Dict[Rarity, int] = {}
+        self.powers: Dict[int, int] = {}
+        for card in catalog.cards:
+            self._insert(card)
+
+    def _insert(self, card: CatalogCard) -> None:
+        bit = 1 << card.id
+        self.everything |= bit
+        for tag in card.tags:
+            _add(self.tags, tag.casefold(), bit)
+        _add(self.rarities, card.rarity, bit)
+        _add(self.powers, card.power_level, bit)
+
+    def _remove(self, card: CatalogCard) -> None:
+        bit = 1 << card.id
+        self.everything &= ~bit
+        for tag in card.tags:
+            _discard(self.tags, tag.casefold(), bit)
+        _discard(self.rarities, card.rarity, bit)
+        _discard(self.powers, card.power_level, bit)
+
+    def updated(self, catalog: CatalogSnapshot) -> "SearchIndex":
+        """A copy of this index moved onto a newer snapshot
+
+        Only cards that were added, removed or changed since this index's
+        snapshot are re-indexed.
+        """
+        index = SearchIndex.__new__(SearchIndex)
+        index.catalog = catalog
+        index.everything = self.everything
+        index.tags = dict(self.tags)
+        index.rarities = dict(self.rarities)
+        index.powers = dict(self.powers)
+
+        old, new = self.catalog.by_id, catalog.by_id
+        for card_id, card in old.items():
+            if new.get(card_id) != card:
+                index._remove(card)
+        for card_id, card in new.items():
+            if old.get(card_id) != card:
+                index._insert(card)
+        return index
+
+    def match(
+        self,
+        all_tags: Iterable[str] = (),
+        any_tags: Iterable[str] = (),
+        rarities: Iterable[Rarity] = (),
+        min_power: Optional[int] = None,
+        max_power: Optional[int] = None,
+    ) -> int:
+        """Bitmap of the cards matching every filter given
+
+        Args:
+            all_tags: Cards must carry every one of these tags
+            any_tags: Cards must carry at least one of these tags
+            rarities: Cards must have one of these rarities
+            min_power: Lowest power level, inclusive
+            max_power: Highest power level, inclusive
+        """
+        mask = self.everything
+        all_tags, any_tags, rarities = list(all_tags), list(any_tags), list(rarities)
+        if all_tags:
+            mask &= reduce(and_, (self.tags.get(tag.casefold(), 0) for tag in all_tags))
+        if any_tags:
+            mask &= reduce(or_, (self.tags.get(tag.casefold(), 0) for tag in any_tags))
+        if rarities:
+            mask &= reduce(or_, (self.rarities.get(rarity, 0) for rarity in rarities))
+        if min_power is not None or max_power is not None:
+            low = float("-inf") if min_power is None else min_power
+            high = float("inf") if max_power is None else max_power
+            mask &= reduce(
+                or_,
+                (bits for power, bits in self.powers.items() if low <= power <= high),
+                0,
+            )
+        return mask
+
+    def page(
+        self, mask: int, cursor: Optional[int] = None, limit: int = DEFAULT_PAGE_SIZE
+    ) -> SearchPage:
+        """Cards in a bitmap in ID order, starting after the cursor card ID"""
+        start = 0 if cursor is None else max(cursor + 1, 0)
+        remaining = mask >> start
+        cards = []
+        while remaining and len(cards) < limit:
+            lowest = remaining & -remaining
+            card_id = start + lowest.bit_length() - 1
+            cards.append(self.catalog.by_id[card_id])
+            remaining ^= lowest
+        next_cursor = cards[-1].id if remaining and cards else None
+        return SearchPage(cards=cards, total=mask.bit_count(), next_cursor=next_cursor)
+
+
+class CardSearch:
+    """Keeps a SearchIndex in step with the card catalog
+
+    The index follows the catalog's snapshots. When a new snapshot appears,
+    it is built from the previous index by re-indexing only the cards
+    that differ, rather than from scratch.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index: Optional[SearchIndex] = None
+
+    def index(self, catalog: CatalogSnapshot) -> SearchIndex:
+        index = self._index
+        if index is not None and index.catalog is catalog:
+            return index
+        with self._lock:
+            index = self._index
+            if index is None:
+                index = SearchIndex(catalog)
+            elif index.catalog is not catalog:
+                if catalog.generation < index.catalog.generation:
+                    # A straggling older snapshot; don't replace the newer index
+                    return SearchIndex(catalog)
+                index = index.updated(catalog)
+            self._index = index
+            return index
+
+    def search(
+        self,
+        catalog: CatalogSnapshot,
+        all_tags: Iterable[str] = (),
+        any_tags: Iterable[str] = (),
+        rarities: Iterable[Rarity] = (),
+        min_power: Optional[int] = None,
+        max_power: Optional[int] = None,
+        cursor: Optional[int] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+    ) -> SearchPage:
+        """Search the catalog by tags, rarity and power, one page at a time"""
+        index = self.index(catalog)
+        mask = index.match(all_tags, any_tags, rarities, min_power, max_power)
+        return index.page(mask, cursor, limit)
+
+    def invalidate(self) -> None:
+        """Drop the index so the next search builds it from scratch"""
+        with self._lock:
+            self._index = None
+
+
+card_search = CardSearch()
@@ -0,0 +1,583 @@
+import os
+import random
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..models.card_effect import EffectType
+from .card_catalog import CatalogSnapshot
+from .dungeon_generator import spawn_seeds
+from .rule_compiler import rule_cache
+
+HAND_SIZE = 5
+INITIATIVE_DIE = 6
+# Fights resolved per array pass; bounds memory at roughly 10 MB per chunk
+SIMULATION_CHUNK_SIZE = 65_536
+
+# Effect codes in the compiled tables; 0 marks an empty slot
+NO_EFFECT = 0
+EFFECT_CODES = {
+    EffectType.SPEED: 1,
+    EffectType.ENERGY: 2,
+    EffectType.CONDITIONAL: 3,
+    EffectType.INTERRUPT: 4,
+    EffectType.COUNTER: 5,
+    EffectType.EARLY_ATTACK: 6,
+}
+EFFECT_TYPES_BY_CODE = {code: effect for effect, code in EFFECT_CODES.items()}
+SPEED = EFFECT_CODES[EffectType.SPEED]
+ENERGY = EFFECT_CODES[EffectType.ENERGY]
+CONDITIONAL = EFFECT_CODES[EffectType.CONDITIONAL]
+INTERRUPT = EFFECT_CODES[EffectType.INTERRUPT]
+COUNTER = EFFECT_CODES[EffectType.COUNTER]
+EARLY_ATTACK = EFFECT_CODES[EffectType.EARLY_ATTACK]
+
+# Condition slots: no condition triggers always, an unknown tag never
+ALWAYS, NEVER = -1, -2
+
+PLAYER, MONSTER = 0, 1
+
+# Named monster abilities as (effect, speed, value)
+MONSTER_ABILITIES = {
+    "Power Strike": ((EffectType.EARLY_ATTACK, 3, 3),),
+}
+
+
+@dataclass(frozen=True)
+class Monster:
+    name: str
+    power_level: int
+    effects: Tuple[Tuple[EffectType, int, int], ...] = ()
+
+    @classmethod
+    def from_encounter(cls, data: Dict) -> "Monster":
+        """Build a monster from a combat or miniboss encounter's data"""
+        enemy = data["enemy"]
+        return cls(
+            name=enemy["name"],
+            power_level=int(enemy["power_level"]),
+            effects=MONSTER_ABILITIES.get(enemy.get("special_ability"), ()),
+        )
+
+
+@dataclass
+class EffectTable:
+    """A catalog's compiled card rules laid out as padded arrays
+
+    Row i describes the card card_ids[i]; effect columns are padded with
+    NO_EFFECT up to the most effects any card has.
+    """
+
+    card_ids: np.ndarray  # (cards,)
+    names: Tuple[str, ...]
+    power: np.ndarray  # (cards,)
+    kind: np.ndarray  # (cards, effects)
+    speed: np.ndarray  # (cards, effects)
+    value: np.ndarray  # (cards, effects)
+    condition: np.ndarray  # (cards, effects): tag column, ALWAYS or NEVER
+    count: np.ndarray  # (cards, effects): other cards needed with the tag
+    initiative: np.ndarray  # (cards, effects): only when acting first
+    tags: np.ndarray  # (cards, tags) bool
+    index: Dict[int, int] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.index = {int(card_id): i for i, card_id in enumerate(self.card_ids)}
+
+    def rows(self, card_ids: Sequence[int]) -> np.ndarray:
+        """Table rows for card IDs
+
+        Raises:
+            ValueError: If a card is not in the catalog
+        """
+        try:
+            return np.array([self.index[card_id] for card_id in card_ids], np.intp)
+        except KeyError as e:
+            raise ValueError(f"Unknown card: {e.args[0]}")
+
+
+def compile_effect_table(catalog: CatalogSnapshot) -> EffectTable:
+    """Lay out a catalog snapshot's compiled card rules as arrays"""
+    compiled = [rule_cache.rules(card) for card in catalog.cards]
+    tag_names = sorted({tag for card in compiled for tag in card.tags})
+    tag_columns = {tag: i for i, tag in enumerate(tag_names)}
+    width = max((len(card.effects) for card in compiled), default=0)
+
+    shape = (len(compiled), width)
+    kind = np.zeros(shape, np.int8)
+    speed = np.zeros(shape, np.int32)
+    value = np.zeros(shape, np.int32)
+    condition = np.full(shape, ALWAYS, np.int32)
+    count = np.zeros(shape, np.int32)
+    initiative = np.zeros(shape, bool)
+    tags = np.zeros((len(compiled), len(tag_names)), bool)
+
+    for row, card in enumerate(compiled):
+        for tag in card.tags:
+            tags[row, tag_columns[tag]] = True
+        for column, effect in enumerate(card.effects):
+            kind[row, column] = EFFECT_CODES[effect.effect_type]
+            speed[row, column] = effect.speed
+            value[row, column] = effect.value
+            rule = effect.condition
+            if rule.never:
+                condition[row, column] = NEVER
+            elif rule.tag is not None:
+                condition[row, column] = tag_columns.get(rule.tag, NEVER)
+            count[row, column] = rule.count
+            initiative[row, column] = rule.initiative
+
+    cards = catalog.cards
+    return EffectTable(
+        card_ids=np.array([card.id for card in cards], np.int64),
+        names=tuple(card.name for card in cards),
+        power=np.array([card.power_level for card in cards], np.int32),
+        kind=kind,
+        speed=speed,
+        value=value,
+        condition=condition,
+        count=count,
+        initiative=initiative,
+        tags=tags,
+    )
+
+
+_table_lock = threading.Lock()
+_table_cache: Optional[Tuple[CatalogSnapshot, EffectTable]] = None
+
+
+def effect_table(catalog: CatalogSnapshot) -> EffectTable:
+    """The compiled table for a catalog snapshot, compiled once per snapshot"""
+    global _table_cache
+    cached = _table_cache
+    if cached is not None and cached[0] is catalog:
+        return cached[1]
+    with _table_lock:
+        if _table_cache is None or _table_cache[0] is not catalog:
+            _table_cache = (catalog, compile_effect_table(catalog))
+        return _table_cache[1]
+
+
+def _stack(table: EffectTable, hands: np.ndarray, monster: Monster, player_first):
+    """Lay out each fight's effects in resolution order
+
+    Returns (kind, speed, value, owner) arrays of shape (fights, slots).
+    Effects whose conditions don't hold are blanked.
+    """
+    fights, hand_size = hands.shape
+    width = table.kind.shape[1]
+
+    kind = table.kind[hands].reshape(fights, hand_size * width)
+    speed = table.speed[hands].reshape(fights, hand_size * width)
+    value = table.value[hands].reshape(fights, hand_size * width)
+    condition = table.condition[hands].reshape(fights, hand_size * width)
+    count = table.count[hands].reshape(fights, hand_size * width)
+
+    met = condition == ALWAYS
+    if table.tags.shape[1]:
+        held = table.tags[hands]  # (fights, hand, tags)
+        column = np.maximum(condition, 0)
+        position = np.repeat(np.arange(hand_size), width)
+        others = np.take_along_axis(held.sum(axis=1), column, axis=1) - held[
+            np.arange(fights)[:, None], position[None, :], column
+        ]
+        met |= (condition >= 0) & (others >= count)
+    initiative = table.initiative[hands].reshape(fights, hand_size * width)
+    met &= ~initiative | np.asarray(player_first)[:, None]
+    kind = np.where(met, kind, NO_EFFECT)
+
+    owner = np.zeros(kind.shape[1] + len(monster.effects), np.int8)
+    owner[kind.shape[1]:] = MONSTER
+    if monster.effects:
+        extra = np.array(
+            [(EFFECT_CODES[effect], spd, val) for effect, spd, val in monster.effects],
+            np.int32,
+        )
+        kind = np.hstack([kind, np.broadcast_to(extra[:, 0], (fights, len(extra)))])
+        speed = np.hstack([speed, np.broadcast_to(extra[:, 1], (fights, len(extra)))])
+        value = np.hstack([value, np.broadcast_to(extra[:, 2], (fights, len(extra)))])
+    owner = np.broadcast_to(owner, kind.shape)
+
+    # Fastest first; at equal speed the initiative holder acts first
+    second = (owner == PLAYER) != np.asarray(player_first)[:, None]
+    order = np.argsort(-2 * speed.astype(np.int64) + second, axis=1, kind="stable")
+    return tuple(
+        np.take_along_axis(array, order, axis=1)
+        for array in (kind, speed, value, owner)
+    )
+
+
+@dataclass
+class _Sides:
+    """Per-side combat state, indexed by PLAYER and MONSTER
+
+    Lists for a single fight, or (fights, 2) arrays for a batch.
+    """
+
+    total: list
+    energy: list
+    interrupts: list
+    counters: list
+
+
+# Batch actions: apply one effect type where mask is set, across fights
+def _batch_power(sides, rows, mask, own, opp, value):
+    sides.total[rows, own] += np.where(mask, value, 0)
+
+
+def _batch_energy(sides, rows, mask, own, opp, value):
+    sides.energy[rows, own] += np.where(mask, value, 0)
+
+
+def _batch_interrupt(sides, rows, mask, own, opp, value):
+    sides.interrupts[rows, own] += mask
+
+
+def _batch_counter(sides, rows, mask, own, opp, value):
+    sides.counters[rows, own] += mask
+
+
+def _batch_early_attack(sides, rows, mask, own, opp, value):
+    damage = np.where(mask, value + sides.energy[rows, own], 0)
+    sides.energy[rows, own] = np.where(mask, 0, sides.energy[rows, own])
+    reflected = mask & (sides.counters[rows, opp] > 0)
+    sides.counters[rows, opp] -= reflected
+    sides.total[rows, np.where(reflected, own, opp)] -= damage
+
+
+BATCH_ACTIONS = {
+    SPEED: _batch_power,
+    ENERGY: _batch_energy,
+    CONDITIONAL: _batch_power,
+    INTERRUPT: _batch_interrupt,
+    COUNTER: _batch_counter,
+    EARLY_ATTACK: _batch_early_attack,
+}
+
+
+# Single-fight actions: the same rules, logging into entry
+def _fight_power(sides, own, opp, value, entry):
+    sides.total[own] += value
+
+
+def _fight_energy(sides, own, opp, value, entry):
+    sides.energy[own] += value
+
+
+def _fight_interrupt(sides, own, opp, value, entry):
+    sides.interrupts[own] += 1
+
+
+def _fight_counter(sides, own, opp, value, entry):
+    sides.counters[own] += 1
+
+
+def _fight_early_attack(sides, own, opp, value, entry):
+    damage, sides.energy[own] = value + sides.energy[own], 0
+    target = opp
+    if sides.counters[opp]:
+        sides.counters[opp] -= 1
+        target = own
+        entry["countered"] = True
+    sides.total[target] -= damage
+    entry["damage"] = damage
+
+
+FIGHT_ACTIONS = {
+    SPEED: _fight_power,
+    ENERGY: _fight_energy,
+    CONDITIONAL: _fight_power,
+    INTERRUPT: _fight_interrupt,
+    COUNTER: _fight_counter,
+    EARLY_ATTACK: _fight_early_attack,
+}
+
+
+def resolve_fights(
+    table: EffectTable, hands: np.ndarray, monster: Monster, player_first: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Resolve a batch of fights as arrays
+
+    Both sides start from their total power. Effects then resolve fastest
+    first, one vectorized step per stack position across every fight:
+
+    - Speed: +speed_value power
+    - Energy: +1 energy, spent in full as extra damage by the owner's next
+      early attack; energy left at the end counts as power
+    - Conditional: +the card's power
+    - Interrupt: cancels the next opposing effect
+    - Counter: turns the next opposing early attack back on its owner
+    - Early attack: takes the card's power plus stored energy off the
+      opposing total
+
+    An effect with a trigger_condition only resolves if the condition holds
+    for the hand (see rule_compiler.parse_condition). The higher total
+    wins; the initiative holder wins ties.
+
+    Args:
+        table: The compiled effect table
+        hands: (fights, hand size) table rows of each fight's hand
+        monster: The monster every fight is against
+        player_first: (fights,) whether the player won initiative
+
+    Returns:
+        (won, player_total, monster_total), each of shape (fights,)
+    """
+    kind, _, value, owner = _stack(table, hands, monster, player_first)
+    fights = len(hands)
+    rows = np.arange(fights)
+
+    sides = _Sides(*(np.zeros((fights, 2), np.int64) for _ in range(4)))
+    sides.total[:, PLAYER] = table.power[hands].sum(axis=1)
+    sides.total[:, MONSTER] = monster.power_level
+
+    for slot in range(kind.shape[1]):
+        k, v, own = kind[:, slot], value[:, slot], owner[:, slot]
+        opp = 1 - own
+
+        cancelled = (k != NO_EFFECT) & (sides.interrupts[rows, opp] > 0)
+        sides.interrupts[rows, opp] -= cancelled
+        k = np.where(cancelled, NO_EFFECT, k)
+
+        for code, action in BATCH_ACTIONS.items():
+            mask = k == code
+            if mask.any():
+                action(sides, rows, mask, own, opp, v)
+
+    total = sides.total + sides.energy
+    won = (total[:, PLAYER] > total[:, MONSTER]) | (
+        (total[:, PLAYER] == total[:, MONSTER]) & player_first
+    )
+    return won, total[:, PLAYER], total[:, MONSTER]
+
+
+@dataclass
+class CombatResult:
+    won: bool
+    player_power: int
+    monster_power: int
+    player_first: bool
+    log: List[Dict] = field(default_factory=list)
+
+
+def resolve_fight(
+    table: EffectTable,
+    hand: Sequence[int],
+    monster: Monster,
+    player_first: bool,
+) -> CombatResult:
+    """Resolve one fight step by step, logging each effect
+
+    Gives the same outcome as resolve_fights() for the same hand.
+
+    Args:
+        table: The compiled effect table
+        hand: Card IDs in the hand
+        monster: The monster fought
+        player_first: Whether the player won initiative
+    """
+    rows = table.rows(hand)
+    kind, speed, value, owner = (
+        array[0] for array in _stack(table, rows[None, :], monster, [player_first])
+    )
+    power = [int(table.power[rows].sum()), monster.power_level]
+    sides = _Sides(power, [0, 0], [0, 0], [0, 0])
+    log = []
+
+    for k, spd, v, own in zip(
+        kind.tolist(), speed.tolist(), value.tolist(), owner.tolist()
+    ):
+        if k == NO_EFFECT:
+            continue
+        opp = 1 - own
+        entry = {
+            "side": "player" if own == PLAYER else "monster",
+            "effect": EFFECT_TYPES_BY_CODE[k].value,
+            "speed": spd,
+        }
+        log.append(entry)
+        if sides.interrupts[opp]:
+            sides.interrupts[opp] -= 1
+            entry["interrupted"] = True
+            continue
+
+        FIGHT_ACTIONS[k](sides, own, opp, v, entry)
+        entry["totals"] = {
+            "player": sides.total[PLAYER],
+            "monster": sides.total[MONSTER],
+        }
+
+    player_power = sides.total[PLAYER] + sides.energy[PLAYER]
+    monster_power = sides.total[MONSTER] + sides.energy[MONSTER]
+    return CombatResult(
+        won=player_power > monster_power
+        or (player_power == monster_power and player_first),
+        player_power=player_power,
+        monster_power=monster_power,
+        player_first=player_first,
+        log=log,
+    )
+
+
+def roll_initiative(rng, fights: int) -> np.ndarray:
+    """Whether the player wins initiative in each fight, as a bool array"""
+    player = rng.integers(1, INITIATIVE_DIE + 1, fights)
+    monster = rng.integers(1, INITIATIVE_DIE + 1, fights)
+    coin = rng.random(fights) < 0.5
+    return (player > monster) | ((player == monster) & coin)
+
+
+def draw_hands(rng, deck: np.ndarray, fights: int, hand_size: int = HAND_SIZE):
+    """Draw a hand per fight from a deck of table rows, without replacement"""
+    keys = rng.random((fights, len(deck)))
+    return deck[np.argpartition(keys, hand_size - 1, axis=1)[:, :hand_size]]
+
+
+def deck_rows(table: EffectTable, deck: Mapping[int, int]) -> np.ndarray:
+    """Table rows for a deck of card ID to quantity, one row per copy
+
+    Raises:
+        ValueError: If a card is unknown or the deck can't fill a hand
+    """
+    card_ids = list(deck)
+    rows = np.repeat(table.rows(card_ids), [deck[card_id] for card_id in card_ids])
+    if len(rows) < HAND_SIZE:
+        raise ValueError(f"A deck needs at least {HAND_SIZE} cards to fight")
+    return rows
+
+
+def fight(
+    table: EffectTable,
+    deck: Mapping[int, int],
+    monster: Monster,
+    rng: np.random.Generator = None,
+) -> CombatResult:
+    """Draw a hand from a deck, roll initiative and resolve the fight"""
+    rng = rng or np.random.default_rng()
+    rows = deck_rows(table, deck)
+    hand = draw_hands(rng, rows, 1)[0]
+    return resolve_fight(
+        table,
+        [int(table.card_ids[row]) for row in hand],
+        monster,
+        bool(roll_initiative(rng, 1)[0]),
+    )
+
+
+@dataclass
+class SimulationResult:
+    fights: int = 0
+    wins: int = 0
+    margin_total: int = 0
+    # Per card ID: fights the card was drawn in, and how many were won
+    card_fights: Dict[int, int] = field(default_factory=dict)
+    card_wins: Dict[int, int] = field(default_factory=dict)
+
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.fights if self.fights else 0.0
+
+    @property
+    def mean_margin(self) -> float:
+        """Average player total minus monster total"""
+        return self.margin_total / self.fights if self.fights else 0.0
+
+
+def _simulate_chunk(
+    table: EffectTable, deck: np.ndarray, monster: Monster, fights: int, seed: int
+):
+    rng = np.random.default_rng(seed)
+    hands = draw_hands(rng, deck, fights)
+    player_first = roll_initiative(rng, fights)
+    won, player_total, monster_total = resolve_fights(
+        table, hands, monster, player_first
+    )
+    # A card drawn twice in one hand counts once for that fight
+    hands.sort(axis=1)
+    first = np.ones(hands.shape, bool)
+    first[:, 1:] = hands[:, 1:] != hands[:, :-1]
+    cards = len(table.card_ids)
+    return (
+        int(won.sum()),
+        int((player_total - monster_total).sum()),
+        np.bincount(hands[first], minlength=cards),
+        np.bincount(hands[first & won[:, None]], minlength=cards),
+    )
+
+
+_worker_state = None
+
+
+def _init_worker(table: EffectTable, deck: np.ndarray, monster: Monster) -> None:
+    # Ship the table to each worker once rather than with every chunk
+    global _worker_state
+    _worker_state = (table, deck, monster)
+
+
+def _worker_chunk(fights: int, seed: int):
+    return _simulate_chunk(*_worker_state, fights, seed)
+
+
+def simulate(
+    table: EffectTable,
+    deck: Mapping[int, int],
+    monster: Monster,
+    fights: int,
+    seed: Optional[int] = None,
+    workers: Optional[int] = None,
+    chunk_size: int = SIMULATION_CHUNK_SIZE,
+) -> SimulationResult:
+    """Simulate many fights of a deck against a monster for balance testing
+
+    Fights are split into chunks with independent seeds derived from seed,
+    so a seeded run gives the same result whatever the number of workers.
+
+    Args:
+        table: The compiled effect table
+        deck: Card ID to quantity
+        monster: The monster every fight is against
+        fights: Number of fights to simulate
+        seed: Optional seed for a reproducible run
+        workers: Processes to spread chunks over; defaults to one per CPU,
+            and 1 runs everything in this process
+        chunk_size: Fights resolved per array pass
+
+    Raises:
+        ValueError: If a card is unknown or the deck can't fill a hand
+    """
+    rows = deck_rows(table, deck)
+    sizes = [chunk_size] * (fights // chunk_size)
+    if fights % chunk_size:
+        sizes.append(fights % chunk_size)
+    seed = random.getrandbits(64) if seed is None else seed
+    seeds = spawn_seeds(seed, len(sizes))
+    workers = min(workers or os.cpu_count() or 1, len(sizes) or 1)
+
+    if workers == 1:
+        chunks = [
+            _simulate_chunk(table, rows, monster, size, chunk_seed)
+            for size, chunk_seed in zip(sizes, seeds)
+        ]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(table, rows, monster),
+        ) as pool:
+            chunks = list(pool.map(_worker_chunk, sizes, seeds))
+
+    result = SimulationResult(fights=fights)
+    card_fights = np.zeros(len(table.card_ids), np.int64)
+    card_wins = np.zeros(len(table.card_ids), np.int64)
+    for wins, margin, drawn, drawn_won in chunks:
+        result.wins += wins
+        result.margin_total += margin
+        card_fights += drawn
+        card_wins += drawn_won
+    for row in np.flatnonzero(card_fights):
+        card_id = int(table.card_ids[row])
+        result.card_fights[card_id] = int(card_fights[row])
+        result.card_wins[card_id] = int(card_wins[row])
+    return result
@@ -0,0 +1,307 @@
+import hashlib
+import math
+import threading
+from collections import OrderedDict
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import repeat
+from multiprocessing import get_context
+from typing import Dict, Mapping, Optional, Tuple
+
+import numpy as np
+
+from ..config import get_settings
+from ..models.dungeon import CELL_CODES, CellType
+from .card_catalog import CatalogSnapshot
+from .combat_engine import (
+    MONSTER_ABILITIES,
+    EffectTable,
+    Monster,
+    deck_rows,
+    draw_hands,
+    effect_table,
+    resolve_fights,
+    roll_initiative,
+)
+from .dungeon_generator import generate_layouts, spawn_seeds
+
+# Floors are laid out as start_dungeon lays them out
+FLOOR_SIZE = 10
+DEFAULT_FLOORS = 10_000
+MAX_FLOORS = 100_000
+FLOOR_CHUNK_SIZE = 4096
+# Two-sided 95% confidence
+CONFIDENCE = 0.95
+CONFIDENCE_Z = 1.959964
+MEMO_SIZE = 256
+
+# The power ranges generate_combat_encounter and generate_miniboss_encounter roll
+MONSTERS = tuple(Monster("Random Monster", power) for power in range(2, 9))
+MINIBOSSES = tuple(
+    Monster("Miniboss", power, MONSTER_ABILITIES["Power Strike"])
+    for power in range(8, 13)
+)
+ENCOUNTERS = MONSTERS + MINIBOSSES
+MONSTER_CODE = CELL_CODES[CellType.MONSTER]
+MINIBOSS_CODE = CELL_CODES[CellType.MINIBOSS]
+
+
+def deck_hash(deck: Mapping[int, int]) -> str:
+    """Content hash of a deck's card quantities, independent of their order"""
+    content = ",".join(
+        f"{card_id}x{quantity}"
+        for card_id, quantity in sorted(deck.items())
+        if quantity > 0
+    )
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def wilson_interval(
+    successes: int, trials: int, z: float = CONFIDENCE_Z
+) -> Tuple[float, float]:
+    """Wilson score interval for a success rate
+
+    Unlike the normal approximation it stays inside [0, 1] and behaves for
+    rates near 0 or 1, which decks that always win or lose produce.
+    """
+    if not trials:
+        return 0.0, 1.0
+    rate = successes / trials
+    spread = z * z / trials
+    centre = (rate + spread / 2) / (1 + spread)
+    margin = (
+        z * math.sqrt(rate * (1 - rate) / trials + spread / (4 * trials)) / (1 + spread)
+    )
+    return max(0.0, centre - margin), min(1.0, centre + margin)
+
+
+@dataclass(frozen=True)
+class DeckEstimate:
+    deck_hash: str
+    seed: int
+    floors: int
+    floors_cleared: int
+    fights: int
+    fights_won: int
+
+    @property
+    def win_rate(self) -> float:
+        """Share of floors on which every fight was won"""
+        return self.floors_cleared / self.floors if self.floors else 0.0
+
+    @property
+    def fight_win_rate(self) -> float:
+        return self.fights_won / self.fights if self.fights else 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            "deck_hash": self.deck_hash,
+            "seed": self.seed,
+            "floors": self.floors,
+            "win_rate": self.win_rate,
+            "win_rate_interval": wilson_interval(self.floors_cleared, self.floors),
+            "fights": self.fights,
+            "fight_win_rate": self.fight_win_rate,
+            "fight_win_rate_interval": wilson_interval(self.fights_won, self.fights),
+            "confidence": CONFIDENCE,
+        }
+
+
+def _routes(rng: np.random.Generator, floors: int, size: int) -> np.ndarray:
+    """Random shortest walks from the start corner to the exit
+
+    Returns (floors, 2 * (size - 1)) flat cell indices of the cells each
+    walk enters, in order.
+    """
+    steps = 2 * (size - 1)
+    right = np.argsort(rng.random((floors, steps)), axis=1) < size - 1
+    x = np.cumsum(right, axis=1)
+    y = np.cumsum(~right, axis=1)
+    return y * size + x
+
+
+def _simulate_floors(
+    table: EffectTable, deck: np.ndarray, floors: int, seed: int, size: int
+) -> Tuple[int, int, int]:
+    seeds = spawn_seeds(seed, floors + 1)
+    rng = np.random.default_rng(seeds[-1])
+    layouts = generate_layouts(seeds[:-1], size).reshape(floors, -1)
+    cells = np.take_along_axis(layouts, _routes(rng, floors, size), axis=1)
+
+    is_fight = (cells == MONSTER_CODE) | (cells == MINIBOSS_CODE)
+    floor = np.nonzero(is_fight)[0]
+    fights = len(floor)
+    encounter = np.where(
+        cells[is_fight] == MINIBOSS_CODE,
+        len(MONSTERS) + rng.integers(len(MINIBOSSES), size=fights),
+        rng.integers(len(MONSTERS), size=fights),
+    )
+
+    # One batch per kind of monster, since a batch fights a single monster
+    won = np.empty(fights, bool)
+    for index, monster in enumerate(ENCOUNTERS):
+        batch = np.flatnonzero(encounter == index)
+        if len(batch):
+            hands = draw_hands(rng, deck, len(batch))
+            player_first = roll_initiative(rng, len(batch))
+            won[batch] = resolve_fights(table, hands, monster, player_first)[0]
+
+    lost = np.zeros(floors, bool)
+    lost[floor[~won]] = True
+    return floors - int(lost.sum()), fights, int(won.sum())
+
+
+def estimate(
+    table: EffectTable,
+    deck: Mapping[int, int],
+    floors: int = DEFAULT_FLOORS,
+    seed: int = 0,
+    pool: Optional[Executor] = None,
+    chunk_size: int = FLOOR_CHUNK_SIZE,
+    size: int = FLOOR_SIZE,
+) -> DeckEstimate:
+    """Estimate how often a deck clears a dungeon floor
+
+    Each simulated floor is generated like generate_dungeon_layout, then
+    walked along a random shortest route from the start to the exit. Every
+    monster and miniboss on the route is fought with a fresh hand, and the
+    floor counts as cleared only if all of them are beaten.
+
+    Floors are split into chunks with seeds derived from seed, so a run
+    gives the same result whether or not it is spread over a pool.
+
+    Args:
+        table: The compiled effect table
+        deck: Card ID to quantity
+        floors: Number of floors to simulate
+        seed: Seed for the run
+        pool: Executor to spread chunks over; None runs everything in
+            this process
+        chunk_size: Floors simulated per array pass
+        size: Width and height of each floor
+
+    Raises:
+        ValueError: If a card is unknown or the deck can't fill a hand
+    """
+    rows = deck_rows(table, deck)
+    sizes = [chunk_size] * (floors // chunk_size)
+    if floors % chunk_size:
+        sizes.append(floors % chunk_size)
+    seeds = spawn_seeds(seed, len(sizes))
+
+    if pool is None or len(sizes) < 2:
+        chunks = [
+            _simulate_floors(table, rows, chunk, chunk_seed, size)
+            for chunk, chunk_seed in zip(sizes, seeds)
+        ]
+    else:
+        chunks = list(
+            pool.map(
+                _simulate_floors,
+                repeat(table),
+                repeat(rows),
+                sizes,
+                seeds,
+                repeat(size),
+            )
+        )
+
+    cleared, fights, fights_won = (sum(column) for column in zip(*chunks))
+    return DeckEstimate(
+        deck_hash=deck_hash(deck),
+        seed=seed,
+        floors=floors,
+        floors_cleared=cleared,
+        fights=fights,
+        fights_won=fights_won,
+    )
+
+
+class DeckEstimator:
+    """Memoized deck estimates on a shared worker pool
+
+    Estimates are keyed by the deck's content hash and the catalog
+    generation, so a repeat query is answered from memory until the deck's
+    cards or the card rules change. Without an explicit seed, the seed is
+    taken from the deck hash so the same deck always gets the same answer.
+    Concurrent requests for the same estimate share a single run.
+
+    Runs are spread over one long-lived process pool of a fixed size,
+    started with start() and shut down with stop(). Workers are spawned
+    rather than forked, since forking a threaded server can deadlock the
+    child. Until start() is called, estimates run in the calling thread.
+    """
+
+    def __init__(self, maxsize: int = MEMO_SIZE, workers: int = None):
+        self.maxsize = maxsize
+        self.workers = (
+            get_settings().estimator_workers if workers is None else workers
+        )
+        self._lock = threading.Lock()
+        self._memo: OrderedDict = OrderedDict()
+        self._pending: Dict[Tuple, Future] = {}
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def start(self) -> None:
+        """Start the worker processes"""
+        with self._lock:
+            if self._pool is not None or self.workers < 2:
+                return
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=get_context("spawn")
+            )
+
+    def stop(self) -> None:
+        """Shut the worker processes down, dropping queued chunks"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    def estimate(
+        self,
+        catalog: CatalogSnapshot,
+        deck: Mapping[int, int],
+        floors: int = DEFAULT_FLOORS,
+        seed: Optional[int] = None,
+    ) -> DeckEstimate:
+        digest = deck_hash(deck)
+        seed = int(digest[:16], 16) if seed is None else seed
+        key = (digest, catalog.generation, floors, seed)
+        with self._lock:
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                return self._memo[key]
+            # Only one request runs a given estimate; others wait for it
+            future = self._pending.get(key)
+            owner = future is None
+            if owner:
+                future = self._pending[key] = Future()
+            pool = self._pool
+
+        if not owner:
+            return future.result()
+
+        try:
+            result = estimate(effect_table(catalog), deck, floors, seed, pool)
+        except BaseException as e:
+            with self._lock:
+                del self._pending[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._memo[key] = result
+            while len(self._memo) > self.maxsize:
+                self._memo.popitem(last=False)
+            del self._pending[key]
+        future.set_result(result)
+        return result
+
+    def invalidate(self) -> None:
+        """Forget every memoized estimate"""
+        with self._lock:
+            self._memo.clear()
+
+
+deck_estimator = DeckEstimator()
@@ -0,0 +1,269 @@
+import atexit
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, Optional
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from ..config import get_settings
+from ..models.database import SessionLocal
+from ..models.dungeon import DungeonInstance
+
+logger = logging.getLogger(__name__)
+
+
+def _packed(value) -> Optional[bytes]:
+    return None if value is None else bytes(value)
+
+
+@dataclass
+class _Entry:
+    dungeon: DungeonInstance
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    dirty_moves: int = 0
+    last_used: float = field(default_factory=time.monotonic)
+
+
+class DungeonWriteBuffer:
+    """Write-behind cache for active dungeon state
+
+    Moves mutate a detached DungeonInstance held in memory per player and
+    are written back in batches: every dirty dungeon goes out in a single
+    transaction, either from the background flusher every flush_interval
+    seconds or straight away when a caller asks (exit, combat, leaving).
+    Flushes use a sync session and block, so async callers should run them
+    in a thread.
+
+    Crash safety is bounded: a dungeon is flushed as soon as it has
+    max_dirty_moves unwritten moves, so a crash loses at most that many
+    moves, or flush_interval seconds of movement, per player.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        flush_interval: float = None,
+        max_dirty_moves: int = None,
+        idle_timeout: float = None,
+    ):
+        settings = get_settings()
+        self.session_factory = session_factory
+        self.flush_interval = (
+            settings.dungeon_flush_interval
+            if flush_interval is None
+            else flush_interval
+        )
+        self.max_dirty_moves = (
+            settings.dungeon_max_dirty_moves
+            if max_dirty_moves is None
+            else max_dirty_moves
+        )
+        self.idle_timeout = (
+            settings.dungeon_idle_timeout if idle_timeout is None else idle_timeout
+        )
+        self._lock = threading.Lock()
+        # Serializes writes so a discard can't race an in-flight flush
+        self._flush_lock = threading.Lock()
+        self._entries: Dict[int, _Entry] = {}
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._exit_hook = False
+
+    def load(self, db: Session, player_id: int) -> bool:
+        """Start buffering a player's dungeon, returning False if they have none"""
+        with self._lock:
+            entry = self._entries.get(player_id)
+            if entry is not None:
+                # Touch it so it can't be dropped as idle before it's used
+                entry.last_used = time.monotonic()
+                return True
+
+        dungeon = (
+            db.query(DungeonInstance)
+            .filter(DungeonInstance.player_id == player_id)
+            .first()
+        )
+        if dungeon is None:
+            return False
+        # Detach so the request session never writes it back on commit
+        db.expunge(dungeon)
+
+        self._ensure_started()
+        with self._lock:
+            self._entries.setdefault(player_id, _Entry(dungeon))
+        return True
+
+    @contextmanager
+    def dungeon(self, player_id: int) -> Iterator[Optional[DungeonInstance]]:
+        """Lock and yield the player's buffered dungeon
+
+        Yields None unless load() has been called for the player. Changes
+        made inside the block are only written once mark_dirty() is called
+        for them.
+        """
+        with self._lock:
+            entry = self._entries.get(player_id)
+            if entry is not None:
+                entry.last_used = time.monotonic()
+        if entry is None:
+            yield None
+            return
+        with entry.lock:
+            yield entry.dungeon
+
+    def mark_dirty(self, player_id: int) -> bool:
+        """Record one buffered move
+
+        Returns True once the dungeon has max_dirty_moves unwritten moves,
+        in which case the caller should flush it before carrying on.
+        """
+        with self._lock:
+            entry = self._entries.get(player_id)
+        if entry is None:
+            return False
+        with entry.lock:
+            entry.dirty_moves += 1
+            return entry.dirty_moves >= self.max_dirty_moves
+
+    def flush(self, player_ids: Iterable[int] = None) -> int:
+        """Write dirty dungeons in one transaction, returning how many were written"""
+        with self._flush_lock:
+            with self._lock:
+                if player_ids is None:
+                    entries = list(self._entries.values())
+                else:
+                    entries = [
+                        self._entries[player_id]
+                        for player_id in player_ids
+                        if player_id in self._entries
+                    ]
+
+            rows = []
+            written = []
+            for entry in entries:
+                with entry.lock:
+                    if not entry.dirty_moves:
+                        continue
+                    dungeon = entry.dungeon
+                    rows.append(
+                        {
+                            "id": dungeon.id,
+                            "current_floor": dungeon.current_floor,
+                            "current_position": dungeon.current_position,
+                            "visited_cells": _packed(dungeon.visited_cells),
+                            "path": _packed(dungeon.path),
+                        }
+                    )
+                    written.append((entry, entry.dirty_moves))
+            if not rows:
+                return 0
+
+            db = self.session_factory()
+            try:
+                db.execute(update(DungeonInstance), rows)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+
+        # Moves made while we were writing stay dirty for the next flush
+        for entry, moves in written:
+            with entry.lock:
+                entry.dirty_moves -= moves
+        return len(rows)
+
+    def flush_player(self, player_id: int) -> None:
+        """Write one player's buffered moves before their row is read elsewhere"""
+        self.flush([player_id])
+
+    def evict(self, player_id: int) -> None:
+        """Write and forget a player's dungeon, e.g. when they disconnect"""
+        self.flush([player_id])
+        with self._lock:
+            self._entries.pop(player_id, None)
+
+    def discard(self, player_id: int) -> None:
+        """Forget a player's dungeon without writing it
+
+        For callers about to rewrite or delete the row themselves.
+        """
+        with self._flush_lock, self._lock:
+            self._entries.pop(player_id, None)
+
+    def dirty_count(self) -> int:
+        """Number of buffered dungeons with unwritten moves"""
+        with self._lock:
+            entries = list(self._entries.values())
+        return sum(1 for entry in entries if entry.dirty_moves)
+
+    def __contains__(self, player_id: int) -> bool:
+        with self._lock:
+            return player_id in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def _drop_idle(self) -> None:
+        # Loaders find and touch entries under self._lock, so checking and
+        # popping under it too means an entry can't vanish between a
+        # caller's load() and dungeon(). Entries in use are left alone.
+        cutoff = time.monotonic() - self.idle_timeout
+        with self._lock:
+            for player_id, entry in list(self._entries.items()):
+                if entry.lock.locked():
+                    continue
+                if not entry.dirty_moves and entry.last_used < cutoff:
+                    del self._entries[player_id]
+
+    def start(self) -> None:
+        """Start the background flush thread"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="dungeon-write-behind", daemon=True
+            )
+            self._thread.start()
+            if not self._exit_hook:
+                # Daemon threads die with the interpreter; write what's left first
+                atexit.register(self.stop)
+                self._exit_hook = True
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the background flush thread after a final flush"""
+        thread = self._thread
+        if thread is not None:
+            self._stopping.set()
+            thread.join(timeout)
+            self._thread = None
+        with self._lock:
+            if self._exit_hook:
+                atexit.unregister(self.stop)
+                self._exit_hook = False
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"Failed to flush dungeon state on shutdown: {e}")
+
+    def _ensure_started(self) -> None:
+        if self._thread is None:
+            self.start()
+
+    def _run(self) -> None:
+        while not self._stopping.wait(self.flush_interval):
+            try:
+                self.flush()
+                self._drop_idle()
+            except Exception as e:
+                logger.error(f"Failed to flush dungeon state: {e}")
+
+
+dungeon_buffer = DungeonWriteBuffer()
@@ -0,0 +1,87 @@
+from typing import Iterable, List, Optional
+
+import numpy as np
+
+from ..models.dungeon import CELL_CODES, CellType
+
+# Each cell rolls these in order and takes the first that hits
+CELL_PROBABILITIES = [
+    (CellType.MONSTER, 0.3),
+    (CellType.TREASURE, 0.1),
+    (CellType.TRAP, 0.1),
+    (CellType.MERCHANT, 0.05),
+    (CellType.SHRINE, 0.05),
+    (CellType.MINIBOSS, 0.02),
+    (CellType.SAFE, 0.05),
+]
+
+
+def _build_buckets():
+    """Turn the sequential rolls into cumulative bucket edges for one draw
+
+    A cell becomes type i when every earlier roll missed and roll i hit,
+    so its effective probability is p_i * prod(1 - p_j for j < i). Draws
+    past the last edge stay empty.
+    """
+    edges = []
+    codes = []
+    miss = 1.0
+    total = 0.0
+    for cell_type, probability in CELL_PROBABILITIES:
+        total += miss * probability
+        miss *= 1.0 - probability
+        edges.append(total)
+        codes.append(CELL_CODES[cell_type])
+    codes.append(CELL_CODES[CellType.EMPTY])
+    return np.array(edges), np.array(codes, dtype=np.uint8)
+
+
+BUCKET_EDGES, BUCKET_CODES = _build_buckets()
+EXIT_CODE = CELL_CODES[CellType.EXIT]
+SAFE_CODE = CELL_CODES[CellType.SAFE]
+
+
+def _rng(seed: Optional[int]) -> np.random.Generator:
+    if seed is not None and seed < 0:
+        # SeedSequence only takes non-negative entropy
+        return np.random.default_rng([-seed, 1])
+    return np.random.default_rng(seed)
+
+
+def _codes_from_draws(draws: np.ndarray) -> np.ndarray:
+    codes = BUCKET_CODES[np.searchsorted(BUCKET_EDGES, draws, side="right")]
+    # Exit in the far corner, safe start in the near corner
+    codes[..., -1, -1] = EXIT_CODE
+    codes[..., 0, 0] = SAFE_CODE
+    return codes
+
+
+def generate_layout_codes(size: int, seed: Optional[int] = None) -> np.ndarray:
+    """Generate a size x size grid of cell codes with one vectorized draw
+
+    Args:
+        size: Width and height of the floor
+        seed: Optional seed; the same seed always yields the same floor
+    """
+    return _codes_from_draws(_rng(seed).random((size, size)))
+
+
+def generate_layouts(seeds: Iterable[int], size: int) -> np.ndarray:
+    """Generate many seeded floors at once
+
+    Returns an array of shape (len(seeds), size, size). Floor i is identical
+    to generate_layout_codes(size, seeds[i]).
+    """
+    seeds = list(seeds)
+    draws = np.empty((len(seeds), size, size))
+    for index, seed in enumerate(seeds):
+        draws[index] = _rng(seed).random((size, size))
+    return _codes_from_draws(draws)
+
+
+def spawn_seeds(base_seed: int, count: int) -> List[int]:
+    """Derive independent floor seeds from one base seed"""
+    return [
+        int(child.generate_state(1, np.uint64)[0])
+        for child in np.random.SeedSequence(base_seed).spawn(count)
+    ]
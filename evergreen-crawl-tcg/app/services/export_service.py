@@ -0,0 +1,181 @@
+import json
+import zlib
+from datetime import datetime
+from typing import AsyncIterator, Dict, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.deck import Deck, deck_cards
+from ..models.dungeon import DungeonInstance
+from ..models.player import Player, player_cards
+from .card_catalog import CatalogSnapshot, card_catalog
+
+EXPORT_FORMATS = ("ndjson", "json")
+# Rows fetched from the server-side cursor per chunk written
+EXPORT_BATCH_SIZE = 500
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, default=_default)
+
+
+def _card(catalog: CatalogSnapshot, card_id: int, quantity: int) -> Optional[Dict]:
+    card = catalog.get(card_id)
+    if not card:
+        return None
+    return {
+        "id": card.id,
+        "name": card.name,
+        "power_level": card.power_level,
+        "rarity": card.rarity,
+        "quantity": quantity or 1,
+    }
+
+
+async def _collection(
+    db: AsyncSession, catalog: CatalogSnapshot, player_id: int
+) -> AsyncIterator[list]:
+    """Collection cards in batches, read through a server-side cursor"""
+    result = await db.stream(
+        select(player_cards.c.card_id, player_cards.c.quantity)
+        .where(player_cards.c.player_id == player_id)
+        .order_by(player_cards.c.card_id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    async for rows in result.partitions():
+        batch = [_card(catalog, card_id, quantity) for card_id, quantity in rows]
+        yield [card for card in batch if card]
+
+
+async def _decks(
+    db: AsyncSession, catalog: CatalogSnapshot, player_id: int
+) -> AsyncIterator[Dict]:
+    """Decks one at a time, from a single cursor over decks and their cards"""
+    result = await db.stream(
+        select(
+            Deck.id,
+            Deck.name,
+            Deck.is_starter,
+            deck_cards.c.card_id,
+            deck_cards.c.quantity,
+        )
+        .outerjoin(deck_cards, deck_cards.c.deck_id == Deck.id)
+        .where(Deck.player_id == player_id)
+        .order_by(Deck.id, deck_cards.c.card_id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    deck = None
+    async for row in result:
+        if deck is None or deck["id"] != row.id:
+            if deck is not None:
+                yield deck
+            deck = {
+                "id": row.id,
+                "name": row.name,
+                "card_count": 0,
+                "cards": [],
+                "is_starter": row.is_starter,
+            }
+        if row.card_id is not None:
+            deck["card_count"] += row.quantity
+            card = _card(catalog, row.card_id, row.quantity)
+            if card:
+                deck["cards"].append(card)
+    if deck is not None:
+        yield deck
+
+
+def _dungeon(dungeon: Optional[DungeonInstance], player: Player) -> Optional[Dict]:
+    if not dungeon:
+        return None
+    x, y = dungeon.position
+    return {
+        "floor": dungeon.current_floor,
+        "position": {"x": x, "y": y},
+        # Fogged cells carry nothing worth exporting
+        "visible_cells": [
+            cell for cell in dungeon.get_visible_cells() if cell["is_visible"]
+        ],
+        "player_stats": {"health": 100, "gold": player.gold},
+        "layout": dungeon.layout_rows() if dungeon.layout else None,
+    }
+
+
+def _player(player: Player) -> Dict:
+    return {
+        "id": player.id,
+        "username": player.username,
+        "gold": player.gold,
+        "level": player.level,
+        "created_at": player.created_at,
+    }
+
+
+async def stream_game_state(
+    db: AsyncSession, player: Player, fmt: str = "ndjson"
+) -> AsyncIterator[str]:
+    """Write a player's full game state in chunks as it is read
+
+    Collection and deck rows come from server-side cursors and are written
+    batch by batch, so memory stays flat however large the collection is
+    and the player record goes out before anything else is loaded.
+
+    Args:
+        db: The database session
+        player: The player to export
+        fmt: "ndjson" for one typed record per line, or "json" for a single
+            document in the GameState shape
+    """
+    if fmt == "ndjson":
+        yield _dumps({"type": "player", **_player(player)}) + "\n"
+    else:
+        yield '{"player": ' + _dumps(_player(player)) + ', "collection": ['
+
+    catalog = await card_catalog.snapshot_async(db)
+
+    first = True
+    async for batch in _collection(db, catalog, player.id):
+        if fmt == "ndjson":
+            yield "".join(_dumps({"type": "card", **card}) + "\n" for card in batch)
+        elif batch:
+            yield ("" if first else ", ") + ", ".join(_dumps(card) for card in batch)
+            first = False
+
+    if fmt == "json":
+        yield '], "decks": ['
+    first = True
+    async for deck in _decks(db, catalog, player.id):
+        if fmt == "ndjson":
+            yield _dumps({"type": "deck", **deck}) + "\n"
+        else:
+            yield ("" if first else ", ") + _dumps(deck)
+            first = False
+
+    dungeon = _dungeon(
+        await db.scalar(
+            select(DungeonInstance).where(DungeonInstance.player_id == player.id)
+        ),
+        player,
+    )
+    if fmt == "ndjson":
+        if dungeon:
+            yield _dumps({"type": "dungeon", **dungeon}) + "\n"
+    else:
+        yield '], "active_dungeon": ' + _dumps(dungeon) + "}"
+
+
+async def gzip_chunks(chunks: AsyncIterator[str]) -> AsyncIterator[bytes]:
+    """Gzip a stream of text chunks without buffering the whole body"""
+    compressor = zlib.compressobj(wbits=31)
+    async for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,211 @@
+import math
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..models.dungeon import (
+    CELL_CODES,
+    CellType,
+    DungeonInstance,
+    PositionLog,
+    pack_position,
+)
+
+# Risk of entering each cell type. Routes to the exit minimize the sum, so
+# they go around a monster when a detour of up to three quiet cells exists.
+CELL_COSTS = {
+    CellType.EMPTY: 1,
+    CellType.SAFE: 1,
+    CellType.TREASURE: 1,
+    CellType.MERCHANT: 1,
+    CellType.SHRINE: 1,
+    CellType.EXIT: 1,
+    CellType.TRAP: 3,
+    CellType.MONSTER: 4,
+    CellType.MINIBOSS: 8,
+}
+COSTS_BY_CODE = np.zeros(max(CELL_CODES.values()) + 1, np.int64)
+for _cell_type, _cost in CELL_COSTS.items():
+    COSTS_BY_CODE[CELL_CODES[_cell_type]] = _cost
+
+EXIT_CODE = CELL_CODES[CellType.EXIT]
+# How DungeonInstance.exit_distances stores each cell's distance
+DISTANCE_DTYPE = np.dtype("<u4")
+UNREACHABLE = int(np.iinfo(DISTANCE_DTYPE).max)
+
+# Generated floors whose cheapest route from the start costs more than this
+# many times a walk through quiet cells are thrown back
+MAX_ROUTE_RISK = 1.5
+
+# Neighbour order used to break ties between equally cheap steps
+_STEPS = ((1, 0), (0, 1), (-1, 0), (0, -1))
+
+
+def exit_distances(layouts: np.ndarray) -> np.ndarray:
+    """Risk-weighted distance from every cell to the nearest exit
+
+    The distance of a cell is the least total CELL_COSTS of the cells
+    entered on a 4-neighbour walk from it to an exit, the exit included.
+    Works on one (size, size) floor or a (floors, size, size) batch.
+
+    Runs Dijkstra outwards from every exit at once. Costs are small
+    integers, so the queue is a bucket per distance (Dial's algorithm):
+    each pass settles every cell at the next distance across the whole
+    batch in a few array operations, and each cell is only touched when
+    it is settled or improved.
+
+    Cells that can't reach an exit (only on floors without one) are left at
+    UNREACHABLE.
+    """
+    rows, cols = layouts.shape[-2:]
+    costs = COSTS_BY_CODE[layouts].ravel()
+    distances = np.full(costs.size, UNREACHABLE, np.int64)
+    exits = np.flatnonzero(layouts.ravel() == EXIT_CODE)
+    distances[exits] = 0
+
+    buckets: Dict[int, List[np.ndarray]] = {0: [exits]}
+    while buckets:
+        level = min(buckets)
+        cells = np.unique(np.concatenate(buckets.pop(level)))
+        # Drop cells that were queued here but settled closer since
+        cells = cells[distances[cells] == level]
+        # A neighbour walking into one of these cells pays that cell's cost
+        reached = level + costs[cells]
+        x, y = cells % cols, cells // cols % rows
+        for offset, inside in (
+            (1, x < cols - 1),
+            (-1, x > 0),
+            (cols, y < rows - 1),
+            (-cols, y > 0),
+        ):
+            neighbours, candidate = cells[inside] + offset, reached[inside]
+            better = candidate < distances[neighbours]
+            neighbours, candidate = neighbours[better], candidate[better]
+            np.minimum.at(distances, neighbours, candidate)
+            for value in np.unique(candidate):
+                buckets.setdefault(int(value), []).append(
+                    neighbours[candidate == value]
+                )
+    return distances.reshape(layouts.shape)
+
+
+def route_to_exit(
+    layout: np.ndarray, distances: np.ndarray, x: int, y: int
+) -> List[Tuple[int, int]]:
+    """Cells entered on a cheapest walk from (x, y) to the exit, in order
+
+    Follows the distance field downhill, so it costs one step per cell on
+    the route. Empty if (x, y) is the exit or can't reach it.
+    """
+    size = layout.shape[0]
+    route = []
+    if distances[y, x] >= UNREACHABLE:
+        return route
+    while distances[y, x]:
+        for dx, dy in _STEPS:
+            nx, ny = x + dx, y + dy
+            if not (0 <= nx < size and 0 <= ny < size):
+                continue
+            if COSTS_BY_CODE[layout[ny, nx]] + distances[ny, nx] == distances[y, x]:
+                x, y = nx, ny
+                break
+        route.append((x, y))
+    return route
+
+
+def quiet_walk_cost(size: int) -> int:
+    """Cost of the shortest start-to-exit walk if no cell held any risk"""
+    return 2 * (size - 1) * CELL_COSTS[CellType.EMPTY]
+
+
+def _risk_limit(size: int) -> int:
+    return math.floor(MAX_ROUTE_RISK * quiet_walk_cost(size))
+
+
+def acceptable(layouts: np.ndarray) -> np.ndarray:
+    """Which floors of a (floors, size, size) batch are worth handing out
+
+    A floor passes if the cheapest route from the start corner to the exit
+    costs at most MAX_ROUTE_RISK times a walk through quiet cells.
+    """
+    return exit_distances(layouts)[:, 0, 0] <= _risk_limit(layouts.shape[-1])
+
+
+@dataclass(frozen=True)
+class AnalyzedFloor:
+    """A packed floor layout with its exit analysis, ready to store as is"""
+
+    layout: bytes
+    # Packed as DungeonInstance.exit_distances and exit_route
+    exit_distances: bytes
+    exit_route: bytes
+
+
+def _analyzed(layout: np.ndarray, distances: np.ndarray) -> AnalyzedFloor:
+    # The route starts from the near corner, where every floor starts
+    route = [(0, 0), *route_to_exit(layout, distances, 0, 0)]
+    return AnalyzedFloor(
+        layout=layout.tobytes(),
+        exit_distances=distances.astype(DISTANCE_DTYPE).tobytes(),
+        exit_route=b"".join(
+            pack_position(x, y).to_bytes(PositionLog.ENTRY_SIZE, "little")
+            for x, y in route
+        ),
+    )
+
+
+def analyze_floor(layout: np.ndarray) -> AnalyzedFloor:
+    """Analyze one (size, size) floor"""
+    return _analyzed(layout, exit_distances(layout))
+
+
+def acceptable_floors(layouts: np.ndarray) -> List[AnalyzedFloor]:
+    """Analyze a (floors, size, size) batch, keeping only acceptable floors
+
+    Like acceptable, but the distances worked out to judge each floor are
+    kept rather than computed again when the floor is handed out.
+    """
+    distances = exit_distances(layouts)
+    keep = distances[:, 0, 0] <= _risk_limit(layouts.shape[-1])
+    return [
+        _analyzed(layout, floor_distances)
+        for layout, floor_distances in zip(layouts[keep], distances[keep])
+    ]
+
+
+def analyze_dungeon(dungeon: DungeonInstance) -> None:
+    """Work out and store the exit analysis of a dungeon's current layout"""
+    if not dungeon.layout:
+        dungeon.exit_distances = dungeon.exit_route = None
+        return
+    size = dungeon.grid_size
+    layout = np.frombuffer(dungeon.layout, np.uint8).reshape(size, size)
+    assign_floor(dungeon, analyze_floor(layout))
+
+
+def assign_floor(dungeon: DungeonInstance, floor: AnalyzedFloor) -> None:
+    """Give a dungeon a new floor layout along with its exit analysis"""
+    dungeon.layout = floor.layout
+    dungeon.exit_distances = floor.exit_distances
+    dungeon.exit_route = floor.exit_route
+
+
+def dungeon_route(
+    dungeon: DungeonInstance, x: Optional[int] = None, y: Optional[int] = None
+) -> List[Tuple[int, int]]:
+    """Cheapest route to the exit from (x, y), by default the current position
+
+    Dungeons stored before floors were analyzed are analyzed first.
+    """
+    if not dungeon.exit_distances:
+        analyze_dungeon(dungeon)
+        if not dungeon.exit_distances:
+            return []
+    if x is None or y is None:
+        x, y = dungeon.position
+    size = dungeon.grid_size
+    layout = np.frombuffer(dungeon.layout, np.uint8).reshape(size, size)
+    distances = np.frombuffer(dungeon.exit_distances, DISTANCE_DTYPE)
+    distances = distances.astype(np.int64).reshape(size, size)
+    return route_to_exit(layout, distances, x, y)
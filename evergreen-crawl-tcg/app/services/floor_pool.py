@@ -0,0 +1,181 @@
+import logging
+import random
+import threading
+from collections import OrderedDict, defaultdict, deque
+from concurrent.futures import Future
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+from .dungeon_generator import generate_layout_codes, generate_layouts, spawn_seeds
+from .floor_analysis import AnalyzedFloor, acceptable_floors, analyze_floor
+
+logger = logging.getLogger(__name__)
+
+# (grid_size, floor, difficulty). Generation only depends on grid_size
+# today; floor and difficulty keep pools apart for when it doesn't.
+FloorKey = Tuple[int, int, int]
+
+POOL_SIZE = 32
+SEED_CACHE_SIZE = 256
+REFILL_INTERVAL_SECONDS = 5.0
+# Batches generated per refill or cold miss before settling for fewer floors
+MAX_GENERATION_ROUNDS = 4
+
+
+class FloorPool:
+    """Bounded pools of pre-generated floors plus an LRU of seeded floors
+
+    Unseeded floors are handed out from a per-key deque in O(1) and topped
+    up by a background thread, so generation never runs on the request path
+    once a pool is warm. Seeded floors (e.g. daily challenges) are generated
+    once and shared from an LRU cache.
+
+    Floors are handed out already analyzed (see floor_analysis), so the
+    request path only stores them. Unseeded floors whose route to the exit
+    is too risky are thrown back in batch. Seeded floors are always kept,
+    since a seed must always give the same floor.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = POOL_SIZE,
+        seed_cache_size: int = SEED_CACHE_SIZE,
+        refill_interval: float = REFILL_INTERVAL_SECONDS,
+    ):
+        self.pool_size = pool_size
+        self.seed_cache_size = seed_cache_size
+        self.refill_interval = refill_interval
+        self._lock = threading.Lock()
+        self._pools: Dict[FloorKey, Deque[AnalyzedFloor]] = defaultdict(deque)
+        self._seeded: "OrderedDict[Tuple[int, FloorKey], AnalyzedFloor]" = (
+            OrderedDict()
+        )
+        self._pending: Dict[Tuple[int, FloorKey], Future] = {}
+        self._wanted: Set[FloorKey] = set()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def take(
+        self, grid_size: int, floor: int = 1, difficulty: int = 1, seed: int = None
+    ) -> AnalyzedFloor:
+        """Get an analyzed floor, generating it inline only on a cold miss"""
+        key = (grid_size, floor, difficulty)
+        if seed is not None:
+            return self._take_seeded(seed, key)
+
+        with self._lock:
+            pool = self._pools[key]
+            floor = pool.popleft() if pool else None
+            self._wanted.add(key)
+        self._ensure_started()
+        self._wake.set()
+
+        if floor is None:
+            floor = self._generate(grid_size, 1)[0]
+        return floor
+
+    def pooled(self, grid_size: int, floor: int = 1, difficulty: int = 1) -> int:
+        """Number of ready floors for a key"""
+        with self._lock:
+            return len(self._pools[(grid_size, floor, difficulty)])
+
+    def _take_seeded(self, seed: int, key: FloorKey) -> AnalyzedFloor:
+        cache_key = (seed, key)
+        with self._lock:
+            floor = self._seeded.get(cache_key)
+            if floor is not None:
+                self._seeded.move_to_end(cache_key)
+                return floor
+            # Only one request generates a given seed; others wait for it
+            future = self._pending.get(cache_key)
+            owner = future is None
+            if owner:
+                future = self._pending[cache_key] = Future()
+
+        if not owner:
+            return future.result()
+
+        try:
+            floor = analyze_floor(generate_layout_codes(key[0], seed))
+        except BaseException as e:
+            with self._lock:
+                del self._pending[cache_key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._seeded[cache_key] = floor
+            while len(self._seeded) > self.seed_cache_size:
+                self._seeded.popitem(last=False)
+            del self._pending[cache_key]
+        future.set_result(floor)
+        return floor
+
+    def refill(self) -> None:
+        """Top up every requested pool to pool_size"""
+        with self._lock:
+            shortfalls = {
+                key: self.pool_size - len(self._pools[key]) for key in self._wanted
+            }
+        for key, missing in shortfalls.items():
+            if missing <= 0:
+                continue
+            floors = self._generate(key[0], missing)
+            with self._lock:
+                pool = self._pools[key]
+                pool.extend(floors[: self.pool_size - len(pool)])
+
+    @staticmethod
+    def _generate(grid_size: int, count: int) -> List[AnalyzedFloor]:
+        """Generate up to count acceptable random floors, at least one"""
+        floors: List[AnalyzedFloor] = []
+        for _ in range(MAX_GENERATION_ROUNDS):
+            layouts = generate_layouts(
+                spawn_seeds(random.getrandbits(64), count - len(floors)), grid_size
+            )
+            floors.extend(acceptable_floors(layouts))
+            if len(floors) >= count:
+                return floors
+        if not floors:
+            # Every draw was rejected; a risky floor beats no floor
+            floors.append(analyze_floor(generate_layout_codes(grid_size)))
+        return floors
+
+    def start(self) -> None:
+        """Start the background refill thread"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="floor-pool", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the background refill thread"""
+        thread = self._thread
+        if thread is None:
+            return
+        self._stopping.set()
+        self._wake.set()
+        thread.join(timeout)
+        self._thread = None
+
+    def _ensure_started(self) -> None:
+        if self._thread is None:
+            self.start()
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self._wake.wait(self.refill_interval)
+            self._wake.clear()
+            if self._stopping.is_set():
+                break
+            try:
+                self.refill()
+            except Exception as e:
+                logger.error(f"Failed to refill floor pool: {e}")
+
+
+floor_pool = FloorPool()
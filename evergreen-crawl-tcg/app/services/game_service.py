@@ -1,106 +1,127 @@
-from sqlalchemy.orm import Session
-from sqlalchemy.sql import func
-from fastapi import HTTPException
+import logging
 import random
-import json
-from typing import List, Dict
-from datetime import datetime, UTC
-
-from ..models.player import Player
-from ..models.deck import Deck
-from ..models.battler_card import BattlerCard, Rarity
-from ..models.dungeon import DungeonInstance, CellType
-from ..models.shop import Shop, CardPack
+from datetime import UTC, datetime
+from typing import Dict, List, Optional
 
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-def create_starter_deck(db: Session, player_id: int) -> Deck:
+from ..models.battler_card import BattlerCard, Rarity
+from ..models.deck import Deck, get_deck_cards, set_deck_cards
+from ..models.dungeon import CellType, DungeonInstance
+from ..models.player import Player, add_player_cards, get_player_collection
+from ..models.shop import Shop
+from .card_catalog import CatalogCard, card_catalog
+from .dungeon_buffer import DungeonWriteBuffer
+from .dungeon_generator import generate_layout_codes
+from .floor_analysis import analyze_floor, assign_floor
+from .pack_service import open_card_packs
+from .shop_service import ShopOffer
+
+logger = logging.getLogger(__name__)
+
+STARTER_DECK_CARDS = [
+    {"name": "Basic Warrior", "power_level": 3, "rarity": Rarity.COMMON},
+    {"name": "Basic Mage", "power_level": 2, "rarity": Rarity.COMMON},
+    {"name": "Basic Healer", "power_level": 2, "rarity": Rarity.COMMON},
+]
+
+
+async def create_starter_deck(db: AsyncSession, player_id: int) -> Deck:
     """Create a starter deck for new players"""
     try:
         # Get the player
-        player = db.query(Player).filter(Player.id == player_id).first()
+        player = await db.get(Player, player_id)
         if not player:
             raise ValueError("Player not found")
 
         # Get or create starter cards
         starter_cards = []
-        card_data = [
-            {"name": "Basic Warrior", "power_level": 3, "rarity": Rarity.COMMON},
-            {"name": "Basic Mage", "power_level": 2, "rarity": Rarity.COMMON},
-            {"name": "Basic Healer", "power_level": 2, "rarity": Rarity.COMMON},
-        ]
-
-        for data in card_data:
-            card = (
-                db.query(BattlerCard).filter(BattlerCard.name == data["name"]).first()
+        for data in STARTER_DECK_CARDS:
+            card = await db.scalar(
+                select(BattlerCard).where(BattlerCard.name == data["name"])
             )
             if not card:
                 card = BattlerCard(**data)
                 db.add(card)
-                db.flush()
+                await db.flush()
             starter_cards.append(card)
 
         # Create the deck
-        deck = Deck(
-            name="Starter Deck",
-            player_id=player_id,
-            is_starter=True,
-            cards=[
-                {
-                    "id": card.id,
-                    "name": card.name,
-                    "power_level": card.power_level,
-                    "rarity": card.rarity,
-                    "quantity": 1,
-                }
-                for card in starter_cards
-            ],
-        )
+        deck = Deck(name="Starter Deck", player_id=player_id, is_starter=True)
         db.add(deck)
+        await db.flush()
 
-        # Add cards to player's collection
-        for card in starter_cards:
-            player.cards.append(card)
+        # Fill the deck and add the cards to the player's collection
+        quantities = {card.id: 1 for card in starter_cards}
+        await db.run_sync(set_deck_cards, deck.id, quantities)
+        await db.run_sync(add_player_cards, player_id, quantities)
 
-        db.commit()
+        await db.commit()
         return deck
-    except Exception as e:
-        db.rollback()
+    except Exception:
+        await db.rollback()
         raise
 
 
-def refresh_shop(db: Session, shop: Shop) -> None:
+async def refresh_shop(db: AsyncSession, shop: Shop) -> None:
     """Refresh the shop with a new featured card"""
     # Get a random card to feature
-    all_cards = db.query(BattlerCard).all()
-    if not all_cards:
+    catalog = await card_catalog.snapshot_async(db)
+    featured_card = catalog.random_card()
+    if not featured_card:
         raise ValueError("No cards available in the database")
 
-    featured_card = random.choice(all_cards)
     shop.featured_card_id = featured_card.id
     shop.last_refresh = datetime.now(UTC)
-    db.commit()
-    db.refresh(shop)
+    await db.commit()
+    await db.refresh(shop)
 
 
-def purchase_featured_card(db: Session, player: Player, shop: Shop):
-    """Purchase the featured card from the shop"""
-    if not shop.featured_card:
-        raise HTTPException(status_code=400, detail="No featured card available")
-    
-    if player.gold < shop.featured_card_price:
-        raise HTTPException(status_code=400, detail="Not enough gold")
-    
-    # Deduct gold
-    player.gold -= shop.featured_card_price
-    
-    # Add card to player's collection
-    player.add_card(shop.featured_card, db)
-    
-    db.commit()
-    
+async def get_decks(db: AsyncSession, decks: List[Deck]) -> List[Dict]:
+    """Format decks for API responses, with card data served from the catalog
+
+    Card quantities for every deck come from deck_cards in one query.
+    """
+    catalog = await card_catalog.snapshot_async(db)
+    rows = await db.run_sync(get_deck_cards, [deck.id for deck in decks])
+    formatted = []
+    for deck in decks:
+        cards = []
+        for card_id, quantity in rows.get(deck.id, {}).items():
+            card = catalog.get(card_id)
+            if card:
+                cards.append(
+                    {
+                        "id": card.id,
+                        "name": card.name,
+                        "power_level": card.power_level,
+                        "rarity": card.rarity,
+                        "quantity": quantity,
+                    }
+                )
+        formatted.append(
+            {
+                "id": deck.id,
+                "name": deck.name,
+                "card_count": deck.card_count,
+                "cards": cards,
+                "is_starter": deck.is_starter,
+            }
+        )
+    return formatted
+
+
+async def _purchase_result(
+    db: AsyncSession, player: Player, cards: List[CatalogCard]
+) -> Dict:
+    catalog = await card_catalog.snapshot_async(db)
+    collection = await db.run_sync(get_player_collection, player.id, catalog)
     return {
         "success": True,
-        "cards_received": [shop.featured_card],
+        "cards_received": [card.to_dict() for card in cards],
         "gold_remaining": player.gold,
         "player_data": {
             "id": player.id,
@@ -108,135 +129,173 @@ def purchase_featured_card(db: Session, player: Player, shop: Shop):
             "gold": player.gold,
             "level": player.level,
             "created_at": player.created_at,
-            "cards": player.cards_list,
-        }
+            "cards": collection,
+        },
     }
 
 
-def purchase_random_card(db: Session, player: Player):
+async def _spend_gold(db: AsyncSession, player: Player, amount: float) -> bool:
+    return await db.run_sync(lambda session: player.spend_gold(amount, session))
+
+
+async def purchase_featured_card(db: AsyncSession, player: Player, shop: ShopOffer):
+    """Purchase the featured card from the shop"""
+    catalog = await card_catalog.snapshot_async(db)
+    featured_card = catalog.get(shop.featured_card_id)
+    if not featured_card:
+        raise HTTPException(status_code=400, detail="No featured card available")
+
+    # Deduct gold
+    if not await _spend_gold(db, player, shop.featured_card_price):
+        raise HTTPException(status_code=400, detail="Not enough gold")
+
+    # Add card to player's collection
+    await db.run_sync(lambda session: player.add_card(featured_card, session))
+
+    await db.commit()
+
+    return await _purchase_result(db, player, [featured_card])
+
+
+async def purchase_random_card(db: AsyncSession, player: Player, shop: ShopOffer):
     """Purchase a random card from the shop"""
-    if player.gold < 50:  # Random card price from main.py
+    if player.gold < shop.random_card_price:
         raise HTTPException(status_code=400, detail="Not enough gold")
-    
+
     # Get a random card
-    all_cards = db.query(BattlerCard).all()
-    if not all_cards:
+    catalog = await card_catalog.snapshot_async(db)
+    random_card = catalog.random_card()
+    if not random_card:
         raise HTTPException(status_code=500, detail="No cards available")
-    
-    random_card = random.choice(all_cards)
-    
+
     # Deduct gold
-    player.gold -= 50
-    
+    if not await _spend_gold(db, player, shop.random_card_price):
+        raise HTTPException(status_code=400, detail="Not enough gold")
+
     # Add card to player's collection
-    player.add_card(random_card, db)
-    
-    db.commit()
-    
-    return {
-        "success": True,
-        "cards_received": [random_card],
-        "gold_remaining": player.gold,
-        "player_data": {
-            "id": player.id,
-            "username": player.username,
-            "gold": player.gold,
-            "level": player.level,
-            "created_at": player.created_at,
-            "cards": player.cards_list,
-        }
-    }
+    await db.run_sync(lambda session: player.add_card(random_card, session))
+
+    await db.commit()
 
+    return await _purchase_result(db, player, [random_card])
 
-def purchase_card_pack(db: Session, player: Player):
-    """Purchase a pack of cards"""
-    if player.gold < 150:  # Pack price from main.py
+
+async def purchase_card_pack(
+    db: AsyncSession, player: Player, shop: ShopOffer, packs: int = 1
+):
+    """Purchase one or more packs of cards"""
+    if player.gold < shop.pack_price * packs:
         raise HTTPException(status_code=400, detail="Not enough gold")
-    
-    # Deduct gold
-    player.gold -= 150
-    
-    # Get cards based on rarity distribution from README
-    cards_received = []
-    for _ in range(5):  # Assume 5 cards per pack
-        roll = random.random() * 100
-        if roll < 60:
-            rarity = Rarity.COMMON
-        elif roll < 90:
-            rarity = Rarity.UNCOMMON
-        elif roll < 98:
-            rarity = Rarity.RARE
-        else:
-            rarity = Rarity.LEGENDARY
-            
-        possible_cards = db.query(BattlerCard).filter(BattlerCard.rarity == rarity).all()
-        if possible_cards:
-            card = random.choice(possible_cards)
-            cards_received.append(card)
-            player.add_card(card, db)
-    
-    db.commit()
-    
-    return {
-        "success": True,
-        "cards_received": cards_received,
-        "gold_remaining": player.gold,
-        "player_data": {
-            "id": player.id,
-            "username": player.username,
-            "gold": player.gold,
-            "level": player.level,
-            "created_at": player.created_at,
-            "cards": player.cards_list,
-        }
-    }
+
+    # Warm the catalog without holding its lock inside the sync pack code
+    await card_catalog.snapshot_async(db)
+    cards = await db.run_sync(open_card_packs, player, shop.pack_price, packs)
+    if cards is None:
+        raise HTTPException(status_code=400, detail="Not enough gold")
+
+    await db.commit()
+
+    return await _purchase_result(db, player, cards)
 
 
 def generate_dungeon_layout(dungeon: DungeonInstance, seed: int = None) -> None:
-    """Generate a new dungeon layout
+    """Generate a new dungeon layout, with its route to the exit
 
     Args:
         dungeon: The dungeon instance to generate a layout for
         seed: Optional seed for reproducible dungeon generation
     """
-    # Create a new random state for this dungeon generation
-    rng = random.Random(seed) if seed is not None else random.Random()
-
-    size = dungeon.grid_size
-    layout = [[CellType.EMPTY.value for _ in range(size)] for _ in range(size)]
-
-    # Place exit
-    exit_x, exit_y = size - 1, size - 1
-    layout[exit_y][exit_x] = CellType.EXIT.value
-
-    # Place other elements
-    cell_types = [
-        (CellType.MONSTER, 0.3),
-        (CellType.TREASURE, 0.1),
-        (CellType.TRAP, 0.1),
-        (CellType.MERCHANT, 0.05),
-        (CellType.SHRINE, 0.05),
-        (CellType.MINIBOSS, 0.02),
-        (CellType.SAFE, 0.05),
-    ]
-
-    for y in range(size):
-        for x in range(size):
-            if layout[y][x] == CellType.EMPTY.value:
-                for cell_type, prob in cell_types:
-                    if rng.random() < prob:
-                        layout[y][x] = cell_type.value
-                        break
-
-    # Ensure starting position is safe
-    layout[0][0] = CellType.SAFE.value
-    dungeon.layout = json.dumps(layout)
+    assign_floor(dungeon, analyze_floor(generate_layout_codes(dungeon.grid_size, seed)))
+
+
+# Moves landing on these are written through immediately when buffering
+FLUSH_EVENTS = {"combat", "miniboss", "exit"}
+
+
+async def move_player(
+    db: AsyncSession,
+    player_id: int,
+    x: int,
+    y: int,
+    since_revision: Optional[int] = None,
+    buffer: Optional[DungeonWriteBuffer] = None,
+) -> Dict:
+    """Move a player one cell and describe what they can now see
+
+    Without a buffer every move is committed straight away. With one, the
+    dungeon lives in memory and is written back by the buffer, except for
+    moves that trigger an event in FLUSH_EVENTS.
+    """
+    if buffer is None:
+        dungeon = await db.scalar(
+            select(DungeonInstance).where(DungeonInstance.player_id == player_id)
+        )
+        result = _apply_move(dungeon, player_id, x, y, since_revision)
+        await db.commit()
+        return result
+
+    if player_id not in buffer:
+        await db.run_sync(buffer.load, player_id)
+    with buffer.dungeon(player_id) as dungeon:
+        result = _apply_move(dungeon, player_id, x, y, since_revision)
+    if buffer.mark_dirty(player_id) or result["event"]["type"] in FLUSH_EVENTS:
+        await run_in_threadpool(buffer.flush_player, player_id)
+    return result
+
+
+def _apply_move(
+    dungeon: Optional[DungeonInstance],
+    player_id: int,
+    x: int,
+    y: int,
+    since_revision: Optional[int],
+) -> Dict:
+    if not dungeon:
+        logger.error(f"No active dungeon found for player {player_id}")
+        raise HTTPException(status_code=404, detail="No active dungeon")
+
+    if not dungeon.is_valid_move(x, y):
+        logger.error(
+            f"Invalid move to ({x}, {y}) from current position {dungeon.position}"
+        )
+        raise HTTPException(status_code=400, detail="Invalid move")
+
+    dungeon.move_to(x, y)
+
+    # Send only what changed since the client's revision, if it gave one
+    cells = None
+    if since_revision is not None:
+        cells = dungeon.get_visibility_delta(since_revision)
+
+    if cells is None:
+        # Otherwise the neighbourhood around the new position
+        cells = []
+        for dy in [-1, 0, 1]:
+            for dx in [-1, 0, 1]:
+                nx, ny = x + dx, y + dy
+                if 0 <= nx < dungeon.grid_size and 0 <= ny < dungeon.grid_size:
+                    cells.append(
+                        {
+                            "x": nx,
+                            "y": ny,
+                            "type": dungeon.cell_type_at(nx, ny),
+                            "is_visible": True,
+                            "is_visited": dungeon.is_visited(nx, ny),
+                        }
+                    )
+
+    return {
+        "cells": cells,
+        "event": handle_cell_event(dungeon, x, y),
+        "position": {"x": x, "y": y},
+        "revision": dungeon.revision,
+        "exit_distance": dungeon.distance_to_exit(x, y),
+    }
 
 
 def handle_cell_event(dungeon: DungeonInstance, x: int, y: int) -> Dict:
     """Handle events when moving to a new cell"""
-    layout = json.loads(dungeon.layout)
-    cell_type = layout[y][x]
+    cell_type = dungeon.cell_type_at(x, y)
 
     if cell_type == CellType.MONSTER.value:
         return {"type": "combat", "data": generate_combat_encounter()}
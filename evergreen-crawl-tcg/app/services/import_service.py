@@ -0,0 +1,382 @@
+import json
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import bindparam, delete, insert, select, update
+from sqlalchemy.orm import Session
+
+from ..models.battler_card import BattlerCard
+from ..models.deck import (
+    MAX_DECK_SIZE,
+    MIN_DECK_SIZE,
+    Deck,
+    deck_cards,
+    get_deck_cards,
+)
+from ..models.dungeon import DungeonInstance, encode_layout
+from ..models.player import Player, player_cards
+from ..schemas.game import GameState
+from .floor_analysis import analyze_dungeon
+
+
+@dataclass
+class ImportedDeck:
+    name: str
+    cards: Dict[int, int]
+    id: Optional[int] = None
+    is_starter: bool = False
+
+
+@dataclass
+class ImportedDungeon:
+    floor: int
+    position: Tuple[int, int]
+    visited: List[Tuple[int, int]]
+    grid_size: int
+    layout: bytes  # Packed as DungeonInstance.layout
+
+
+@dataclass
+class ImportedState:
+    """A game state reduced to what is stored: IDs and quantities"""
+
+    username: Optional[str] = None
+    gold: Optional[float] = None
+    collection: Dict[int, int] = field(default_factory=dict)
+    decks: List[ImportedDeck] = field(default_factory=list)
+    dungeon: Optional[ImportedDungeon] = None
+
+    def card_ids(self) -> set:
+        ids = set(self.collection)
+        for deck in self.decks:
+            ids.update(deck.cards)
+        return ids
+
+
+def _quantities(cards: Iterable[Dict]) -> Dict[int, int]:
+    """Card ID to quantity from a list of card dicts, merging repeats"""
+    quantities = {}
+    for card in cards:
+        try:
+            card_id = int(card["id"])
+            quantity = int(card.get("quantity") or 1)
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"Invalid card entry: {card}")
+        if quantity < 1:
+            raise ValueError(f"Invalid quantity for card {card_id}: {quantity}")
+        quantities[card_id] = quantities.get(card_id, 0) + quantity
+    return quantities
+
+
+def _layout(rows: List[List[str]]) -> bytes:
+    size = len(rows)
+    if not size or any(len(row) != size for row in rows):
+        raise ValueError("Dungeon layout must be a square grid")
+    try:
+        return encode_layout(rows)
+    except KeyError as e:
+        raise ValueError(f"Unknown dungeon cell type {e.args[0]!r}")
+
+
+def _dungeon(record: Dict) -> Optional[ImportedDungeon]:
+    """Reduce a dungeon record, or None if it has no layout to restore
+
+    Exports made before layouts were exported can't reproduce the floor,
+    so their dungeon is skipped rather than restored onto another one.
+    """
+    rows = record.get("layout")
+    if rows is None:
+        return None
+    position = record["position"]
+    return ImportedDungeon(
+        floor=int(record["floor"]),
+        position=(int(position["x"]), int(position["y"])),
+        visited=[
+            (int(cell["x"]), int(cell["y"]))
+            for cell in record.get("visible_cells", [])
+            if cell.get("is_visited")
+        ],
+        grid_size=len(rows),
+        layout=_layout(rows),
+    )
+
+
+def from_game_state(state: GameState) -> ImportedState:
+    """Reduce a GameState document for import"""
+    return ImportedState(
+        username=state.player.username,
+        gold=state.player.gold,
+        collection=_quantities(state.collection or state.player.cards),
+        decks=[
+            ImportedDeck(
+                id=deck.id,
+                name=deck.name,
+                cards=_quantities(deck.cards),
+                is_starter=deck.is_starter,
+            )
+            for deck in state.decks
+        ],
+        dungeon=(
+            _dungeon(state.active_dungeon.model_dump())
+            if state.active_dungeon
+            else None
+        ),
+    )
+
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line
+    yield pending
+
+
+async def from_ndjson(chunks: AsyncIterator[bytes]) -> ImportedState:
+    """Read NDJSON records as they arrive, in the export's format
+
+    Records are typed "player", "card", "deck" or "dungeon". Each is
+    reduced as soon as it is parsed, so the body is never held in memory.
+    """
+    state = ImportedState()
+    number = 0
+    async for line in _lines(chunks):
+        number += 1
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            kind = record["type"]
+            if kind == "player":
+                state.username = record.get("username")
+                if record.get("gold") is not None:
+                    state.gold = float(record["gold"])
+            elif kind == "card":
+                for card_id, quantity in _quantities([record]).items():
+                    state.collection[card_id] = (
+                        state.collection.get(card_id, 0) + quantity
+                    )
+            elif kind == "deck":
+                state.decks.append(
+                    ImportedDeck(
+                        id=record.get("id"),
+                        name=record["name"],
+                        cards=_quantities(record.get("cards", [])),
+                        is_starter=bool(record.get("is_starter", False)),
+                    )
+                )
+            elif kind == "dungeon":
+                state.dungeon = _dungeon(record)
+            else:
+                raise ValueError(f"unknown record type {kind!r}")
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Invalid record on line {number}: {e}")
+    return state
+
+
+def _check_cards(db: Session, card_ids: set) -> None:
+    """Validate every referenced card against the catalog in one query"""
+    if not card_ids:
+        return
+    known = set(
+        db.scalars(select(BattlerCard.id).where(BattlerCard.id.in_(card_ids)))
+    )
+    missing = sorted(card_ids - known)
+    if missing:
+        raise ValueError(f"Unknown cards: {missing[:20]}")
+
+
+def _upsert_statement(db: Session, table, index_elements):
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+
+    stmt = dialect_insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=index_elements, set_={"quantity": stmt.excluded.quantity}
+    )
+
+
+def _apply_collection(db: Session, player_id: int, wanted: Dict[int, int]) -> Dict:
+    current = dict(
+        db.execute(
+            select(player_cards.c.card_id, player_cards.c.quantity).where(
+                player_cards.c.player_id == player_id
+            )
+        ).all()
+    )
+    removed = [card_id for card_id in current if card_id not in wanted]
+    changed = [
+        {"player_id": player_id, "card_id": card_id, "quantity": quantity}
+        for card_id, quantity in wanted.items()
+        if current.get(card_id) != quantity
+    ]
+    if removed:
+        db.execute(
+            delete(player_cards).where(
+                player_cards.c.player_id == bindparam("p_id"),
+                player_cards.c.card_id == bindparam("c_id"),
+            ),
+            [{"p_id": player_id, "c_id": card_id} for card_id in removed],
+        )
+    if changed:
+        stmt = _upsert_statement(
+            db, player_cards, [player_cards.c.player_id, player_cards.c.card_id]
+        )
+        db.execute(stmt, changed)
+    return {"upserted": len(changed), "removed": len(removed)}
+
+
+def _check_deck_sizes(decks: List[ImportedDeck]) -> None:
+    for deck in decks:
+        if not deck.is_starter and not (
+            MIN_DECK_SIZE <= sum(deck.cards.values()) <= MAX_DECK_SIZE
+        ):
+            raise ValueError(
+                f"Decks must hold {MIN_DECK_SIZE} to {MAX_DECK_SIZE} cards"
+            )
+
+
+def _apply_decks(db: Session, player_id: int, decks: List[ImportedDeck]) -> Dict:
+    current = {
+        row.id: row
+        for row in db.execute(
+            select(Deck.id, Deck.name, Deck.is_starter).where(
+                Deck.player_id == player_id
+            )
+        )
+    }
+
+    kept = [deck for deck in decks if deck.id in current]
+    created = [deck for deck in decks if deck.id not in current]
+    kept_ids = {deck.id for deck in kept}
+    removed = [deck_id for deck_id in current if deck_id not in kept_ids]
+    # Only kept decks have contents to diff against; new decks may be handed
+    # the IDs of removed ones
+    contents = get_deck_cards(db, kept_ids)
+
+    if removed:
+        db.execute(delete(deck_cards).where(deck_cards.c.deck_id.in_(removed)))
+        db.execute(delete(Deck).where(Deck.id.in_(removed)))
+
+    updated = [
+        {"id": deck.id, "name": deck.name, "is_starter": deck.is_starter}
+        for deck in kept
+        if (current[deck.id].name, current[deck.id].is_starter)
+        != (deck.name, deck.is_starter)
+    ]
+    if updated:
+        db.execute(update(Deck), updated)
+
+    if created:
+        # IDs come back in the order the rows were given, so they pair up
+        # with the imported decks. PostgreSQL does this in one batched
+        # insert; SQLite can't, so SQLAlchemy inserts row by row there.
+        new_ids = db.scalars(
+            insert(Deck).returning(Deck.id, sort_by_parameter_order=True),
+            [
+                {
+                    "name": deck.name,
+                    "player_id": player_id,
+                    "is_starter": deck.is_starter,
+                }
+                for deck in created
+            ],
+        )
+        for deck, deck_id in zip(created, new_ids):
+            deck.id = deck_id
+
+    stale, changed = [], []
+    for deck in kept + created:
+        have = contents.get(deck.id, {})
+        stale += [
+            {"d_id": deck.id, "c_id": card_id}
+            for card_id in have
+            if card_id not in deck.cards
+        ]
+        changed += [
+            {"deck_id": deck.id, "card_id": card_id, "quantity": quantity}
+            for card_id, quantity in deck.cards.items()
+            if have.get(card_id) != quantity
+        ]
+    if stale:
+        db.execute(
+            delete(deck_cards).where(
+                deck_cards.c.deck_id == bindparam("d_id"),
+                deck_cards.c.card_id == bindparam("c_id"),
+            ),
+            stale,
+        )
+    if changed:
+        stmt = _upsert_statement(
+            db, deck_cards, [deck_cards.c.deck_id, deck_cards.c.card_id]
+        )
+        db.execute(stmt, changed)
+
+    return {
+        "created": len(created),
+        "updated": len(updated),
+        "removed": len(removed),
+        "cards_upserted": len(changed),
+        "cards_removed": len(stale),
+    }
+
+
+def _apply_dungeon(db: Session, player_id: int, imported: ImportedDungeon) -> None:
+    """Restore the exported floor, position and visited cells
+
+    The move history starts afresh at the imported position.
+    """
+    size = imported.grid_size
+    for x, y in [imported.position, *imported.visited]:
+        if not (0 <= x < size and 0 <= y < size):
+            raise ValueError(f"Dungeon cell ({x}, {y}) is outside the grid")
+
+    dungeon = db.scalar(
+        select(DungeonInstance).where(DungeonInstance.player_id == player_id)
+    )
+    if not dungeon:
+        dungeon = DungeonInstance(player_id=player_id)
+        db.add(dungeon)
+
+    dungeon.grid_size = size
+    dungeon.layout = imported.layout
+    analyze_dungeon(dungeon)
+    dungeon.current_floor = imported.floor
+    dungeon.start_at(*imported.position)
+    for x, y in imported.visited:
+        dungeon.mark_visited(x, y)
+
+
+def apply_import(db: Session, player: Player, state: ImportedState) -> Dict:
+    """Bring a player's stored state in line with an imported one
+
+    Validates card IDs in one query, diffs the collection and decks against
+    what is stored and writes only the differences, as bulk deletes and
+    upserts, within the caller's transaction. Decks missing from the import
+    are removed; a missing dungeon, or one without a layout, leaves the
+    stored one alone.
+
+    Raises:
+        ValueError: If the state references unknown cards or cells, or has a
+            deck outside the size limits
+    """
+    _check_cards(db, state.card_ids())
+    _check_deck_sizes(state.decks)
+
+    if state.gold is not None:
+        player.gold = state.gold
+    db.flush()
+
+    summary = {
+        "player_id": player.id,
+        "collection": _apply_collection(db, player.id, state.collection),
+        "decks": _apply_decks(db, player.id, state.decks),
+        "dungeon": state.dungeon is not None,
+    }
+    if state.dungeon is not None:
+        _apply_dungeon(db, player.id, state.dungeon)
+    return summary
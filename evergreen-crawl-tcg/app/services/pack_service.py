@@ -0,0 +1,43 @@
+import random
+from collections import Counter
+from typing import List, Optional
+
+from sqlalchemy.orm import Session
+
+from ..models.player import Player, add_player_cards
+from ..models.shop import CardPack
+from .card_catalog import CatalogCard, card_catalog
+
+MAX_PACKS_PER_PURCHASE = 100
+
+
+def open_card_packs(
+    db: Session,
+    player: Player,
+    pack_price: float,
+    packs: int = 1,
+    rng: random.Random = None,
+) -> Optional[List[CatalogCard]]:
+    """Open one or more card packs for a player
+
+    All cards are rolled in memory against the cached catalog, the gold is
+    deducted with a conditional UPDATE and the collection is updated with
+    one upsert, all within the caller's transaction. Returns None if the
+    player cannot afford the packs.
+
+    Args:
+        db: The database session
+        player: The player buying the packs
+        pack_price: Price of one pack, as the shop offer advertises it
+        packs: Number of packs to open
+        rng: Optional random source for reproducible rolls
+    """
+    catalog = card_catalog.snapshot(db)
+    cards = catalog.weighted_cards(packs * CardPack.CARDS_PER_PACK, rng)
+
+    if not player.spend_gold(pack_price * packs, db):
+        return None
+
+    add_player_cards(db, player.id, Counter(card.id for card in cards))
+    db.expire(player, ["cards"])
+    return cards
@@ -0,0 +1,133 @@
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from typing import Dict, List, Sequence
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from ..models.battler_card import BattlerCard
+from ..models.deck import Deck, deck_cards
+from ..models.player import Player, player_cards
+from .card_catalog import card_catalog
+from .game_service import STARTER_DECK_CARDS
+
+STARTING_GOLD = 100
+MAX_PLAYERS_PER_REQUEST = 10_000
+
+
+@dataclass
+class ProvisionResult:
+    created: List[Dict] = field(default_factory=list)
+    skipped: List[str] = field(default_factory=list)
+
+
+def _dialect_insert(db: Session):
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+
+def _starter_cards(db: Session) -> List[BattlerCard]:
+    """Load the starter deck cards, creating any that are missing"""
+    names = [data["name"] for data in STARTER_DECK_CARDS]
+    stmt = select(BattlerCard).where(BattlerCard.name.in_(names))
+    cards = {card.name: card for card in db.scalars(stmt)}
+    if len(cards) < len(names):
+        insert_cards = _dialect_insert(db)(BattlerCard.__table__)
+        inserted = db.execute(
+            insert_cards.on_conflict_do_nothing(index_elements=["name"]),
+            STARTER_DECK_CARDS,
+        )
+        if inserted.rowcount:
+            # Raw inserts skip the ORM events that keep the catalog fresh, so
+            # invalidate now and again once the caller commits
+            card_catalog.invalidate()
+            db.info["card_catalog_dirty"] = True
+        cards = {card.name: card for card in db.scalars(stmt)}
+    return [cards[name] for name in names]
+
+
+def provision_players(
+    db: Session, usernames: Sequence[str], gold: float = STARTING_GOLD
+) -> ProvisionResult:
+    """Create players with starter decks and collections in bulk
+
+    Runs a fixed handful of set-based statements however many players are
+    created: one insert for the players, skipping usernames that are
+    already taken, then one each for their starter decks, the decks' cards
+    and the collections, all within the caller's transaction.
+
+    Args:
+        db: The database session
+        usernames: Usernames to create; duplicates are created once
+        gold: Starting gold for every new player
+    """
+    names = list(dict.fromkeys(usernames))
+    if not names:
+        return ProvisionResult()
+
+    cards = _starter_cards(db)
+    now = datetime.now(UTC)
+
+    players = Player.__table__
+    stmt = (
+        _dialect_insert(db)(players)
+        .on_conflict_do_nothing(index_elements=[players.c.username])
+        .returning(players.c.id, players.c.username)
+    )
+    rows = db.execute(
+        stmt,
+        [
+            {
+                "username": name,
+                "gold": gold,
+                "level": 1,
+                "last_gold_update": now,
+                "created_at": now,
+            }
+            for name in names
+        ],
+    ).all()
+    created = {row.username: row.id for row in rows}
+    if not created:
+        return ProvisionResult(skipped=names)
+
+    deck_ids = db.execute(
+        insert(Deck).returning(Deck.id),
+        [
+            {
+                "name": "Starter Deck",
+                "player_id": player_id,
+                "is_starter": True,
+                "created_at": now,
+            }
+            for player_id in created.values()
+        ],
+    ).scalars().all()
+    db.execute(
+        insert(deck_cards),
+        [
+            {"deck_id": deck_id, "card_id": card.id, "quantity": 1}
+            for deck_id in deck_ids
+            for card in cards
+        ],
+    )
+    db.execute(
+        insert(player_cards),
+        [
+            {"player_id": player_id, "card_id": card.id, "quantity": 1}
+            for player_id in created.values()
+            for card in cards
+        ],
+    )
+
+    return ProvisionResult(
+        created=[
+            {"id": created[name], "username": name}
+            for name in names
+            if name in created
+        ],
+        skipped=[name for name in names if name not in created],
+    )
@@ -0,0 +1,206 @@
+import logging
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+
+from ..models.battler_card import BattlerCard
+from ..models.card_effect import CardEffect, EffectType
+from .card_catalog import CatalogCard, CatalogEffect, CatalogSnapshot
+
+logger = logging.getLogger(__name__)
+
+_NUMBERS = {"a": 1, "an": 1, "one": 1, "another": 1, "two": 2, "three": 3}
+_INITIATIVE = re.compile(r"(?:going|acting|moving) first|(?:with|on) initiative")
+_TAG = re.compile(
+    r"(?:(?:it is |is )?played )?(?:with |alongside )?"
+    r"(?:(another|an?|one|two|three|\d+) )?(?:other )?"
+    r"([a-z][\w'-]*(?: [a-z][\w'-]*){0,2}?)(?: battlers?| cards?)?"
+)
+
+
+@dataclass(frozen=True)
+class Condition:
+    """A parsed trigger_condition
+
+    Holds when at least `count` other cards in play carry `tag` (if set)
+    and, if `initiative` is set, when the owner acts first. A condition
+    that could not be parsed never holds.
+    """
+
+    tag: Optional[str] = None
+    count: int = 0
+    initiative: bool = False
+    never: bool = False
+
+    def holds(
+        self, in_play: Mapping[str, int], own_tags: frozenset, has_initiative: bool
+    ) -> bool:
+        """Check the condition for a card, given tag counts of all cards in play"""
+        if self.never or (self.initiative and not has_initiative):
+            return False
+        if self.tag is None:
+            return True
+        return in_play.get(self.tag, 0) - (self.tag in own_tags) >= self.count
+
+
+ALWAYS = Condition()
+NEVER = Condition(never=True)
+
+
+@lru_cache(maxsize=1024)
+def parse_condition(text: Optional[str]) -> Condition:
+    """Parse a free-text trigger_condition once per distinct string
+
+    Understands clauses joined by "and": a tag requirement such as
+    "When played with another Water battler" or "with 2 Fire cards", and
+    initiative such as "going first". Tags are matched case-insensitively.
+    """
+    if not text or not text.strip():
+        return ALWAYS
+
+    tag, count, initiative = None, 0, False
+    normalized = text.strip().rstrip(".!").casefold()
+    normalized = re.sub(r"^(?:when|if|while)\s+", "", normalized)
+    for clause in re.split(r"\s+and\s+", normalized):
+        clause = re.sub(r"\s+", " ", clause).strip(" ,")
+        if _INITIATIVE.fullmatch(clause):
+            initiative = True
+            continue
+        match = _TAG.fullmatch(clause)
+        if match is None or tag is not None:
+            logger.warning(f"Unrecognized trigger condition: {text!r}")
+            return NEVER
+        number, tag = match.groups()
+        count = int(_NUMBERS.get(number, number or 1))
+    return Condition(tag=tag, count=count, initiative=initiative)
+
+
+# How big each effect is, given the card it is on
+EFFECT_VALUES: Dict[EffectType, Callable[[CatalogCard, CatalogEffect], int]] = {
+    EffectType.SPEED: lambda card, effect: effect.speed_value or 0,
+    EffectType.ENERGY: lambda card, effect: 1,
+    EffectType.CONDITIONAL: lambda card, effect: card.power_level,
+    EffectType.INTERRUPT: lambda card, effect: 1,
+    EffectType.COUNTER: lambda card, effect: 1,
+    EffectType.EARLY_ATTACK: lambda card, effect: card.power_level,
+}
+
+
+@dataclass(frozen=True)
+class CompiledEffect:
+    """An effect reduced to its type, ordering, size and predicate"""
+
+    effect_type: EffectType
+    speed: int
+    value: int
+    condition: Condition
+
+
+@dataclass(frozen=True)
+class CompiledCard:
+    source: CatalogCard
+    effects: Tuple[CompiledEffect, ...]
+    tags: frozenset  # Casefolded, as conditions name them
+
+
+def compile_card(card: CatalogCard) -> CompiledCard:
+    """Compile a card's effects, in their stored order"""
+    return CompiledCard(
+        source=card,
+        effects=tuple(
+            CompiledEffect(
+                effect_type=effect.effect_type,
+                speed=effect.speed_value or 0,
+                value=EFFECT_VALUES[effect.effect_type](card, effect),
+                condition=parse_condition(effect.trigger_condition),
+            )
+            for effect in card.effects
+        ),
+        tags=frozenset(tag.casefold() for tag in card.tags),
+    )
+
+
+class RuleCache:
+    """Compiled effects by card ID
+
+    Entries are dropped when a card or its effects are written through the
+    ORM, and recompiled if a catalog reload hands back a card that differs
+    from the one they were compiled from.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rules: Dict[int, CompiledCard] = {}
+
+    def rules(self, card: CatalogCard) -> CompiledCard:
+        compiled = self._rules.get(card.id)
+        if compiled is not None and compiled.source is card:
+            return compiled
+        if compiled is not None and compiled.source == card:
+            # An unchanged card from a reloaded catalog
+            compiled = CompiledCard(card, compiled.effects, compiled.tags)
+        else:
+            compiled = compile_card(card)
+        with self._lock:
+            self._rules[card.id] = compiled
+        return compiled
+
+    def invalidate(self, card_id: Optional[int] = None) -> None:
+        """Drop one card's compiled effects, or every card's"""
+        with self._lock:
+            if card_id is None:
+                self._rules.clear()
+            else:
+                self._rules.pop(card_id, None)
+
+    def active_effects(
+        self,
+        catalog: CatalogSnapshot,
+        card_ids: Sequence[int],
+        has_initiative: bool = True,
+    ) -> List[Tuple[int, CompiledEffect]]:
+        """Effects whose conditions hold for a set of cards in play
+
+        Each card's conditions see the tags of every other card in play.
+        Returns (card ID, effect) pairs fastest first, ties in play order.
+
+        Raises:
+            ValueError: If a card is not in the catalog
+        """
+        compiled = []
+        for card_id in card_ids:
+            card = catalog.get(card_id)
+            if card is None:
+                raise ValueError(f"Unknown card: {card_id}")
+            compiled.append(self.rules(card))
+
+        in_play = Counter(tag for card in compiled for tag in card.tags)
+        active = [
+            (card.source.id, effect)
+            for card in compiled
+            for effect in card.effects
+            if effect.condition.holds(in_play, card.tags, has_initiative)
+        ]
+        active.sort(key=lambda pair: -pair[1].speed)
+        return active
+
+
+rule_cache = RuleCache()
+
+
+@event.listens_for(BattlerCard, "after_update")
+@event.listens_for(BattlerCard, "after_delete")
+def _on_card_change(mapper, connection, target):
+    rule_cache.invalidate(target.id)
+
+
+@event.listens_for(CardEffect, "after_insert")
+@event.listens_for(CardEffect, "after_update")
+@event.listens_for(CardEffect, "after_delete")
+def _on_effect_change(mapper, connection, target):
+    rule_cache.invalidate(target.card_id)
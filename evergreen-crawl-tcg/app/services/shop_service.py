@@ -0,0 +1,199 @@
+import asyncio
+import hashlib
+import json
+import logging
+from contextlib import suppress
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from typing import Dict, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from ..models.shop import Shop
+from .card_catalog import card_catalog
+
+logger = logging.getLogger(__name__)
+
+# Longest a client may reuse a shop response without revalidating
+SHOP_MAX_AGE_SECONDS = 300
+# Pause before the scheduler retries after a failed refresh
+RETRY_SECONDS = 60.0
+
+
+@dataclass(frozen=True)
+class ShopOffer:
+    """Detached copy of the shop's current offer, ready to serve"""
+
+    shop_id: int
+    featured_card_id: Optional[int]
+    featured_card: Dict
+    featured_card_price: float
+    random_card_price: float
+    pack_price: float
+    expires_at: datetime
+    catalog_generation: int
+    etag: str
+
+    def to_dict(self) -> Dict:
+        return {
+            "featured_card": self.featured_card,
+            "featured_card_price": self.featured_card_price,
+            "random_card_price": self.random_card_price,
+            "pack_price": self.pack_price,
+        }
+
+    def max_age(self, now: datetime = None) -> int:
+        """Seconds a client may cache this offer for"""
+        remaining = (self.expires_at - (now or datetime.now(UTC))).total_seconds()
+        return max(0, min(SHOP_MAX_AGE_SECONDS, int(remaining)))
+
+
+class ShopService:
+    """Process-wide cache of the shop offer, refreshed on a schedule
+
+    Requests read the offer from memory. A background task rotates the
+    featured card when the offer expires; if a request gets there first,
+    only one coroutine refreshes and the rest wait for its result. The
+    rotation is a conditional UPDATE, so several workers sharing a
+    database rotate it once between them.
+    """
+
+    def __init__(self):
+        self._offer: Optional[ShopOffer] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._lock_loop = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _loop_lock(self) -> asyncio.Lock:
+        # An asyncio.Lock belongs to one event loop
+        loop = asyncio.get_running_loop()
+        if self._lock_loop is not loop:
+            self._lock, self._lock_loop = asyncio.Lock(), loop
+        return self._lock
+
+    async def current(self, db: AsyncSession) -> ShopOffer:
+        """Get the current offer, loading or refreshing it only when stale"""
+        offer = self._offer
+        if offer is not None and await self._is_fresh(db, offer):
+            return offer
+
+        async with self._loop_lock():
+            # Another request may have refreshed it while this one waited
+            offer = self._offer
+            if offer is not None and await self._is_fresh(db, offer):
+                return offer
+            offer = await self._load(db)
+            self._offer = offer
+            return offer
+
+    def invalidate(self) -> None:
+        """Drop the cached offer so the next access reloads it"""
+        self._offer = None
+
+    @staticmethod
+    async def _is_fresh(db: AsyncSession, offer: ShopOffer) -> bool:
+        if datetime.now(UTC) >= offer.expires_at:
+            return False
+        # A memory hit once warm; a changed catalog may have dropped the card
+        catalog = await card_catalog.snapshot_async(db)
+        return catalog.generation == offer.catalog_generation
+
+    @staticmethod
+    async def _load(db: AsyncSession) -> ShopOffer:
+        catalog = await card_catalog.snapshot_async(db)
+        shop = await db.scalar(select(Shop).order_by(Shop.id).limit(1))
+        if not shop:
+            shop = Shop(
+                featured_card_price=100,
+                random_card_price=50,
+                pack_price=150,
+                last_refresh=datetime.now(UTC),
+            )
+            db.add(shop)
+            await db.commit()
+
+        featured = catalog.get(shop.featured_card_id)
+        if shop.should_refresh() or not featured:
+            choice = catalog.random_card()
+            if choice:
+                # Only rotate the offer that was read; if another worker
+                # got there first, serve what it picked instead
+                await db.execute(
+                    update(Shop)
+                    .where(
+                        Shop.id == shop.id,
+                        Shop.last_refresh == shop.last_refresh,
+                        Shop.featured_card_id.is_not_distinct_from(
+                            shop.featured_card_id
+                        ),
+                    )
+                    .values(featured_card_id=choice.id, last_refresh=datetime.now(UTC))
+                    .execution_options(synchronize_session=False)
+                )
+                await db.commit()
+                await db.refresh(shop)
+                featured = catalog.get(shop.featured_card_id)
+
+        featured_card = {}
+        if featured:
+            featured_card = {
+                "id": featured.id,
+                "name": featured.name,
+                "power_level": featured.power_level,
+                "rarity": featured.rarity.value,
+            }
+        body = {
+            "featured_card": featured_card,
+            "featured_card_price": shop.featured_card_price,
+            "random_card_price": shop.random_card_price,
+            "pack_price": shop.pack_price,
+        }
+        expires_at = shop.next_refresh
+        digest = hashlib.blake2b(
+            json.dumps([body, expires_at.isoformat()], sort_keys=True).encode(),
+            digest_size=12,
+        ).hexdigest()
+        return ShopOffer(
+            shop_id=shop.id,
+            featured_card_id=shop.featured_card_id if featured else None,
+            featured_card=featured_card,
+            featured_card_price=shop.featured_card_price,
+            random_card_price=shop.random_card_price,
+            pack_price=shop.pack_price,
+            expires_at=expires_at,
+            catalog_generation=catalog.generation,
+            etag=f'"{digest}"',
+        )
+
+    def start(self, session_factory: async_sessionmaker) -> None:
+        """Start the background refresh task on the running event loop"""
+        if self._task is not None and not self._task.done():
+            return
+        self._task = asyncio.get_running_loop().create_task(
+            self._run(session_factory), name="shop-refresh"
+        )
+
+    async def stop(self) -> None:
+        """Stop the background refresh task"""
+        task, self._task = self._task, None
+        if task is None:
+            return
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+
+    async def _run(self, session_factory: async_sessionmaker) -> None:
+        while True:
+            try:
+                async with session_factory() as db:
+                    offer = await self.current(db)
+                delay = (offer.expires_at - datetime.now(UTC)).total_seconds()
+            except Exception as e:
+                logger.error(f"Failed to refresh shop: {e}")
+                delay = RETRY_SECONDS
+            # Wake at expiry; never spin if the clock lands just short of it
+            await asyncio.sleep(max(delay, 1.0))
+
+
+shop_service = ShopService()
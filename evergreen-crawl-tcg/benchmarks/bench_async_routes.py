@@ -0,0 +1,146 @@
+"""Benchmark request throughput: blocking Session vs AsyncSession handlers
+
+Serves GET /player/{id} (read player and collection) from an on-disk
+SQLite database at 1, 10 and 100 concurrent clients. "sync" is
+the previous handler, an async route calling a blocking Session on the
+event loop and committing the accrued gold on every read; "async" is the
+current router on an AsyncSession.
+
+Requests go through httpx's in-process ASGI transport, so the numbers
+reflect event loop behaviour rather than network overhead.
+
+Run from the project root:
+
+    python -m benchmarks.bench_async_routes
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.models.battler_card import BattlerCard, Rarity
+from app.models.database import Base, build_async_engine, build_engine, get_db
+from app.models.player import Player, add_player_cards
+from app.routes import game
+from app.services.card_catalog import card_catalog
+
+CLIENTS = [1, 10, 100]
+REQUESTS = 1000
+PLAYERS = 100
+
+
+def seed(Session: sessionmaker) -> None:
+    with Session() as db:
+        cards = [
+            BattlerCard(name=f"{rarity.value} {i}", power_level=i, rarity=rarity)
+            for rarity in Rarity
+            for i in range(5)
+        ]
+        players = [Player(username=f"player{i}", gold=0) for i in range(PLAYERS)]
+        db.add_all(cards + players)
+        db.flush()
+        for player in players:
+            add_player_cards(db, player.id, {card.id: 1 for card in cards[:10]})
+        db.commit()
+
+
+def sync_app(url: str) -> FastAPI:
+    """The previous handler shape: blocking queries inside async def
+
+    Uses NullPool: with a sized pool, a blocked loop can't run the session
+    teardowns that return connections, so past pool_size + max_overflow
+    clients every request stalls until pool_timeout.
+    """
+    app = FastAPI()
+    Session = sessionmaker(
+        bind=create_engine(
+            url, connect_args={"check_same_thread": False}, poolclass=NullPool
+        ),
+        autoflush=False,
+    )
+
+    def get_sync_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    @app.get("/api/game/player/{player_id}")
+    async def get_player(player_id: int, db: Session = Depends(get_sync_db)):
+        player = db.query(Player).filter(Player.id == player_id).first()
+        player.gold = player.gold  # the old per-read gold write
+        db.commit()
+        return {"id": player.id, "gold": player.gold, "cards": player.cards_list}
+
+    return app
+
+
+def async_app(url: str) -> FastAPI:
+    app = FastAPI()
+    app.include_router(game.router, prefix="/api/game")
+    AsyncSession = async_sessionmaker(
+        build_async_engine(url), autoflush=False, expire_on_commit=False
+    )
+
+    async def override_get_db():
+        async with AsyncSession() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    return app
+
+
+async def requests_per_second(app: FastAPI, clients: int) -> float:
+    queue = asyncio.Queue()
+    for index in range(REQUESTS):
+        queue.put_nowait(index % PLAYERS + 1)
+
+    async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+
+        async def worker():
+            while not queue.empty():
+                player_id = queue.get_nowait()
+                response = await client.get(f"/api/game/player/{player_id}")
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        return REQUESTS / (time.perf_counter() - start)
+
+
+async def run_all(url: str) -> None:
+    # One event loop for every run: async pools are bound to their loop
+    apps = {"sync": sync_app(url), "async": async_app(url)}
+    print(f"{'clients':>8} {'sync req/s':>11} {'async req/s':>12}")
+    for clients in CLIENTS:
+        results = {
+            name: await requests_per_second(app, clients)
+            for name, app in apps.items()
+        }
+        print(f"{clients:>8} {results['sync']:>11.0f} {results['async']:>12.0f}")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        engine = build_engine(url)
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine, autoflush=False)
+        seed(Session)
+        card_catalog.invalidate()
+
+        asyncio.run(run_all(url))
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
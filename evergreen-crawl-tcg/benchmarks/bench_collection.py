@@ -0,0 +1,129 @@
+"""Benchmark collection loading for Player.cards_list
+
+Compares the legacy per-card quantity lookup against
+``get_player_collection``, which reads quantities in one query and card
+data from the warm card catalog, as the number of distinct cards grows.
+
+Run from the project root:
+
+    python -m benchmarks.bench_collection
+"""
+
+import time
+from statistics import median
+
+from sqlalchemy import create_engine, event, insert, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.models import Base, BattlerCard, Player, Rarity
+from app.models.player import get_player_collection, player_cards
+from app.services.card_catalog import card_catalog
+
+SIZES = [10, 100, 500, 2000]
+REPEATS = 5
+
+
+def legacy_cards_list(db, player: Player) -> list:
+    """The pre-join implementation: one quantity query per card"""
+    result = []
+    for card in player.cards:
+        stmt = select(player_cards.c.quantity).where(
+            player_cards.c.player_id == player.id,
+            player_cards.c.card_id == card.id,
+        )
+        quantity = db.execute(stmt).scalar() or 1
+        result.append(
+            {
+                "id": card.id,
+                "name": card.name,
+                "power_level": card.power_level,
+                "rarity": card.rarity,
+                "quantity": quantity,
+            }
+        )
+    return result
+
+
+def setup_database(size: int):
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    db.execute(
+        insert(BattlerCard),
+        [
+            {"name": f"Card {i}", "power_level": i % 10, "rarity": Rarity.COMMON}
+            for i in range(size)
+        ],
+    )
+    player = Player(username="collector")
+    db.add(player)
+    db.flush()
+    card_ids = db.scalars(select(BattlerCard.id)).all()
+    db.execute(
+        insert(player_cards),
+        [
+            {"player_id": player.id, "card_id": card_id, "quantity": 1 + i % 3}
+            for i, card_id in enumerate(card_ids)
+        ],
+    )
+    db.commit()
+    return engine, db, player.id
+
+
+def measure(engine, db, player_id, loader) -> tuple[int, float]:
+    queries = 0
+
+    def count(*args):
+        nonlocal queries
+        queries += 1
+
+    event.listen(engine, "before_cursor_execute", count)
+    timings = []
+    try:
+        for _ in range(REPEATS):
+            db.expire_all()
+            player = db.get(Player, player_id)
+            queries = 0
+            start = time.perf_counter()
+            loader(db, player)
+            timings.append(time.perf_counter() - start)
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    return queries, median(timings)
+
+
+def main():
+    print(
+        f"{'cards':>6} {'legacy q':>9} {'legacy ms':>10} "
+        f"{'catalog q':>9} {'catalog ms':>10}"
+    )
+    for size in SIZES:
+        engine, db, player_id = setup_database(size)
+        legacy_q, legacy_t = measure(engine, db, player_id, legacy_cards_list)
+        # Steady state: the catalog is loaded once per process, not per read
+        card_catalog.invalidate()
+        card_catalog.snapshot(db)
+        catalog_q, catalog_t = measure(
+            engine,
+            db,
+            player_id,
+            lambda db, player: get_player_collection(
+                db, player.id, card_catalog.snapshot(db)
+            ),
+        )
+        print(
+            f"{size:>6} {legacy_q:>9} {legacy_t * 1000:>10.2f} "
+            f"{catalog_q:>9} {catalog_t * 1000:>10.2f}"
+        )
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Benchmark combat resolution: one fight at a time vs array batches
+
+Builds a synthetic catalog of cards with random effects and tags, then
+resolves fights of a 40-card deck against a tough miniboss one by one with
+resolve_fight(), in one process with simulate(workers=1), and across every
+CPU with the process pool.
+
+Run from the project root:
+
+    python -m benchmarks.bench_combat
+"""
+
+import os
+import random
+import time
+
+import numpy as np
+
+from app.models.battler_card import Rarity
+from app.models.card_effect import EffectType
+from app.services.card_catalog import CatalogCard, CatalogEffect, CatalogSnapshot
+from app.services.combat_engine import (
+    MONSTER_ABILITIES,
+    Monster,
+    compile_effect_table,
+    fight,
+    simulate,
+)
+
+CATALOG_SIZE = 500
+DECK_SIZE = 40
+SINGLE_FIGHTS = 20_000
+BATCH_FIGHTS = 2_000_000
+TAGS = ["Fire", "Water", "Earth", "Shadow"]
+
+
+def make_catalog(rng: random.Random) -> CatalogSnapshot:
+    cards = []
+    for card_id in range(1, CATALOG_SIZE + 1):
+        effects = tuple(
+            CatalogEffect(
+                id=0,
+                effect_type=rng.choice(list(EffectType)),
+                speed_value=rng.randint(0, 9),
+                description=None,
+                trigger_condition=rng.choice(TAGS),
+            )
+            for _ in range(rng.randint(0, 2))
+        )
+        cards.append(
+            CatalogCard(
+                id=card_id,
+                name=f"Card {card_id}",
+                power_level=rng.randint(1, 8),
+                rarity=Rarity.COMMON,
+                effect_description=None,
+                tags=tuple(rng.sample(TAGS, rng.randint(0, 2))),
+                effects=effects,
+            )
+        )
+    return CatalogSnapshot(cards=tuple(cards), generation=0)
+
+
+def main():
+    rng = random.Random(1)
+    start = time.perf_counter()
+    table = compile_effect_table(make_catalog(rng))
+    compile_ms = (time.perf_counter() - start) * 1000
+    deck = dict.fromkeys(rng.sample(range(1, CATALOG_SIZE + 1), DECK_SIZE), 1)
+    # Strong enough that the deck wins about half its fights
+    monster = Monster("Miniboss", 36, MONSTER_ABILITIES["Power Strike"])
+    print(f"compiled {CATALOG_SIZE} cards in {compile_ms:.1f} ms")
+
+    np_rng = np.random.default_rng(1)
+    start = time.perf_counter()
+    wins = sum(fight(table, deck, monster, np_rng).won for _ in range(SINGLE_FIGHTS))
+    single = SINGLE_FIGHTS / (time.perf_counter() - start)
+    print(f"{'mode':>12} {'fights':>10} {'fights/s':>12} {'win rate':>9}")
+    print(
+        f"{'single':>12} {SINGLE_FIGHTS:>10} {single:>12,.0f} "
+        f"{wins / SINGLE_FIGHTS:>9.3f}"
+    )
+
+    for label, workers in (("batch", 1), (f"pool x{os.cpu_count()}", None)):
+        start = time.perf_counter()
+        result = simulate(table, deck, monster, BATCH_FIGHTS, seed=1, workers=workers)
+        rate = BATCH_FIGHTS / (time.perf_counter() - start)
+        print(
+            f"{label:>12} {BATCH_FIGHTS:>10} {rate:>12,.0f} {result.win_rate:>9.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
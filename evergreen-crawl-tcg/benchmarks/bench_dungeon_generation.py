@@ -0,0 +1,65 @@
+"""Benchmark dungeon generation: per-cell Python loop vs vectorized NumPy
+
+Run from the project root:
+
+    python -m benchmarks.bench_dungeon_generation
+"""
+
+import random
+import time
+
+from app.models.dungeon import CellType, encode_layout
+from app.services.dungeon_generator import (
+    CELL_PROBABILITIES,
+    generate_layout_codes,
+    generate_layouts,
+)
+
+SIZES = [10, 100, 1000]
+BATCH = 1000
+
+
+def legacy_layout(size: int, seed: int) -> bytes:
+    """The original nested-loop generator, encoded for storage"""
+    rng = random.Random(seed)
+    layout = [[CellType.EMPTY.value for _ in range(size)] for _ in range(size)]
+    layout[size - 1][size - 1] = CellType.EXIT.value
+    for y in range(size):
+        for x in range(size):
+            if layout[y][x] == CellType.EMPTY.value:
+                for cell_type, prob in CELL_PROBABILITIES:
+                    if rng.random() < prob:
+                        layout[y][x] = cell_type.value
+                        break
+    layout[0][0] = CellType.SAFE.value
+    return encode_layout(layout)
+
+
+def per_floor_ms(fn, floors: int) -> float:
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) / floors * 1000
+
+
+def main():
+    print(f"{'grid':>10} {'loop ms':>10} {'numpy ms':>10} {'batch ms/floor':>15}")
+    for size in SIZES:
+        floors = max(1, min(BATCH, 1_000_000 // (size * size)))
+        loop_ms = per_floor_ms(
+            lambda: [legacy_layout(size, seed) for seed in range(floors)], floors
+        )
+        numpy_ms = per_floor_ms(
+            lambda: [
+                generate_layout_codes(size, seed).tobytes() for seed in range(floors)
+            ],
+            floors,
+        )
+        batch_ms = per_floor_ms(lambda: generate_layouts(range(floors), size), floors)
+        print(
+            f"{size:>4}x{size:<5} {loop_ms:>10.3f} {numpy_ms:>10.3f} "
+            f"{batch_ms:>15.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
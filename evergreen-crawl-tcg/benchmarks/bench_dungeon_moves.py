@@ -0,0 +1,102 @@
+"""Load test dungeon moves: commit per move vs the write-behind buffer
+
+Concurrent players walk back and forth across an on-disk SQLite database.
+Reports moves per second with every move committed, and with moves
+buffered in memory and flushed in batches.
+
+Run from the project root:
+
+    python -m benchmarks.bench_dungeon_moves
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from app.models.database import Base, build_async_engine
+from app.models.dungeon import DungeonInstance
+from app.models.player import Player
+from app.services.dungeon_buffer import DungeonWriteBuffer
+from app.services.game_service import move_player
+
+PLAYERS = [1, 8, 32]
+MOVES_PER_PLAYER = 200
+GRID_SIZE = 10
+
+
+def make_database(path: str, players: int) -> sessionmaker:
+    engine = create_engine(
+        f"sqlite:///{path}", connect_args={"check_same_thread": False}
+    )
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    layout = [["empty"] * GRID_SIZE for _ in range(GRID_SIZE)]
+    with Session() as db:
+        for index in range(players):
+            player = Player(username=f"player{index}", gold=0)
+            db.add(player)
+            db.flush()
+            dungeon = DungeonInstance(
+                player_id=player.id, current_floor=1, grid_size=GRID_SIZE
+            )
+            dungeon.set_layout(layout)
+            dungeon.start_at(0, index % GRID_SIZE)
+            db.add(dungeon)
+        db.commit()
+    return Session
+
+
+async def walk(AsyncSession: async_sessionmaker, player_id: int, buffer) -> None:
+    """Pace a row of the grid, one request-sized session per move"""
+    row = (player_id - 1) % GRID_SIZE
+    x, step = 0, 1
+    for _ in range(MOVES_PER_PLAYER):
+        if not 0 <= x + step < GRID_SIZE:
+            step = -step
+        x += step
+        async with AsyncSession() as db:
+            await move_player(db, player_id, x, row, buffer=buffer)
+
+
+async def moves_per_second(path: str, players: int, buffered: bool) -> float:
+    Session = make_database(path, players)
+    engine = build_async_engine(f"sqlite:///{path}")
+    AsyncSession = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+    buffer = DungeonWriteBuffer(session_factory=Session) if buffered else None
+
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(walk(AsyncSession, player_id, buffer) for player_id in range(1, players + 1))
+    )
+    if buffer is not None:
+        # Count the final write so both modes end fully persisted
+        buffer.stop()
+    elapsed = time.perf_counter() - start
+
+    await engine.dispose()
+    Session.kw["bind"].dispose()
+    return players * MOVES_PER_PLAYER / elapsed
+
+
+def main():
+    print(f"{'players':>8} {'commit/move':>12} {'write-behind':>13} {'speedup':>8}")
+    for players in PLAYERS:
+        with tempfile.TemporaryDirectory() as tmp:
+            direct = asyncio.run(
+                moves_per_second(os.path.join(tmp, "direct.db"), players, False)
+            )
+            buffered = asyncio.run(
+                moves_per_second(os.path.join(tmp, "buffered.db"), players, True)
+            )
+        print(
+            f"{players:>8} {direct:>12.0f} {buffered:>13.0f} {buffered / direct:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
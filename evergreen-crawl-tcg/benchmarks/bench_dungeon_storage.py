@@ -0,0 +1,123 @@
+"""Benchmark dungeon storage: JSON-in-JSON vs the packed binary format
+
+Reports bytes stored per dungeon and CPU time per move for the legacy
+encoding (json.dumps strings inside JSON columns) and the packed format
+(one byte per cell, visited bitset, packed position).
+
+Run from the project root:
+
+    python -m benchmarks.bench_dungeon_storage
+"""
+
+import json
+import random
+import time
+
+from app.models.dungeon import CELL_CODES, DungeonInstance, empty_bitset
+
+SIZES = [10, 100, 1000]
+MOVES = 50
+
+
+def make_layout(size: int, rng: random.Random) -> list:
+    values = [cell_type.value for cell_type in CELL_CODES]
+    return [[rng.choice(values) for _ in range(size)] for _ in range(size)]
+
+
+def make_path(size: int, length: int) -> list:
+    """A walk that snakes along the first rows"""
+    path = []
+    x, y, step = 0, 0, 1
+    for _ in range(length):
+        path.append((x, y))
+        if 0 <= x + step < size:
+            x += step
+        else:
+            y, step = min(y + 1, size - 1), -step
+    return path
+
+
+def legacy_row(layout, path):
+    """Column values as the JSON implementation stored them"""
+    x, y = path[-1]
+    return {
+        "layout": json.dumps(json.dumps(layout)),
+        "visited_cells": json.dumps(json.dumps([{"x": x, "y": y} for x, y in path])),
+        "current_position": json.dumps(json.dumps({"x": x, "y": y})),
+    }
+
+
+def legacy_move(row, size, x, y):
+    """The work the JSON move handler did for a single step"""
+    json.loads(json.loads(row["current_position"]))
+    visited = json.loads(json.loads(row["visited_cells"]))
+    row["current_position"] = json.dumps(json.dumps({"x": x, "y": y}))
+    visited.append({"x": x, "y": y})
+    row["visited_cells"] = json.dumps(json.dumps(visited))
+    layout = json.loads(json.loads(row["layout"]))
+    for dy in (-1, 0, 1):
+        for dx in (-1, 0, 1):
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < size and 0 <= ny < size:
+                _ = (layout[ny][nx], {"x": nx, "y": ny} in visited)
+
+
+def packed_dungeon(layout, path):
+    dungeon = DungeonInstance(grid_size=len(layout))
+    dungeon.set_layout(layout)
+    dungeon.visited_cells = empty_bitset(len(layout))
+    for x, y in path:
+        dungeon.mark_visited(x, y)
+    dungeon.set_position(*path[-1])
+    return dungeon
+
+
+def packed_move(dungeon, size, x, y):
+    """The work the packed move handler does for a single step"""
+    dungeon.is_valid_move(x, y)
+    dungeon.set_position(x, y)
+    dungeon.mark_visited(x, y)
+    for dy in (-1, 0, 1):
+        for dx in (-1, 0, 1):
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < size and 0 <= ny < size:
+                _ = (dungeon.cell_type_at(nx, ny), dungeon.is_visited(nx, ny))
+
+
+def packed_bytes(dungeon) -> int:
+    return len(dungeon.layout) + len(dungeon.visited_cells) + 8
+
+
+def main():
+    rng = random.Random(42)
+    print(
+        f"{'grid':>10} {'json bytes':>12} {'packed bytes':>13} "
+        f"{'json us/move':>13} {'packed us/move':>15}"
+    )
+    for size in SIZES:
+        layout = make_layout(size, rng)
+        path = make_path(size, 2 * size)
+        next_moves = make_path(size, 2 * size + MOVES)[2 * size :]
+
+        row = legacy_row(layout, path)
+        json_bytes = sum(len(value) for value in row.values())
+        moves = next_moves if size < 1000 else next_moves[:5]
+        start = time.perf_counter()
+        for x, y in moves:
+            legacy_move(row, size, x, y)
+        json_us = (time.perf_counter() - start) / len(moves) * 1e6
+
+        dungeon = packed_dungeon(layout, path)
+        start = time.perf_counter()
+        for x, y in next_moves:
+            packed_move(dungeon, size, x, y)
+        packed_us = (time.perf_counter() - start) / len(next_moves) * 1e6
+
+        print(
+            f"{size:>4}x{size:<5} {json_bytes:>12} {packed_bytes(dungeon):>13} "
+            f"{json_us:>13.1f} {packed_us:>15.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
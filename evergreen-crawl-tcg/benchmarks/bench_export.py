@@ -0,0 +1,148 @@
+"""Benchmark game-state export: in-memory GET /state vs streaming export
+
+Builds a player owning every card of a large catalog on an on-disk SQLite
+database, then exports it through GET /state/{id} and through
+GET /state/{id}/stream. Reports time to first byte, total time and the
+peak Python memory allocated while serving each request, above what\nwas already in use.
+
+The ASGI app is called directly with a send() that discards the body, so
+memory reflects what the handler holds rather than a client buffering the
+response.
+
+Run from the project root:
+
+    python -m benchmarks.bench_export
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+
+from fastapi import FastAPI
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import Session
+
+from app.models.battler_card import BattlerCard, Rarity
+from app.models.database import Base, build_async_engine, build_engine, get_db
+from app.models.player import Player, player_cards
+from app.routes import game
+from app.services.card_catalog import card_catalog
+
+COLLECTION_SIZES = [1_000, 10_000, 100_000]
+
+
+def make_app(url: str, cards: int) -> FastAPI:
+    engine = build_engine(url)
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.execute(
+            insert(BattlerCard),
+            [
+                {"name": f"Card {i}", "power_level": i % 10, "rarity": Rarity.COMMON}
+                for i in range(cards)
+            ],
+        )
+        player = Player(username="collector", gold=0)
+        db.add(player)
+        db.flush()
+        db.execute(
+            insert(player_cards),
+            [
+                {"player_id": player.id, "card_id": card_id, "quantity": 1}
+                for card_id in range(1, cards + 1)
+            ],
+        )
+        db.commit()
+    engine.dispose()
+    card_catalog.invalidate()
+
+    app = FastAPI()
+    app.include_router(game.router, prefix="/api/game")
+    AsyncSession = async_sessionmaker(
+        build_async_engine(url), autoflush=False, expire_on_commit=False
+    )
+
+    async def override_get_db():
+        async with AsyncSession() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    return app
+
+
+async def export(app: FastAPI, path: str, query: str = ""):
+    """Serve one GET, returning (first byte s, total s, body bytes, peak bytes)"""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "headers": [(b"host", b"bench")],
+        "client": ("bench", 0),
+        "server": ("bench", 80),
+    }
+    first_byte = None
+    size = 0
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if requested:
+            # Stay connected until the response is done
+            await asyncio.Event().wait()
+        requested = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal first_byte, size
+        if message["type"] == "http.response.body" and message.get("body"):
+            if first_byte is None:
+                first_byte = time.perf_counter()
+            size += len(message["body"])
+
+    tracemalloc.reset_peak()
+    baseline, _ = tracemalloc.get_traced_memory()
+    start = time.perf_counter()
+    await app(scope, receive, send)
+    total = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    return first_byte - start, total, size, peak - baseline
+
+
+async def run_all(tmp: str) -> None:
+    print(
+        f"{'cards':>8} {'mode':>9} {'first byte ms':>14} {'total ms':>9} "
+        f"{'body KiB':>9} {'peak KiB':>9}"
+    )
+    for cards in COLLECTION_SIZES:
+        app = make_app(f"sqlite:///{os.path.join(tmp, f'export{cards}.db')}", cards)
+        path = "/api/game/state/1"
+        # Warm the catalog so neither mode pays for loading it
+        await export(app, path)
+        for mode, url, query in (
+            ("memory", path, ""),
+            ("stream", f"{path}/stream", ""),
+            ("gzip", f"{path}/stream", "gzip=true"),
+        ):
+            first, total, size, peak = await export(app, url, query)
+            print(
+                f"{cards:>8} {mode:>9} {first * 1000:>14.1f} {total * 1000:>9.1f} "
+                f"{size / 1024:>9.0f} {peak / 1024:>9.0f}"
+            )
+
+
+def main():
+    tracemalloc.start()
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(run_all(tmp))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Benchmark player provisioning: POST /start per player vs POST /players/bulk
+
+Creates N players with starter decks on a fresh on-disk SQLite database,
+once through the single-player endpoint and once through the bulk
+endpoint, and reports players per second.
+
+Requests go through httpx's in-process ASGI transport, so the numbers
+reflect the handlers and the database rather than the network.
+
+Run from the project root:
+
+    python -m benchmarks.bench_provisioning
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.models.database import Base, build_async_engine, build_engine, get_db
+from app.routes import game
+from app.services.card_catalog import card_catalog
+
+PLAYERS = [100, 1000, 10_000]
+# Creating players one request at a time gets slow; skip it past this
+MAX_SINGLE = 1000
+
+
+def make_app(url: str) -> FastAPI:
+    engine = build_engine(url)
+    Base.metadata.create_all(engine)
+    engine.dispose()
+    card_catalog.invalidate()
+
+    app = FastAPI()
+    app.include_router(game.router, prefix="/api/game")
+    AsyncSession = async_sessionmaker(
+        build_async_engine(url), autoflush=False, expire_on_commit=False
+    )
+
+    async def override_get_db():
+        async with AsyncSession() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    return app
+
+
+async def single(client: httpx.AsyncClient, players: int) -> None:
+    for index in range(players):
+        response = await client.post(
+            "/api/game/start", json={"username": f"player{index}"}
+        )
+        response.raise_for_status()
+
+
+async def bulk(client: httpx.AsyncClient, players: int) -> None:
+    usernames = [f"player{index}" for index in range(players)]
+    response = await client.post(
+        "/api/game/players/bulk", json={"usernames": usernames}
+    )
+    response.raise_for_status()
+    assert len(response.json()["created"]) == players
+
+
+async def players_per_second(tmp: str, mode, players: int) -> float:
+    url = f"sqlite:///{os.path.join(tmp, f'{mode.__name__}{players}.db')}"
+    app = make_app(url)
+    async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+        start = time.perf_counter()
+        await mode(client, players)
+        return players / (time.perf_counter() - start)
+
+
+async def run_all(tmp: str) -> None:
+    print(f"{'players':>8} {'single players/s':>17} {'bulk players/s':>15}")
+    for players in PLAYERS:
+        one = (
+            f"{await players_per_second(tmp, single, players):>17.0f}"
+            if players <= MAX_SINGLE
+            else f"{'-':>17}"
+        )
+        many = await players_per_second(tmp, bulk, players)
+        print(f"{players:>8} {one} {many:>15.0f}")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(run_all(tmp))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+"""Load test the game API with scripted player sessions
+
+Runs the game router in-process against a fresh on-disk SQLite database.
+Concurrent clients each play whole sessions: start a game, poll the
+player, open the shop, buy a card and packs, start a dungeon and walk to
+the exit. Reports p50/p95/p99 latency and throughput per endpoint, and
+can write them as JSON so runs can be compared across commits.
+
+Requests go through httpx's in-process ASGI transport, so the numbers
+reflect the handlers and the database rather than the network.
+
+Run from the project root:
+
+    python -m benchmarks.bench_sessions --output before.json
+    python -m benchmarks.bench_sessions --baseline before.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+from collections import defaultdict
+from datetime import UTC, datetime
+from typing import Dict, List, Optional
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import Session
+
+from app.main import init_required_data
+from app.models.database import Base, build_async_engine, build_engine, get_db
+from app.models.player import Player
+from app.routes import game
+from app.services.card_catalog import card_catalog
+from app.services.floor_pool import floor_pool
+
+CLIENTS = 10
+SESSIONS_PER_CLIENT = 5
+POLLS_PER_SESSION = 3
+PACKS_PER_SESSION = 2
+# Gold a player would have earned over a long session, granted outside
+# the timed requests so the session can afford its packs
+SESSION_GOLD = 500
+GRID_SIZE = 10
+
+
+class Recorder:
+    """Latencies per endpoint, keyed by method and path template"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    async def call(
+        self, client: httpx.AsyncClient, name: str, method: str, url: str, **kwargs
+    ):
+        start = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        self.latencies[name].append(time.perf_counter() - start)
+        if response.is_error:
+            self.errors[name] += 1
+            return None
+        return response.json()
+
+
+def make_app(url: str) -> FastAPI:
+    engine = build_engine(url)
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        init_required_data(db)
+    card_catalog.invalidate()
+
+    app = FastAPI()
+    app.include_router(game.router, prefix="/api/game")
+    AsyncSession = async_sessionmaker(
+        build_async_engine(url), autoflush=False, expire_on_commit=False
+    )
+
+    async def override_get_db():
+        async with AsyncSession() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.state.engine = engine
+    return app
+
+
+def grant_gold(app: FastAPI, player_id: int) -> None:
+    with Session(app.state.engine) as db:
+        db.execute(
+            update(Player)
+            .where(Player.id == player_id)
+            .values(base_gold=Player.base_gold + SESSION_GOLD)
+        )
+        db.commit()
+
+
+async def play_session(
+    app: FastAPI,
+    client: httpx.AsyncClient,
+    recorder: Recorder,
+    username: str,
+    seed: int,
+) -> None:
+    player = await recorder.call(
+        client, "POST /start", "POST", "/api/game/start", json={"username": username}
+    )
+    if player is None:
+        return
+    player_id = player["id"]
+    await asyncio.to_thread(grant_gold, app, player_id)
+
+    for _ in range(POLLS_PER_SESSION):
+        await recorder.call(
+            client, "GET /player/{id}", "GET", f"/api/game/player/{player_id}"
+        )
+    await recorder.call(
+        client, "GET /shop/{id}", "GET", f"/api/game/shop/{player_id}"
+    )
+    buy = f"/api/game/shop/{player_id}/buy"
+    random_card = {"item_type": "random"}
+    await recorder.call(
+        client, "POST /shop/{id}/buy random", "POST", buy, json=random_card
+    )
+    for _ in range(PACKS_PER_SESSION):
+        pack = {"item_type": "pack"}
+        await recorder.call(client, "POST /shop/{id}/buy pack", "POST", buy, json=pack)
+
+    dungeon = f"/api/game/dungeon/{player_id}"
+    cells = await recorder.call(
+        client,
+        "POST /dungeon/{id}/start",
+        "POST",
+        f"{dungeon}/start",
+        params={"seed": seed},
+    )
+    if cells is None:
+        return
+
+    # The exit is in the far corner: take a staircase path down to it
+    x, y, revision = 0, 0, None
+    while (x, y) != (GRID_SIZE - 1, GRID_SIZE - 1):
+        if x <= y:
+            x += 1
+        else:
+            y += 1
+        result = await recorder.call(
+            client,
+            "POST /dungeon/{id}/move",
+            "POST",
+            f"{dungeon}/move",
+            json={"x": x, "y": y, "since_revision": revision},
+        )
+        if result is None:
+            return
+        revision = result["revision"]
+    await recorder.call(
+        client, "POST /dungeon/{id}/leave", "POST", f"{dungeon}/leave"
+    )
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    rank = round(fraction * len(sorted_values))
+    return sorted_values[max(0, min(len(sorted_values), rank) - 1)]
+
+
+def summarize(recorder: Recorder, elapsed: float) -> Dict:
+    endpoints = {}
+    for name, latencies in sorted(recorder.latencies.items()):
+        values = sorted(latencies)
+        endpoints[name] = {
+            "requests": len(values),
+            "errors": recorder.errors[name],
+            "throughput_rps": len(values) / elapsed,
+            "mean_ms": sum(values) / len(values) * 1000,
+            "p50_ms": percentile(values, 0.50) * 1000,
+            "p95_ms": percentile(values, 0.95) * 1000,
+            "p99_ms": percentile(values, 0.99) * 1000,
+        }
+    requests = sum(endpoint["requests"] for endpoint in endpoints.values())
+    return {
+        "total": {
+            "requests": requests,
+            "errors": sum(recorder.errors.values()),
+            "seconds": elapsed,
+            "throughput_rps": requests / elapsed,
+        },
+        "endpoints": endpoints,
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(url: str, clients: int, sessions: int, seed: int) -> Dict:
+    app = make_app(url)
+    recorder = Recorder()
+    rng = random.Random(seed)
+    seeds = [rng.randrange(2**31) for _ in range(clients * sessions)]
+
+    async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+
+        async def player(index: int):
+            for session in range(sessions):
+                number = index * sessions + session
+                await play_session(
+                    app, client, recorder, f"load{number}", seeds[number]
+                )
+
+        start = time.perf_counter()
+        await asyncio.gather(*(player(index) for index in range(clients)))
+        elapsed = time.perf_counter() - start
+
+    app.state.engine.dispose()
+    return summarize(recorder, elapsed)
+
+
+def print_report(report: Dict, baseline: Optional[Dict]) -> None:
+    header = (
+        f"{'endpoint':<28} {'req':>5} {'err':>4} {'req/s':>7} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+    )
+    if baseline:
+        header += f" {'p95 vs base':>12}"
+    print(header)
+    for name, stats in report["endpoints"].items():
+        line = (
+            f"{name:<28} {stats['requests']:>5} {stats['errors']:>4} "
+            f"{stats['throughput_rps']:>7.1f} {stats['p50_ms']:>8.2f} "
+            f"{stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f}"
+        )
+        before = baseline and baseline["endpoints"].get(name)
+        if before:
+            change = (stats["p95_ms"] / before["p95_ms"] - 1) * 100
+            line += f" {change:>+11.1f}%"
+        print(line)
+    total = report["total"]
+    print(
+        f"{total['requests']} requests, {total['errors']} errors in "
+        f"{total['seconds']:.2f}s ({total['throughput_rps']:.1f} req/s)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=CLIENTS)
+    parser.add_argument("--sessions", type=int, default=SESSIONS_PER_CLIENT)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against an earlier JSON file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        try:
+            report = asyncio.run(run(url, args.clients, args.sessions, args.seed))
+        finally:
+            floor_pool.stop()
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(UTC).isoformat(),
+            "python": platform.python_version(),
+            "clients": args.clients,
+            "sessions_per_client": args.sessions,
+            "seed": args.seed,
+        },
+        **report,
+    }
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
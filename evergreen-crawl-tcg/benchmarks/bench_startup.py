@@ -0,0 +1,100 @@
+"""Measure cold start for N workers as the database grows
+
+Migrates a temporary SQLite database with Alembic, fills it with players,
+then boots N worker processes at once. Each imports the app and runs its
+lifespan startup (idempotent seeding). Reports the slowest worker's boot
+time and checks that no rows were lost.
+
+Boot time should stay flat as rows grow. Most of it is importing the
+app, so it scales with workers only when they outnumber CPU cores.
+
+Run from the project root:
+
+    python -m benchmarks.bench_startup
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+
+from alembic.config import Config
+from sqlalchemy import create_engine, func, insert, select
+
+from alembic import command
+from app.models.player import Player
+
+ROWS = [0, 10_000, 100_000]
+WORKERS = [1, 4, 8]
+
+WORKER = """
+import asyncio, time
+start = time.perf_counter()
+from app.main import app, lifespan
+
+async def boot():
+    async with lifespan(app):
+        pass
+
+asyncio.run(boot())
+print(time.perf_counter() - start)
+"""
+
+
+def migrate(url: str) -> None:
+    config = Config("alembic.ini")
+    config.set_main_option("sqlalchemy.url", url)
+    command.upgrade(config, "head")
+
+
+def fill(url: str, rows: int) -> None:
+    engine = create_engine(url)
+    with engine.begin() as connection:
+        if rows:
+            connection.execute(
+                insert(Player),
+                [{"username": f"player{i}", "base_gold": 0} for i in range(rows)],
+            )
+    engine.dispose()
+
+
+def count_players(url: str) -> int:
+    engine = create_engine(url)
+    with engine.connect() as connection:
+        count = connection.scalar(select(func.count()).select_from(Player))
+    engine.dispose()
+    return count
+
+
+def boot_workers(url: str, workers: int) -> float:
+    env = {**os.environ, "DATABASE_URL": url}
+    processes = [
+        subprocess.Popen(
+            [sys.executable, "-c", WORKER], env=env, stdout=subprocess.PIPE, text=True
+        )
+        for _ in range(workers)
+    ]
+    times = []
+    for process in processes:
+        output, _ = process.communicate()
+        if process.returncode:
+            raise RuntimeError("worker failed to start")
+        times.append(float(output.strip().splitlines()[-1]))
+    return max(times)
+
+
+def main():
+    print(f"{'rows':>8} {'workers':>8} {'slowest boot s':>15} {'rows kept':>10}")
+    for rows in ROWS:
+        with tempfile.TemporaryDirectory() as tmp:
+            url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+            migrate(url)
+            fill(url, rows)
+            for workers in WORKERS:
+                seconds = boot_workers(url, workers)
+                kept = count_players(url) == rows
+                print(f"{rows:>8} {workers:>8} {seconds:>15.3f} {str(kept):>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Microbenchmark fog-of-war visibility over grid size and path length
+
+Compares the legacy visibility scan (membership tests against a list of
+{"x", "y"} dicts) with DungeonInstance.get_visible_cells on the visited
+bitset. Legacy runs are skipped once they would take several seconds.
+
+Run from the project root:
+
+    python -m benchmarks.bench_visibility
+"""
+
+import random
+import time
+
+from app.models.dungeon import CELL_CODES, DungeonInstance, empty_bitset
+
+GRID_SIZES = [10, 50, 100, 200]
+PATH_LENGTHS = [10, 100, 1000]
+LEGACY_BUDGET = 20_000_000  # grid cells x visited entries
+
+
+def random_walk(size: int, length: int, rng: random.Random) -> list:
+    x = y = 0
+    path = [(x, y)]
+    while len(path) < length:
+        dx, dy = rng.choice([(1, 0), (-1, 0), (0, 1), (0, -1)])
+        if 0 <= x + dx < size and 0 <= y + dy < size:
+            x, y = x + dx, y + dy
+            path.append((x, y))
+    return path
+
+
+def legacy_visible_cells(layout, visited, size, current):
+    visible = []
+    for y in range(size):
+        for x in range(size):
+            is_adjacent = abs(x - current["x"]) <= 1 and abs(y - current["y"]) <= 1
+            is_visited = {"x": x, "y": y} in visited
+            if is_adjacent or is_visited:
+                visible.append((x, y, layout[y][x], is_visited))
+            else:
+                visible.append((x, y, "fog", False))
+    return visible
+
+
+def timed(fn, repeats: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def main():
+    rng = random.Random(7)
+    values = [cell_type.value for cell_type in CELL_CODES]
+    print(f"{'grid':>5} {'path':>6} {'legacy ms':>10} {'bitset ms':>10}")
+    for size in GRID_SIZES:
+        layout = [[rng.choice(values) for _ in range(size)] for _ in range(size)]
+        for length in PATH_LENGTHS:
+            path = random_walk(size, length, rng)
+
+            visited = [{"x": x, "y": y} for x, y in path]
+            current = {"x": path[-1][0], "y": path[-1][1]}
+            if size * size * len(visited) <= LEGACY_BUDGET:
+                legacy_ms = timed(
+                    lambda: legacy_visible_cells(layout, visited, size, current), 1
+                )
+                legacy = f"{legacy_ms:>10.2f}"
+            else:
+                legacy = f"{'skipped':>10}"
+
+            dungeon = DungeonInstance(grid_size=size)
+            dungeon.set_layout(layout)
+            dungeon.visited_cells = empty_bitset(size)
+            for x, y in path:
+                dungeon.mark_visited(x, y)
+            dungeon.set_position(*path[-1])
+            bitset_ms = timed(dungeon.get_visible_cells, 3)
+
+            print(f"{size:>5} {length:>6} {legacy} {bitset_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,39 @@
+import os
+import tempfile
+
 import pytest
+import pytest_asyncio
+from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
-from fastapi.testclient import TestClient
+from sqlalchemy.pool import NullPool
 
-from app.models.database import Base
 from app.main import app
-from app.models.database import get_db
+from app.models.database import Base, get_db
+from app.services.card_catalog import card_catalog
+from app.services.deck_estimator import deck_estimator
+from app.services.shop_service import shop_service
 
-# Create an in-memory SQLite database for testing
-TEST_SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+# A throwaway SQLite file shared by the sync test session and the async
+# sessions the routes use (separate in-memory databases can't be shared)
+TEST_DB_PATH = os.path.join(tempfile.mkdtemp(), "test.db")
+TEST_SQLALCHEMY_DATABASE_URL = f"sqlite:///{TEST_DB_PATH}"
 
 engine = create_engine(
     TEST_SQLALCHEMY_DATABASE_URL,
     connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# NullPool: every TestClient request runs on its own event loop
+async_engine = create_async_engine(
+    f"sqlite+aiosqlite:///{TEST_DB_PATH}", poolclass=NullPool
+)
+TestingAsyncSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False
+)
+
 
 @pytest.fixture(scope="function")
 def test_db():
@@ -32,15 +48,26 @@ def test_db():
         db.close()
         # Drop all tables after the test
         Base.metadata.drop_all(bind=engine)
+        card_catalog.invalidate()
+        shop_service.invalidate()
+        deck_estimator.invalidate()
+
+
+@pytest_asyncio.fixture(scope="function")
+async def async_db(test_db):
+    async with TestingAsyncSessionLocal() as db:
+        yield db
 
 
 @pytest.fixture(scope="function")
 def client(test_db):
     # Override the get_db dependency
-    def override_get_db():
+    async def override_get_db():
         try:
-            yield test_db
+            async with TestingAsyncSessionLocal() as db:
+                yield db
         finally:
+            # End the test session's transaction so it sees the request's writes
             test_db.close()
 
     app.dependency_overrides[get_db] = override_get_db
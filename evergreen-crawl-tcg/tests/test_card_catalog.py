@@ -0,0 +1,110 @@
+import random
+from collections import Counter
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.battler_card import BattlerCard, Rarity
+from app.models.player import Player
+from app.models.shop import CardPack, Shop
+from app.models.tag import Tag
+from app.services.card_catalog import card_catalog
+from app.services.game_service import purchase_random_card, refresh_shop
+from app.services.shop_service import shop_service
+
+CATALOG_TABLES = ("battler_cards", "card_tags", "card_effects", "tags")
+
+
+def _seed_cards(db: Session, rarities=tuple(Rarity)):
+    db.add_all(
+        BattlerCard(name=f"{rarity.value} {i}", power_level=i, rarity=rarity)
+        for rarity in rarities
+        for i in range(4)
+    )
+    db.commit()
+
+
+def test_catalog_indexes_cards_with_tags(test_db: Session):
+    """Cards are indexed by id, name and rarity with their tags attached"""
+    card = BattlerCard(name="Tide Caller", power_level=5, rarity=Rarity.RARE)
+    card.tags.append(Tag(name="Water"))
+    test_db.add(card)
+    test_db.commit()
+
+    catalog = card_catalog.snapshot(test_db)
+
+    assert catalog.get(card.id).name == "Tide Caller"
+    assert catalog.get_by_name("Tide Caller").tags == ("Water",)
+    assert catalog.by_rarity[Rarity.RARE] == (catalog.get(card.id),)
+
+
+def test_catalog_invalidated_on_card_insert(test_db: Session):
+    """Inserting a card through the ORM drops the cached snapshot"""
+    _seed_cards(test_db)
+    before = card_catalog.snapshot(test_db)
+
+    test_db.add(BattlerCard(name="New Card", power_level=1, rarity=Rarity.COMMON))
+    test_db.commit()
+
+    after = card_catalog.snapshot(test_db)
+    assert after is not before
+    assert after.get_by_name("New Card") is not None
+
+
+def test_weighted_sampling_follows_rarity_weights(test_db: Session):
+    """Weighted draws follow CardPack.RARITY_WEIGHTS"""
+    _seed_cards(test_db)
+    catalog = card_catalog.snapshot(test_db)
+
+    draws = 20000
+    counts = Counter(
+        card.rarity for card in catalog.weighted_cards(draws, random.Random(3))
+    )
+
+    for rarity, weight in CardPack.RARITY_WEIGHTS.items():
+        assert abs(counts[rarity] / draws - weight) < 0.02
+
+
+def test_weighted_sampling_skips_empty_rarities(test_db: Session):
+    """Rarities without cards are never drawn"""
+    _seed_cards(test_db, rarities=(Rarity.RARE, Rarity.LEGENDARY))
+    catalog = card_catalog.snapshot(test_db)
+
+    cards = catalog.weighted_cards(500, random.Random(5))
+
+    assert len(cards) == 500
+    assert {card.rarity for card in cards} <= {Rarity.RARE, Rarity.LEGENDARY}
+
+
+@pytest.mark.asyncio
+async def test_warm_shop_does_not_touch_catalog_tables(
+    test_db: Session, async_db: AsyncSession
+):
+    """Once the cache is warm, shop purchases never query the card tables"""
+    _seed_cards(test_db)
+    shop = Shop()
+    player = Player(username="shopper", gold=1000)
+    test_db.add_all([shop, player])
+    test_db.commit()
+    card_catalog.snapshot(test_db)
+    shop = await async_db.get(Shop, shop.id)
+    player = await async_db.get(Player, player.id)
+    offer = await shop_service.current(async_db)
+
+    statements = []
+    engine = async_db.get_bind()
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        await refresh_shop(async_db, shop)
+        result = await purchase_random_card(async_db, player, offer)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert result["success"]
+    assert statements
+    for statement in statements:
+        assert not any(f"FROM {table}" in statement for table in CATALOG_TABLES)
+        assert "JOIN battler_cards" not in statement
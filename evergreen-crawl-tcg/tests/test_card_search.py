@@ -0,0 +1,122 @@
+from dataclasses import replace
+
+from sqlalchemy.orm import Session
+
+from app.models.battler_card import BattlerCard, Rarity
+from app.models.tag import Tag
+from app.services.card_catalog import CatalogCard, CatalogSnapshot
+from app.services.card_search import CardSearch, SearchIndex
+
+
+def _card(card_id, power, rarity=Rarity.COMMON, tags=()):
+    return CatalogCard(
+        id=card_id,
+        name=f"Card {card_id}",
+        power_level=power,
+        rarity=rarity,
+        effect_description=None,
+        tags=tags,
+    )
+
+
+CARDS = (
+    _card(1, 2, tags=("Fire",)),
+    _card(2, 5, Rarity.RARE, tags=("Fire", "Water")),
+    _card(3, 7, Rarity.RARE, tags=("Water",)),
+    _card(5, 3, tags=("Earth", "Fire")),
+    _card(8, 9, Rarity.LEGENDARY),
+)
+
+
+def _ids(index: SearchIndex, **filters):
+    return [card.id for card in index.page(index.match(**filters)).cards]
+
+
+def test_tag_rarity_and_power_filters():
+    index = SearchIndex(CatalogSnapshot(cards=CARDS, generation=0))
+
+    assert _ids(index) == [1, 2, 3, 5, 8]
+    assert _ids(index, all_tags=["fire", "WATER"]) == [2]
+    assert _ids(index, any_tags=["Water", "Earth"]) == [2, 3, 5]
+    assert _ids(index, all_tags=["Fire"], any_tags=["Earth", "Water"]) == [2, 5]
+    assert _ids(index, all_tags=["Fire", "Shadow"]) == []
+    assert _ids(index, rarities=[Rarity.RARE, Rarity.LEGENDARY]) == [2, 3, 8]
+    assert _ids(index, min_power=3, max_power=7) == [2, 3, 5]
+    assert _ids(index, max_power=4, any_tags=["Fire"]) == [1, 5]
+
+
+def test_cursor_pagination():
+    index = SearchIndex(CatalogSnapshot(cards=CARDS, generation=0))
+    mask = index.match()
+
+    first = index.page(mask, limit=2)
+    second = index.page(mask, first.next_cursor, limit=2)
+    last = index.page(mask, second.next_cursor, limit=2)
+
+    assert [card.id for card in first.cards] == [1, 2]
+    assert [card.id for card in second.cards] == [3, 5]
+    assert [card.id for card in last.cards] == [8] and last.next_cursor is None
+    assert first.total == second.total == 5
+    assert index.page(mask, 8).cards == []
+
+
+def test_index_follows_catalog_changes_incrementally():
+    search = CardSearch()
+    before = CatalogSnapshot(cards=CARDS, generation=0)
+    index = search.index(before)
+    changed = (
+        replace(CARDS[0], tags=("Water",)),
+        *CARDS[1:4],
+        _card(9, 4, tags=("Fire",)),
+    )
+    after = CatalogSnapshot(cards=changed, generation=1)
+
+    updated = search.index(after)
+
+    assert updated is search.index(after) and updated is not index
+    fresh = SearchIndex(after)
+    assert (updated.everything, updated.tags, updated.rarities, updated.powers) == (
+        fresh.everything,
+        fresh.tags,
+        fresh.rarities,
+        fresh.powers,
+    )
+    assert _ids(updated, any_tags=["Fire"]) == [2, 5, 9]
+    # The old index is untouched
+    assert _ids(index, any_tags=["Fire"]) == [1, 2, 5]
+
+
+def test_search_endpoint(client, test_db: Session):
+    fire, water = Tag(name="Fire"), Tag(name="Water")
+    cards = [
+        BattlerCard(name=f"Card {i}", power_level=i, rarity=Rarity.COMMON)
+        for i in range(1, 6)
+    ]
+    for card in cards[:3]:
+        card.tags.append(fire)
+    cards[2].tags.append(water)
+    test_db.add_all(cards)
+    test_db.commit()
+    ids, water_id = [card.id for card in cards], water.id
+
+    response = client.get("/api/game/cards/search", params={"tag": "fire", "limit": 2})
+    body = response.json()
+    assert response.status_code == 200
+    assert [card["id"] for card in body["cards"]] == ids[:2]
+    assert body["total"] == 3 and body["cards"][0]["tags"] == ["Fire"]
+
+    response = client.get(
+        "/api/game/cards/search",
+        params={"tag": "fire", "limit": 2, "cursor": body["next_cursor"]},
+    )
+    assert [card["id"] for card in response.json()["cards"]] == [ids[2]]
+    assert response.json()["next_cursor"] is None
+
+    card = test_db.get(BattlerCard, ids[4])
+    card.tags.append(test_db.get(Tag, water_id))
+    test_db.commit()
+    response = client.get(
+        "/api/game/cards/search",
+        params={"any_tag": ["Water"], "min_power": 2, "rarity": "Common"},
+    )
+    assert [card["id"] for card in response.json()["cards"]] == [ids[2], ids[4]]
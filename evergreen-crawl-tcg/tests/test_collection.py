@@ -0,0 +1,94 @@
+from sqlalchemy import event, insert
+from sqlalchemy.orm import Session
+
+from app.models.battler_card import BattlerCard, Rarity
+from app.models.player import Player, get_player_collection, player_cards
+from app.services.card_catalog import card_catalog
+
+
+def _seed_collection(db: Session, size: int) -> Player:
+    player = Player(username="collector")
+    cards = [
+        BattlerCard(name=f"Card {i}", power_level=i, rarity=Rarity.COMMON)
+        for i in range(size)
+    ]
+    db.add(player)
+    db.add_all(cards)
+    db.flush()
+    db.execute(
+        insert(player_cards),
+        [
+            {"player_id": player.id, "card_id": card.id, "quantity": i + 1}
+            for i, card in enumerate(cards)
+        ],
+    )
+    db.commit()
+    return player
+
+
+def _statements(test_db: Session, read) -> tuple:
+    statements = []
+    engine = test_db.get_bind()
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        result = read()
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    return result, statements
+
+
+def test_cards_list_uses_single_query(test_db: Session):
+    """Loading a collection costs one query regardless of its size"""
+    player = _seed_collection(test_db, 50)
+    test_db.expire_all()
+    player = test_db.get(Player, player.id)
+
+    cards, statements = _statements(test_db, lambda: player.cards_list)
+
+    assert len(statements) == 1
+    assert len(cards) == 50
+
+
+def test_warm_catalog_collection_uses_single_query(test_db: Session):
+    player_id = _seed_collection(test_db, 50).id
+    catalog = card_catalog.snapshot(test_db)
+
+    cards, statements = _statements(
+        test_db, lambda: get_player_collection(test_db, player_id, catalog)
+    )
+
+    assert len(statements) == 1
+    assert cards == get_player_collection(test_db, player_id)
+
+
+def test_stale_catalog_cards_are_read_from_the_database(test_db: Session):
+    """Cards added after the snapshot was taken are not dropped"""
+    player = _seed_collection(test_db, 3)
+    catalog = card_catalog.snapshot(test_db)
+    card = BattlerCard(name="Newcomer", power_level=9, rarity=Rarity.RARE)
+    test_db.add(card)
+    test_db.flush()
+    test_db.execute(
+        insert(player_cards),
+        {"player_id": player.id, "card_id": card.id, "quantity": 2},
+    )
+    test_db.commit()
+
+    cards = get_player_collection(test_db, player.id, catalog)
+
+    assert [entry["name"] for entry in cards][-1] == "Newcomer"
+    assert cards == get_player_collection(test_db, player.id)
+
+
+def test_get_player_collection_output_shape(test_db: Session):
+    """Each entry carries the card fields and its stored quantity"""
+    player = _seed_collection(test_db, 3)
+
+    cards = get_player_collection(test_db, player.id)
+
+    assert [card["name"] for card in cards] == ["Card 0", "Card 1", "Card 2"]
+    assert [card["quantity"] for card in cards] == [1, 2, 3]
+    for card in cards:
+        assert set(card) == {"id", "name", "power_level", "rarity", "quantity"}
+        assert card["rarity"] == Rarity.COMMON
@@ -0,0 +1,156 @@
+import numpy as np
+import pytest
+
+from app.models.battler_card import Rarity
+from app.models.card_effect import EffectType
+from app.services.card_catalog import CatalogCard, CatalogEffect, CatalogSnapshot
+from app.services.combat_engine import (
+    Monster,
+    compile_effect_table,
+    draw_hands,
+    effect_table,
+    resolve_fight,
+    resolve_fights,
+    roll_initiative,
+    simulate,
+)
+from app.services.game_service import generate_miniboss_encounter
+
+
+def _effect(effect_type, speed=None, condition=None):
+    return CatalogEffect(
+        id=0,
+        effect_type=effect_type,
+        speed_value=speed,
+        description=None,
+        trigger_condition=condition,
+    )
+
+
+def _card(card_id, power, *effects, tags=()):
+    return CatalogCard(
+        id=card_id,
+        name=f"Card {card_id}",
+        power_level=power,
+        rarity=Rarity.COMMON,
+        effect_description=None,
+        tags=tags,
+        effects=effects,
+    )
+
+
+CARDS = (
+    _card(1, 2),
+    _card(2, 3, _effect(EffectType.SPEED, 4)),
+    _card(3, 2, _effect(EffectType.EARLY_ATTACK, 2)),
+    _card(4, 1, _effect(EffectType.ENERGY, 5), _effect(EffectType.ENERGY, 5)),
+    _card(5, 3, _effect(EffectType.COUNTER, 6)),
+    _card(6, 1, _effect(EffectType.INTERRUPT, 7)),
+    _card(7, 2, _effect(EffectType.CONDITIONAL, 1, "Water"), tags=("Water",)),
+    _card(8, 2, tags=("Water",)),
+    _card(9, 4, _effect(EffectType.CONDITIONAL, 1, "Fire")),
+)
+TABLE = compile_effect_table(CatalogSnapshot(cards=CARDS, generation=0))
+STRIKER = Monster("Miniboss", 10, ((EffectType.EARLY_ATTACK, 3, 3),))
+
+
+def test_speed_and_plain_power_add_up():
+    result = resolve_fight(TABLE, [1, 1, 1, 2, 8], Monster("Slime", 5), True)
+
+    assert result.player_power == 2 * 3 + 3 + 4 + 2
+    assert result.won
+
+
+def test_energy_is_spent_by_early_attack():
+    result = resolve_fight(TABLE, [4, 3, 1, 1, 1], Monster("Slime", 20), True)
+
+    attack = next(entry for entry in result.log if entry["effect"] == "EarlyAttack")
+    assert attack["damage"] == 2 + 2
+    assert result.monster_power == 16
+    assert result.player_power == 1 + 2 + 6
+
+
+def test_counter_reflects_early_attack():
+    result = resolve_fight(TABLE, [5, 1, 1, 1, 1], STRIKER, False)
+
+    assert result.log[1]["countered"]
+    assert result.monster_power == 10 - 3
+    assert result.player_power == 3 + 8
+
+
+def test_interrupt_cancels_next_opposing_effect():
+    result = resolve_fight(TABLE, [6, 1, 1, 1, 1], STRIKER, True)
+
+    assert result.log[1] == {
+        "side": "monster",
+        "effect": "EarlyAttack",
+        "speed": 3,
+        "interrupted": True,
+    }
+    assert result.player_power == 9
+
+
+def test_conditional_needs_another_card_with_the_tag():
+    alone = resolve_fight(TABLE, [7, 1, 1, 1, 1], Monster("Slime", 1), True)
+    paired = resolve_fight(TABLE, [7, 8, 1, 1, 1], Monster("Slime", 1), True)
+    unknown_tag = resolve_fight(TABLE, [9, 8, 1, 1, 1], Monster("Slime", 1), True)
+
+    assert alone.log == []
+    assert paired.player_power == 2 + 2 + 2 + 6
+    assert unknown_tag.log == []
+
+
+def test_ties_go_to_initiative():
+    assert resolve_fight(TABLE, [1] * 5, Monster("Mirror", 10), True).won
+    assert not resolve_fight(TABLE, [1] * 5, Monster("Mirror", 10), False).won
+
+
+def test_batch_matches_single_fights():
+    rng = np.random.default_rng(7)
+    deck = np.repeat(np.arange(len(CARDS)), 3)
+    hands = draw_hands(rng, deck, 500)
+    player_first = roll_initiative(rng, 500)
+
+    won, player_total, monster_total = resolve_fights(
+        TABLE, hands, STRIKER, player_first
+    )
+
+    for i in range(500):
+        result = resolve_fight(
+            TABLE,
+            [int(TABLE.card_ids[row]) for row in hands[i]],
+            STRIKER,
+            bool(player_first[i]),
+        )
+        assert (result.won, result.player_power, result.monster_power) == (
+            won[i],
+            player_total[i],
+            monster_total[i],
+        )
+
+
+def test_simulation_is_reproducible_across_workers():
+    deck = {card.id: 2 for card in CARDS}
+
+    inline = simulate(TABLE, deck, STRIKER, 5000, seed=11, workers=1, chunk_size=1024)
+    pooled = simulate(TABLE, deck, STRIKER, 5000, seed=11, workers=2, chunk_size=1024)
+
+    assert inline == pooled
+    assert inline.fights == 5000 and 0 < inline.wins < 5000
+    assert sum(inline.card_fights.values()) >= 5000
+    assert all(inline.card_wins[card] <= inline.card_fights[card] for card in deck)
+
+
+def test_simulation_rejects_short_or_unknown_decks():
+    with pytest.raises(ValueError):
+        simulate(TABLE, {1: 4}, STRIKER, 10)
+    with pytest.raises(ValueError):
+        simulate(TABLE, {99: 5}, STRIKER, 10)
+
+
+def test_monster_from_encounter_and_table_cache():
+    monster = Monster.from_encounter(generate_miniboss_encounter())
+    assert monster.effects == STRIKER.effects
+
+    catalog = CatalogSnapshot(cards=CARDS, generation=1)
+    assert effect_table(catalog) is effect_table(catalog)
@@ -0,0 +1,172 @@
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.models.battler_card import BattlerCard, Rarity
+from app.models.card_effect import EffectType
+from app.models.deck import Deck, set_deck_cards
+from app.models.player import Player
+from app.services import deck_estimator as estimator_module
+from app.services.card_catalog import CatalogCard, CatalogEffect, CatalogSnapshot
+from app.services.combat_engine import compile_effect_table
+from app.services.deck_estimator import (
+    DeckEstimator,
+    deck_hash,
+    estimate,
+    wilson_interval,
+)
+
+
+def _card(card_id, power, *effects):
+    return CatalogCard(
+        id=card_id,
+        name=f"Card {card_id}",
+        power_level=power,
+        rarity=Rarity.COMMON,
+        effect_description=None,
+        tags=(),
+        effects=effects,
+    )
+
+
+CARDS = (
+    _card(1, 2),
+    _card(2, 3, CatalogEffect(0, EffectType.SPEED, 4, None, None)),
+    _card(3, 1, CatalogEffect(0, EffectType.COUNTER, 6, None, None)),
+)
+TABLE = compile_effect_table(CatalogSnapshot(cards=CARDS, generation=0))
+
+
+def test_wilson_interval_and_deck_hash():
+    low, high = wilson_interval(50, 100)
+    assert low < 0.5 < high and high - low == pytest.approx(0.19, abs=0.01)
+    assert wilson_interval(0, 20)[0] == 0.0 and wilson_interval(20, 20)[1] == 1.0
+
+    assert deck_hash({1: 2, 2: 3}) == deck_hash({2: 3, 1: 2, 3: 0})
+    assert deck_hash({1: 2, 2: 3}) != deck_hash({1: 3, 2: 2})
+
+
+def test_estimate_is_reproducible_across_workers():
+    deck = {1: 6, 2: 4, 3: 3}
+
+    inline = estimate(TABLE, deck, floors=600, seed=5, chunk_size=256)
+    with ProcessPoolExecutor(2, mp_context=get_context("spawn")) as pool:
+        pooled = estimate(TABLE, deck, floors=600, seed=5, pool=pool, chunk_size=256)
+
+    assert inline == pooled
+    assert 0 < inline.floors_cleared < 600
+    assert inline.fights > 600 and inline.fights_won <= inline.fights
+    assert inline.win_rate < inline.fight_win_rate
+
+
+def test_concurrent_estimates_share_one_run(monkeypatch):
+    catalog = CatalogSnapshot(cards=CARDS, generation=0)
+    estimator = DeckEstimator(workers=1)
+    started, release = threading.Event(), threading.Event()
+    runs = []
+    real_estimate = estimator_module.estimate
+
+    def slow_estimate(*args, **kwargs):
+        runs.append(args)
+        started.set()
+        release.wait(5)
+        return real_estimate(*args, **kwargs)
+
+    monkeypatch.setattr(estimator_module, "estimate", slow_estimate)
+    deck = {1: 6, 2: 4, 3: 3}
+    results = []
+
+    def run():
+        results.append(estimator.estimate(catalog, deck, floors=200, seed=1))
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    threads[0].start()
+    assert started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    # Let the others reach the estimator while the first run is in flight
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(runs) == 1
+    assert len(results) == 4 and len(set(results)) == 1
+
+
+def test_pool_lifecycle():
+    estimator = DeckEstimator(workers=1)
+    estimator.start()
+    assert estimator._pool is None
+
+    estimator = DeckEstimator(workers=2)
+    estimator.start()
+    try:
+        assert estimator._pool is not None
+        assert estimator._pool._mp_context.get_start_method() == "spawn"
+    finally:
+        estimator.stop()
+    assert estimator._pool is None
+
+
+def _deck(test_db: Session, quantities=(5, 5, 5), **kwargs) -> int:
+    cards = [
+        BattlerCard(name=f"Card {i}", power_level=i, rarity=Rarity.COMMON)
+        for i in range(1, 4)
+    ]
+    player = Player(username="estimator")
+    test_db.add_all([player, *cards])
+    test_db.flush()
+    deck = Deck(name="Deck", player_id=player.id, **kwargs)
+    test_db.add(deck)
+    test_db.flush()
+    ids = [card.id for card in cards]
+    set_deck_cards(test_db, deck.id, dict(zip(ids, quantities)))
+    test_db.commit()
+    return deck.id
+
+
+def test_estimate_endpoint_memoizes_by_deck_contents(client, test_db, monkeypatch):
+    deck_id = _deck(test_db)
+    runs = []
+    real_estimate = estimator_module.estimate
+    monkeypatch.setattr(
+        estimator_module,
+        "estimate",
+        lambda *args, **kwargs: runs.append(args) or real_estimate(*args, **kwargs),
+    )
+
+    url = f"/api/game/deck/{deck_id}/estimate"
+    first = client.get(url, params={"floors": 500})
+    again = client.get(url, params={"floors": 500})
+
+    assert first.status_code == 200
+    assert first.json() == again.json()
+    assert len(runs) == 1
+    body = first.json()
+    low, high = body["win_rate_interval"]
+    assert low <= body["win_rate"] <= high and body["confidence"] == 0.95
+
+    card_id = test_db.query(BattlerCard.id).filter_by(name="Card 1").scalar()
+    response = client.patch(
+        f"/api/game/deck/{deck_id}/cards", json={"cards": {card_id: 6}}
+    )
+    assert response.status_code == 200
+    changed = client.get(url, params={"floors": 500})
+
+    assert len(runs) == 2
+    assert changed.json()["deck_hash"] != body["deck_hash"]
+
+
+def test_estimate_endpoint_errors(client, test_db):
+    assert client.get("/api/game/deck/999/estimate").status_code == 404
+
+    short = _deck(test_db, (1, 1, 1), is_starter=True)
+    assert client.get(f"/api/game/deck/{short}/estimate").status_code == 400
+    assert client.get(f"/api/game/deck/{short}/estimate?floors=5").status_code == 422
+    too_many = client.get(f"/api/game/deck/{short}/estimate?floors=1000000")
+    assert too_many.status_code == 422
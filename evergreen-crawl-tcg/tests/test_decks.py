@@ -0,0 +1,123 @@
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.battler_card import BattlerCard, Rarity
+from app.models.deck import (
+    Deck,
+    deck_cards,
+    get_deck_cards,
+    replace_deck_cards,
+    set_deck_cards,
+)
+from app.models.player import Player
+
+
+def _cards(test_db: Session, count: int = 5) -> list:
+    cards = [
+        BattlerCard(name=f"Card {i}", power_level=i, rarity=Rarity.COMMON)
+        for i in range(count)
+    ]
+    test_db.add_all(cards)
+    test_db.commit()
+    return [card.id for card in cards]
+
+
+def _deck(test_db: Session, **kwargs) -> Deck:
+    player = Player(username="builder")
+    test_db.add(player)
+    test_db.flush()
+    deck = Deck(name="Deck", player_id=player.id, **kwargs)
+    test_db.add(deck)
+    test_db.commit()
+    return deck
+
+
+def test_set_deck_cards_upserts_only_named_cards(test_db: Session):
+    first, second, third = _cards(test_db, 3)
+    deck = _deck(test_db)
+
+    set_deck_cards(test_db, deck.id, {first: 2, second: 3})
+    set_deck_cards(test_db, deck.id, {second: 1, third: 4})
+    set_deck_cards(test_db, deck.id, {first: 0})
+    test_db.commit()
+
+    assert get_deck_cards(test_db, [deck.id])[deck.id] == {second: 1, third: 4}
+
+
+def test_replace_deck_cards(test_db: Session):
+    first, second, third = _cards(test_db, 3)
+    deck = _deck(test_db)
+    set_deck_cards(test_db, deck.id, {first: 2, second: 3})
+
+    replace_deck_cards(test_db, deck.id, {second: 3, third: 1})
+    test_db.commit()
+
+    assert get_deck_cards(test_db, [deck.id])[deck.id] == {second: 3, third: 1}
+
+
+def test_card_count_is_summed_in_sql(test_db: Session):
+    first, second = _cards(test_db, 2)
+    deck = _deck(test_db)
+    set_deck_cards(test_db, deck.id, {first: 10, second: 3})
+    test_db.commit()
+
+    assert test_db.scalar(select(Deck.card_count).where(Deck.id == deck.id)) == 13
+    test_db.expire_all()
+    assert test_db.get(Deck, deck.id).has_legal_size
+
+
+def test_create_deck_enforces_size(client, test_db: Session):
+    card_ids = _cards(test_db)
+
+    too_small = client.post("/api/game/deck", json={"name": "Tiny", "cards": card_ids})
+    assert too_small.status_code == 400
+
+    cards = card_ids * 3  # 15 cards, 3 copies each
+    response = client.post("/api/game/deck", json={"name": "Main", "cards": cards})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["card_count"] == 15
+    assert {card["quantity"] for card in body["cards"]} == {3}
+
+    unknown = client.post("/api/game/deck", json={"name": "Bad", "cards": [999] * 13})
+    assert unknown.status_code == 400
+
+
+def test_edit_deck_rows(client, test_db: Session):
+    card_ids = _cards(test_db)
+    deck_id = client.post(
+        "/api/game/deck", json={"name": "Main", "cards": card_ids * 3}
+    ).json()["id"]
+
+    response = client.patch(
+        f"/api/game/deck/{deck_id}/cards", json={"cards": {str(card_ids[0]): 1}}
+    )
+    assert response.status_code == 200
+    assert response.json()["card_count"] == 13
+
+    # Dropping below the minimum is refused and rolled back
+    response = client.patch(
+        f"/api/game/deck/{deck_id}/cards", json={"cards": {str(card_ids[1]): 0}}
+    )
+    assert response.status_code == 400
+    rows = test_db.execute(
+        select(deck_cards.c.card_id).where(deck_cards.c.deck_id == deck_id)
+    )
+    assert len(rows.all()) == 5
+
+
+def test_edit_deck_rejects_negative_quantities(client, test_db: Session):
+    card_ids = _cards(test_db)
+    deck_id = client.post(
+        "/api/game/deck", json={"name": "Main", "cards": card_ids * 3}
+    ).json()["id"]
+
+    response = client.patch(
+        f"/api/game/deck/{deck_id}/cards", json={"cards": {str(card_ids[0]): -1}}
+    )
+
+    assert response.status_code == 422
+    rows = test_db.execute(
+        select(deck_cards.c.quantity).where(deck_cards.c.deck_id == deck_id)
+    )
+    assert rows.scalars().all() == [3] * 5
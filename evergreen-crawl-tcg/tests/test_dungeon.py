@@ -0,0 +1,183 @@
+import random
+
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.models.dungeon import (
+    CELL_CODES,
+    DungeonInstance,
+    decode_layout,
+    empty_bitset,
+    encode_layout,
+    expand_snapshot,
+    pack_position,
+    unpack_position,
+)
+from app.models.player import Player
+
+LAYOUT = [
+    ["safe", "monster", "empty"],
+    ["trap", "treasure", "shrine"],
+    ["merchant", "miniboss", "exit"],
+]
+
+
+def _dungeon() -> DungeonInstance:
+    dungeon = DungeonInstance(grid_size=3, visited_cells=empty_bitset(3))
+    dungeon.set_layout(LAYOUT)
+    dungeon.set_position(0, 0)
+    dungeon.mark_visited(0, 0)
+    return dungeon
+
+
+def test_layout_round_trip():
+    """Layouts pack to one byte per cell and decode unchanged"""
+    data = encode_layout(LAYOUT)
+
+    assert len(data) == 9
+    assert decode_layout(data, 3) == LAYOUT
+
+
+def test_position_packing():
+    assert unpack_position(pack_position(7, 1234)) == (7, 1234)
+
+
+def test_single_cell_lookups():
+    dungeon = _dungeon()
+
+    assert dungeon.cell_type_at(1, 0) == "monster"
+    assert dungeon.cell_type_at(2, 2) == "exit"
+    assert dungeon.is_visited(0, 0)
+    assert not dungeon.is_visited(1, 0)
+
+
+def test_visible_cells_use_fog():
+    """Visited and adjacent cells are revealed, everything else is fog"""
+    dungeon = _dungeon()
+    dungeon.set_position(1, 0)
+    dungeon.mark_visited(1, 0)
+    dungeon.set_position(2, 0)
+    dungeon.mark_visited(2, 0)
+
+    cells = {(cell["x"], cell["y"]): cell for cell in dungeon.get_visible_cells()}
+
+    assert cells[(0, 0)]["type"] == "safe" and cells[(0, 0)]["is_visited"]
+    assert cells[(1, 1)]["type"] == "treasure" and not cells[(1, 1)]["is_visited"]
+    assert cells[(0, 1)]["type"] == "fog"
+    assert cells[(0, 2)]["type"] == "fog"
+
+
+def test_move_persists_packed_state(client: TestClient, test_db: Session):
+    """Moving through the API updates the packed position and bitset"""
+    player = Player(username="walker")
+    test_db.add(player)
+    test_db.commit()
+    player_id = player.id
+
+    response = client.post(f"/api/game/dungeon/{player_id}/start?seed=1")
+    assert response.status_code == 200
+    assert len(response.json()) == 100
+
+    response = client.post(f"/api/game/dungeon/{player_id}/move", json={"x": 1, "y": 0})
+    assert response.status_code == 200
+    assert response.json()["position"] == {"x": 1, "y": 0}
+
+    test_db.expire_all()
+    dungeon = test_db.query(DungeonInstance).filter_by(player_id=player_id).one()
+    assert dungeon.position == (1, 0)
+    assert dungeon.is_visited(1, 0) and dungeon.is_visited(0, 0)
+    assert len(dungeon.layout) == 100
+
+    response = client.post(f"/api/game/dungeon/{player_id}/move", json={"x": 3, "y": 0})
+    assert response.status_code == 400
+
+
+def test_visited_bitset_tracks_changes(test_db: Session):
+    """Marking a cell visited in place is flushed without reassigning"""
+    player = Player(username="tracker")
+    test_db.add(player)
+    test_db.flush()
+    dungeon = _dungeon()
+    dungeon.player_id = player.id
+    test_db.add(dungeon)
+    test_db.commit()
+
+    dungeon.mark_visited(2, 1)
+    assert dungeon in test_db.dirty
+    test_db.commit()
+    test_db.expire_all()
+
+    assert sorted(dungeon.visited_positions()) == [(0, 0), (2, 1)]
+
+
+def _walk(dungeon: DungeonInstance, steps: int, seed: int) -> list:
+    """Randomly walk the dungeon, returning the full grid at each revision"""
+    rng = random.Random(seed)
+    history = [dungeon.get_visible_cells()]
+    while len(history) <= steps:
+        x, y = dungeon.position
+        dx, dy = rng.choice([(1, 0), (-1, 0), (0, 1), (0, -1)])
+        if dungeon.is_valid_move(x + dx, y + dy):
+            dungeon.move_to(x + dx, y + dy)
+            history.append(dungeon.get_visible_cells())
+    return history
+
+
+def _big_dungeon(size: int = 8) -> DungeonInstance:
+    rng = random.Random(size)
+    values = [cell_type.value for cell_type in CELL_CODES]
+    dungeon = DungeonInstance(grid_size=size)
+    dungeon.set_layout([[rng.choice(values) for _ in range(size)] for _ in range(size)])
+    dungeon.start_at(0, 0)
+    return dungeon
+
+
+def test_visibility_delta_replays_to_current_grid():
+    """Applying a delta to any past revision reproduces the current grid"""
+    dungeon = _big_dungeon()
+    history = _walk(dungeon, 40, seed=11)
+    current = dungeon.get_visible_cells()
+    assert dungeon.revision == 40
+
+    for revision, grid in enumerate(history):
+        cells = {(cell["x"], cell["y"]): cell for cell in grid}
+        for cell in dungeon.get_visibility_delta(revision):
+            cells[(cell["x"], cell["y"])] = cell
+        assert sorted(cells.values(), key=lambda c: (c["y"], c["x"])) == current
+
+    assert dungeon.get_visibility_delta(40) == []
+    assert dungeon.get_visibility_delta(41) is None
+
+
+def test_snapshot_expands_to_visible_cells():
+    """The run-length encoded snapshot carries the same grid"""
+    dungeon = _big_dungeon()
+    _walk(dungeon, 15, seed=3)
+
+    runs = dungeon.get_visibility_snapshot()
+
+    assert expand_snapshot(runs, 8) == dungeon.get_visible_cells()
+    assert len(runs) < 64
+
+
+def test_resync_endpoint(client: TestClient, test_db: Session):
+    """Reconnecting clients get a delta for known revisions, else a snapshot"""
+    player = Player(username="resync")
+    test_db.add(player)
+    test_db.commit()
+    player_id = player.id
+
+    client.post(f"/api/game/dungeon/{player_id}/start?seed=2")
+    moved = client.post(
+        f"/api/game/dungeon/{player_id}/move",
+        json={"x": 0, "y": 1, "since_revision": 0},
+    ).json()
+    assert moved["revision"] == 1
+    assert all(cell["is_visible"] or cell["type"] == "fog" for cell in moved["cells"])
+
+    delta = client.get(f"/api/game/dungeon/{player_id}/cells?since=1").json()
+    assert delta["mode"] == "delta" and delta["cells"] == []
+
+    snapshot = client.get(f"/api/game/dungeon/{player_id}/cells").json()
+    assert snapshot["mode"] == "snapshot"
+    assert len(expand_snapshot(snapshot["cells"], snapshot["grid_size"])) == 100
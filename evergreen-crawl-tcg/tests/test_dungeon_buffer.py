@@ -0,0 +1,184 @@
+import asyncio
+import atexit
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.dungeon import DungeonInstance
+from app.models.player import Player
+from app.services.dungeon_buffer import DungeonWriteBuffer
+from app.services.game_service import move_player
+
+LAYOUT = [
+    ["safe", "empty", "empty"],
+    ["empty", "empty", "empty"],
+    ["empty", "empty", "exit"],
+]
+
+
+def _setup(test_db: Session, **kwargs):
+    player = Player(username="walker", gold=0)
+    test_db.add(player)
+    test_db.flush()
+    dungeon = DungeonInstance(player_id=player.id, current_floor=1, grid_size=3)
+    dungeon.set_layout(LAYOUT)
+    dungeon.start_at(0, 0)
+    test_db.add(dungeon)
+    test_db.commit()
+
+    kwargs.setdefault("flush_interval", 60)
+    kwargs.setdefault("max_dirty_moves", 100)
+    buffer = DungeonWriteBuffer(
+        session_factory=lambda: Session(bind=test_db.get_bind()), **kwargs
+    )
+    return player.id, buffer
+
+
+def _stored_position(test_db: Session, player_id: int):
+    test_db.expire_all()
+    return (
+        test_db.query(DungeonInstance)
+        .filter(DungeonInstance.player_id == player_id)
+        .one()
+        .position
+    )
+
+
+@pytest.mark.asyncio
+async def test_moves_stay_in_memory_until_flushed(
+    test_db: Session, async_db: AsyncSession
+):
+    player_id, buffer = _setup(test_db)
+    try:
+        await move_player(async_db, player_id, 1, 0, buffer=buffer)
+        result = await move_player(async_db, player_id, 1, 1, buffer=buffer)
+
+        assert result["revision"] == 2
+        assert _stored_position(test_db, player_id) == (0, 0)
+        assert buffer.dirty_count() == 1
+
+        assert buffer.flush() == 1
+        assert buffer.dirty_count() == 0
+        stored = (
+            test_db.query(DungeonInstance)
+            .filter(DungeonInstance.player_id == player_id)
+            .one()
+        )
+        assert stored.position == (1, 1)
+        assert stored.revision == 2
+        assert stored.visited_positions() == [(0, 0), (1, 0), (1, 1)]
+    finally:
+        buffer.stop()
+
+
+@pytest.mark.asyncio
+async def test_dirty_move_bound_forces_a_flush(
+    test_db: Session, async_db: AsyncSession
+):
+    player_id, buffer = _setup(test_db, max_dirty_moves=3)
+    try:
+        await move_player(async_db, player_id, 1, 0, buffer=buffer)
+        await move_player(async_db, player_id, 2, 0, buffer=buffer)
+        assert _stored_position(test_db, player_id) == (0, 0)
+
+        await move_player(async_db, player_id, 2, 1, buffer=buffer)
+        assert _stored_position(test_db, player_id) == (2, 1)
+        assert buffer.dirty_count() == 0
+    finally:
+        buffer.stop()
+
+
+@pytest.mark.asyncio
+async def test_exit_event_writes_through(test_db: Session, async_db: AsyncSession):
+    player_id, buffer = _setup(test_db)
+    try:
+        for x, y in [(1, 0), (2, 0), (2, 1)]:
+            await move_player(async_db, player_id, x, y, buffer=buffer)
+        result = await move_player(async_db, player_id, 2, 2, buffer=buffer)
+
+        assert result["event"]["type"] == "exit"
+        assert _stored_position(test_db, player_id) == (2, 2)
+    finally:
+        buffer.stop()
+
+
+@pytest.mark.asyncio
+async def test_evict_writes_and_forgets(test_db: Session, async_db: AsyncSession):
+    player_id, buffer = _setup(test_db)
+    try:
+        await move_player(async_db, player_id, 0, 1, buffer=buffer)
+        buffer.evict(player_id)
+
+        assert len(buffer) == 0
+        assert _stored_position(test_db, player_id) == (0, 1)
+    finally:
+        buffer.stop()
+
+
+@pytest.mark.asyncio
+async def test_background_flush(test_db: Session, async_db: AsyncSession):
+    player_id, buffer = _setup(test_db, flush_interval=0.05)
+    try:
+        await move_player(async_db, player_id, 0, 1, buffer=buffer)
+        await asyncio.sleep(0.3)
+
+        assert buffer.dirty_count() == 0
+        assert _stored_position(test_db, player_id) == (0, 1)
+    finally:
+        buffer.stop()
+
+
+def test_exit_hook_is_registered_once(test_db: Session, monkeypatch):
+    _, buffer = _setup(test_db)
+    hooks = []
+    monkeypatch.setattr(atexit, "register", hooks.append)
+    monkeypatch.setattr(atexit, "unregister", hooks.remove)
+    try:
+        buffer.start()
+        buffer.start()
+        assert hooks == [buffer.stop]
+
+        buffer.stop()
+        assert hooks == []
+        buffer.start()
+        assert hooks == [buffer.stop]
+    finally:
+        buffer.stop()
+
+
+def test_idle_drop_spares_entries_being_used(test_db: Session):
+    player_id, buffer = _setup(test_db, idle_timeout=60)
+    try:
+        assert buffer.load(test_db, player_id)
+        buffer._entries[player_id].last_used -= 120
+        # A second load() touches the entry, so the caller can still use it
+        assert buffer.load(test_db, player_id)
+        buffer._drop_idle()
+        assert player_id in buffer
+
+        with buffer.dungeon(player_id) as dungeon:
+            buffer._entries[player_id].last_used -= 120
+            buffer._drop_idle()
+            assert dungeon is not None and player_id in buffer
+
+        buffer._drop_idle()
+        assert player_id not in buffer
+    finally:
+        buffer.stop()
+
+
+def test_flush_without_visited_cells(test_db: Session):
+    player_id, buffer = _setup(test_db)
+    try:
+        buffer.load(test_db, player_id)
+        with buffer.dungeon(player_id) as dungeon:
+            dungeon.visited_cells = None
+        buffer.mark_dirty(player_id)
+
+        assert buffer.flush() == 1
+        test_db.expire_all()
+        stored = test_db.query(DungeonInstance).filter_by(player_id=player_id).one()
+        assert stored.visited_cells is None and stored.position == (0, 0)
+    finally:
+        buffer.stop()
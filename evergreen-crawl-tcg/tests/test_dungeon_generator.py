@@ -0,0 +1,58 @@
+import numpy as np
+
+from app.models.dungeon import CELL_CODES, CellType, DungeonInstance
+from app.services.dungeon_generator import (
+    CELL_PROBABILITIES,
+    generate_layout_codes,
+    generate_layouts,
+    spawn_seeds,
+)
+from app.services.game_service import generate_dungeon_layout
+
+
+def test_same_seed_same_floor():
+    assert np.array_equal(generate_layout_codes(20, 5), generate_layout_codes(20, 5))
+    assert not np.array_equal(
+        generate_layout_codes(20, 5), generate_layout_codes(20, 6)
+    )
+    assert np.array_equal(generate_layout_codes(8, -3), generate_layout_codes(8, -3))
+
+
+def test_start_and_exit_are_fixed():
+    codes = generate_layout_codes(12, 1)
+
+    assert codes[0, 0] == CELL_CODES[CellType.SAFE]
+    assert codes[11, 11] == CELL_CODES[CellType.EXIT]
+
+
+def test_batch_matches_single_generation():
+    seeds = spawn_seeds(99, 16)
+
+    floors = generate_layouts(seeds, 10)
+
+    assert floors.shape == (16, 10, 10)
+    for seed, floor in zip(seeds, floors):
+        assert np.array_equal(floor, generate_layout_codes(10, seed))
+
+
+def test_cell_distribution_matches_sequential_rolls():
+    """One bucketed draw gives the same odds as rolling each type in turn"""
+    codes = generate_layout_codes(400, 0)
+    counts = np.bincount(codes.ravel(), minlength=len(CELL_CODES)) / codes.size
+
+    miss = 1.0
+    for cell_type, probability in CELL_PROBABILITIES:
+        expected = miss * probability
+        if cell_type is not CellType.SAFE:
+            assert abs(counts[CELL_CODES[cell_type]] - expected) < 0.01
+        miss *= 1.0 - probability
+    assert abs(counts[CELL_CODES[CellType.EMPTY]] - miss) < 0.01
+
+
+def test_generate_dungeon_layout_stores_packed_codes():
+    dungeon = DungeonInstance(grid_size=10)
+
+    generate_dungeon_layout(dungeon, seed=42)
+
+    assert dungeon.layout == generate_layout_codes(10, 42).tobytes()
+    assert dungeon.cell_type_at(9, 9) == "exit"
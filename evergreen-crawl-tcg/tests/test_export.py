@@ -0,0 +1,93 @@
+import gzip
+import json
+
+from sqlalchemy.orm import Session
+
+from app.models.battler_card import BattlerCard, Rarity
+from app.models.deck import Deck, set_deck_cards
+from app.models.dungeon import DungeonInstance
+from app.models.player import Player, add_player_cards
+from app.schemas.game import GameState
+from app.services import export_service
+
+
+def _setup(test_db: Session, cards: int = 30) -> int:
+    card_rows = [
+        BattlerCard(name=f"Card {i}", power_level=i, rarity=Rarity.COMMON)
+        for i in range(cards)
+    ]
+    player = Player(username="exporter", gold=10)
+    test_db.add_all(card_rows + [player])
+    test_db.flush()
+    add_player_cards(test_db, player.id, {card.id: 2 for card in card_rows})
+
+    for name in ("Main", "Side"):
+        deck = Deck(name=name, player_id=player.id)
+        test_db.add(deck)
+        test_db.flush()
+        set_deck_cards(test_db, deck.id, {card.id: 1 for card in card_rows[:13]})
+    test_db.add(Deck(name="Empty", player_id=player.id))
+
+    dungeon = DungeonInstance(player_id=player.id, current_floor=2, grid_size=3)
+    dungeon.set_layout([["safe", "empty", "empty"]] * 3)
+    dungeon.start_at(0, 0)
+    test_db.add(dungeon)
+    test_db.commit()
+    return player.id
+
+
+def test_ndjson_export_streams_typed_records(client, test_db: Session, monkeypatch):
+    monkeypatch.setattr(export_service, "EXPORT_BATCH_SIZE", 7)
+    player_id = _setup(test_db)
+
+    response = client.get(f"/api/game/state/{player_id}/stream")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert records[0]["type"] == "player"
+    assert records[0]["username"] == "exporter"
+    cards = [record for record in records if record["type"] == "card"]
+    assert len(cards) == 30 and {card["quantity"] for card in cards} == {2}
+    decks = [record for record in records if record["type"] == "deck"]
+    assert [(deck["name"], deck["card_count"]) for deck in decks] == [
+        ("Main", 13),
+        ("Side", 13),
+        ("Empty", 0),
+    ]
+    assert [deck["is_starter"] for deck in decks] == [False, False, False]
+    assert records[-1]["type"] == "dungeon"
+    assert records[-1]["floor"] == 2
+
+
+def test_json_export_matches_game_state(client, test_db: Session, monkeypatch):
+    monkeypatch.setattr(export_service, "EXPORT_BATCH_SIZE", 7)
+    player_id = _setup(test_db)
+
+    response = client.get(f"/api/game/state/{player_id}/stream?format=json")
+
+    state = GameState.model_validate(response.json())
+    assert len(state.collection) == 30
+    assert len(state.decks) == 3
+    assert state.active_dungeon.position.x == 0
+    assert all(cell.is_visible for cell in state.active_dungeon.visible_cells)
+
+
+def test_gzip_export(client, test_db: Session):
+    player_id = _setup(test_db)
+
+    response = client.get(f"/api/game/state/{player_id}/stream?gzip=true")
+
+    assert response.headers["content-type"] == "application/gzip"
+    assert 'filename="player-' in response.headers["content-disposition"]
+    # TestClient does not decode a gzip download, so the body is the archive
+    lines = gzip.decompress(response.content).decode().splitlines()
+    assert json.loads(lines[0])["type"] == "player"
+
+
+def test_stream_export_errors(client, test_db: Session):
+    player_id = _setup(test_db)
+
+    assert client.get("/api/game/state/999/stream").status_code == 404
+    bad = client.get(f"/api/game/state/{player_id}/stream?format=xml")
+    assert bad.status_code == 400
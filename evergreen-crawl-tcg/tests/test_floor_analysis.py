@@ -0,0 +1,133 @@
+import heapq
+
+import numpy as np
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.models.dungeon import CELL_CODES, CellType, DungeonInstance, encode_layout
+from app.models.player import Player
+from app.services.dungeon_generator import generate_layouts, spawn_seeds
+from app.services.floor_analysis import (
+    COSTS_BY_CODE,
+    DISTANCE_DTYPE,
+    acceptable,
+    analyze_dungeon,
+    analyze_floor,
+    exit_distances,
+    route_to_exit,
+)
+from app.services.floor_pool import FloorPool
+
+
+def _dijkstra(layout: np.ndarray) -> np.ndarray:
+    size = layout.shape[0]
+    distances = np.full((size, size), np.iinfo(np.int64).max)
+    distances[size - 1, size - 1] = 0
+    queue = [(0, size - 1, size - 1)]
+    while queue:
+        distance, x, y = heapq.heappop(queue)
+        if distance > distances[y, x]:
+            continue
+        # Walking backwards: reaching (nx, ny) from here enters (x, y)
+        step = distance + COSTS_BY_CODE[layout[y, x]]
+        for nx, ny in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+            if 0 <= nx < size and 0 <= ny < size and step < distances[ny, nx]:
+                distances[ny, nx] = step
+                heapq.heappush(queue, (step, nx, ny))
+    return distances
+
+
+def test_distances_match_dijkstra_for_a_batch():
+    layouts = generate_layouts(spawn_seeds(3, 50), 8)
+
+    batch = exit_distances(layouts)
+
+    for layout, distances in zip(layouts, batch):
+        assert (distances == _dijkstra(layout)).all()
+        assert (exit_distances(layout) == distances).all()
+
+
+def test_route_goes_around_monsters():
+    rows = [
+        ["safe", "monster", "empty"],
+        ["empty", "monster", "empty"],
+        ["empty", "empty", "exit"],
+    ]
+    layout = np.frombuffer(encode_layout(rows), np.uint8).reshape(3, 3)
+
+    distances = exit_distances(layout)
+    route = route_to_exit(layout, distances, 0, 0)
+
+    assert distances[0, 0] == 4
+    assert route == [(0, 1), (0, 2), (1, 2), (2, 2)]
+    assert route_to_exit(layout, distances, 2, 2) == []
+
+
+def test_risky_floors_are_rejected():
+    monster = CELL_CODES[CellType.MINIBOSS]
+    quiet = np.zeros((2, 4, 4), np.uint8)
+    quiet[:, -1, -1] = CELL_CODES[CellType.EXIT]
+    quiet[1, :, 1] = monster  # A wall of minibosses across the floor
+
+    assert acceptable(quiet).tolist() == [True, False]
+
+
+def test_pool_hands_out_acceptable_floors():
+    pool = FloorPool(pool_size=16)
+    pool._wanted.add((10, 1, 1))
+
+    pool.refill()
+
+    pooled = list(pool._pools[(10, 1, 1)])
+    floors = np.stack(
+        [np.frombuffer(floor.layout, np.uint8).reshape(10, 10) for floor in pooled]
+    )
+    assert len(floors) and acceptable(floors).all()
+    # Floors come with their analysis, so assigning one computes nothing
+    for layout, floor in zip(floors, pooled):
+        assert floor == analyze_floor(layout)
+        distances = np.frombuffer(floor.exit_distances, DISTANCE_DTYPE)
+        assert (distances.reshape(10, 10) == exit_distances(layout)).all()
+
+
+def test_dungeon_stores_route_and_distance_hints(client: TestClient, test_db: Session):
+    player = Player(username="pathfinder")
+    test_db.add(player)
+    test_db.commit()
+    player_id = player.id
+
+    client.post(f"/api/game/dungeon/{player_id}/start?seed=9")
+    dungeon = test_db.query(DungeonInstance).filter_by(player_id=player_id).one()
+    stored_route = dungeon.exit_route_positions()
+    start_distance = dungeon.distance_to_exit(0, 0)
+
+    assert stored_route[0] == (0, 0) and stored_route[-1] == (9, 9)
+    assert dungeon.distance_to_exit(9, 9) == 0
+
+    route = client.get(f"/api/game/dungeon/{player_id}/route").json()
+    assert route["exit_distance"] == start_distance
+    assert [(cell["x"], cell["y"]) for cell in route["route"]] == stored_route[1:]
+
+    x, y = stored_route[1]
+    moved = client.post(f"/api/game/dungeon/{player_id}/move", json={"x": x, "y": y})
+    assert moved.json()["exit_distance"] < start_distance
+
+    # Dungeons stored before floors were analyzed get analyzed on request
+    test_db.expire_all()
+    dungeon = test_db.query(DungeonInstance).filter_by(player_id=player_id).one()
+    dungeon.exit_distances = dungeon.exit_route = None
+    test_db.commit()
+    dungeon_id = dungeon.id
+    route = client.get(f"/api/game/dungeon/{player_id}/route").json()
+    assert [(cell["x"], cell["y"]) for cell in route["route"]] == stored_route[2:]
+    test_db.expire_all()
+    assert test_db.get(DungeonInstance, dungeon_id).exit_route is not None
+
+
+def test_analyze_dungeon_without_a_layout():
+    dungeon = DungeonInstance(grid_size=10)
+
+    analyze_dungeon(dungeon)
+
+    assert dungeon.distance_to_exit(0, 0) is None
+    assert dungeon.exit_route_positions() == []
@@ -0,0 +1,65 @@
+import time
+
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.models.dungeon import DungeonInstance
+from app.models.player import Player
+from app.services.dungeon_generator import generate_layout_codes
+from app.services.floor_pool import FloorPool
+
+
+def test_seeded_floors_are_shared():
+    pool = FloorPool(seed_cache_size=2)
+
+    first = pool.take(10, seed=7)
+
+    assert first.layout == generate_layout_codes(10, 7).tobytes()
+    assert pool.take(10, seed=7) is first
+
+
+def test_seeded_cache_evicts_least_recently_used():
+    pool = FloorPool(seed_cache_size=2)
+    first = pool.take(10, seed=1)
+    pool.take(10, seed=2)
+    pool.take(10, seed=1)
+    pool.take(10, seed=3)
+
+    assert pool.take(10, seed=1) is first
+    assert pool.take(10, seed=2) is not None
+    assert (2, (10, 1, 1)) in pool._seeded and (3, (10, 1, 1)) not in pool._seeded
+
+
+def test_background_refill_fills_pool():
+    pool = FloorPool(pool_size=4, refill_interval=0.05)
+    try:
+        assert len(pool.take(12).layout) == 144  # cold miss, generated inline
+
+        deadline = time.monotonic() + 5
+        while pool.pooled(12) < 4 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert pool.pooled(12) == 4
+
+        pool.take(12)
+        assert pool.pooled(12) == 3
+    finally:
+        pool.stop()
+
+
+def test_restart_reuses_dungeon_row(client: TestClient, test_db: Session):
+    """Starting again resets the same row and honours the seed"""
+    player = Player(username="delver")
+    test_db.add(player)
+    test_db.commit()
+    player_id = player.id
+
+    client.post(f"/api/game/dungeon/{player_id}/start")
+    first_id = test_db.query(DungeonInstance).filter_by(player_id=player_id).one().id
+    client.post(f"/api/game/dungeon/{player_id}/move", json={"x": 1, "y": 0})
+    client.post(f"/api/game/dungeon/{player_id}/start?seed=5")
+
+    test_db.expire_all()
+    dungeon = test_db.query(DungeonInstance).filter_by(player_id=player_id).one()
+    assert dungeon.id == first_id
+    assert dungeon.position == (0, 0) and dungeon.revision == 0
+    assert dungeon.layout == generate_layout_codes(10, 5).tobytes()
@@ -0,0 +1,63 @@
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.models.player import Player
+
+
+def _player(test_db: Session, gold: float, seconds_ago: float = 0) -> Player:
+    player = Player(username="saver", gold=gold)
+    player.last_gold_update = datetime.now(UTC) - timedelta(seconds=seconds_ago)
+    test_db.add(player)
+    test_db.commit()
+    return player
+
+
+def test_gold_accrues_on_read(test_db: Session):
+    player = _player(test_db, gold=10, seconds_ago=60)
+
+    assert player.gold == pytest.approx(20, abs=0.5)
+    assert player.base_gold == 10
+
+
+def test_polling_player_writes_nothing(client, test_db: Session):
+    player_id = _player(test_db, gold=10, seconds_ago=60).id
+    statements = []
+
+    @event.listens_for(Engine, "before_cursor_execute")
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    try:
+        for _ in range(3):
+            response = client.get(f"/api/game/player/{player_id}")
+            assert response.status_code == 200
+            assert response.json()["gold"] == pytest.approx(20, abs=0.5)
+    finally:
+        event.remove(Engine, "before_cursor_execute", record)
+
+    assert statements
+    assert not [s for s in statements if not s.lstrip().upper().startswith("SELECT")]
+
+
+def test_spend_uses_accrued_gold(test_db: Session):
+    player = _player(test_db, gold=0, seconds_ago=60)
+
+    assert player.spend_gold(8, test_db)
+    test_db.commit()
+    test_db.expire_all()
+
+    assert player.gold == pytest.approx(2, abs=0.5)
+
+
+def test_spend_refuses_to_go_negative(test_db: Session):
+    player = _player(test_db, gold=5)
+
+    assert not player.spend_gold(50, test_db)
+    test_db.expire_all()
+
+    assert player.base_gold == 5
+
@@ -0,0 +1,276 @@
+import json
+
+import pytest
+from sqlalchemy import event, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.models.battler_card import BattlerCard, Rarity
+from app.models.deck import Deck, get_deck_cards, set_deck_cards
+from app.models.dungeon import DungeonInstance
+from app.models.player import Player, add_player_cards, player_cards
+from app.services.floor_analysis import analyze_dungeon
+
+
+def _setup(test_db: Session, cards: int = 20):
+    card_rows = [
+        BattlerCard(name=f"Card {i}", power_level=i, rarity=Rarity.COMMON)
+        for i in range(cards)
+    ]
+    player = Player(username="saver", gold=10)
+    test_db.add_all(card_rows + [player])
+    test_db.flush()
+    add_player_cards(test_db, player.id, {card.id: 2 for card in card_rows})
+    for name in ("Main", "Side"):
+        deck = Deck(name=name, player_id=player.id)
+        test_db.add(deck)
+        test_db.flush()
+        set_deck_cards(test_db, deck.id, {card.id: 1 for card in card_rows[:13]})
+    test_db.commit()
+    return player.id, [card.id for card in card_rows]
+
+
+def _collection(test_db: Session, player_id: int) -> dict:
+    test_db.expire_all()
+    return dict(
+        test_db.execute(
+            select(player_cards.c.card_id, player_cards.c.quantity).where(
+                player_cards.c.player_id == player_id
+            )
+        ).all()
+    )
+
+
+def _decks(test_db: Session, player_id: int) -> dict:
+    decks = test_db.scalars(select(Deck).where(Deck.player_id == player_id)).all()
+    contents = get_deck_cards(test_db, [deck.id for deck in decks])
+    return {deck.name: contents.get(deck.id, {}) for deck in decks}
+
+
+def test_ndjson_export_imports_as_new_player(client, test_db: Session):
+    player_id, _ = _setup(test_db)
+    exported = client.get(f"/api/game/state/{player_id}/stream").text
+    records = [json.loads(line) for line in exported.splitlines()]
+    records[0]["username"] = "restored"
+    body = "".join(json.dumps(record) + "\n" for record in records)
+
+    response = client.post(
+        "/api/game/state/import",
+        content=body,
+        headers={"content-type": "application/x-ndjson"},
+    )
+
+    assert response.status_code == 200
+    summary = response.json()
+    assert summary["collection"] == {"upserted": 20, "removed": 0}
+    assert summary["decks"]["created"] == 2
+    restored = summary["player_id"]
+    assert restored != player_id
+    assert _collection(test_db, restored) == _collection(test_db, player_id)
+    assert _decks(test_db, restored) == _decks(test_db, player_id)
+
+
+def test_save_writes_only_the_diff(client, test_db: Session):
+    player_id, card_ids = _setup(test_db)
+    state = client.get(f"/api/game/state/{player_id}").json()
+    state["collection"] = [
+        {"id": card_id, "quantity": 5 if card_id == card_ids[0] else 2}
+        for card_id in card_ids[:-1]
+    ]
+    main = next(deck for deck in state["decks"] if deck["name"] == "Main")
+    main["name"] = "Renamed"
+    main["cards"] = main["cards"][1:] + [{"id": card_ids[15], "quantity": 1}]
+    starter = {"id": 0, "name": "New", "card_count": 0, "cards": [], "is_starter": True}
+    state["decks"] = [main, starter]
+    state["player"]["gold"] = 75
+
+    response = client.put(f"/api/game/state/{player_id}", json=state)
+
+    assert response.status_code == 200
+    collection = _collection(test_db, player_id)
+    assert len(collection) == 19 and collection[card_ids[0]] == 5
+    decks = _decks(test_db, player_id)
+    assert set(decks) == {"Renamed", "New"}
+    assert card_ids[0] not in decks["Renamed"] and card_ids[15] in decks["Renamed"]
+    assert decks["New"] == {}
+    assert test_db.scalar(select(Deck.is_starter).where(Deck.name == "New"))
+    assert test_db.get(Player, player_id).base_gold == 75
+
+
+def test_import_rejects_unknown_cards(client, test_db: Session):
+    player_id, _ = _setup(test_db)
+    state = client.get(f"/api/game/state/{player_id}").json()
+    state["collection"].append({"id": 9999, "quantity": 1})
+
+    response = client.put(f"/api/game/state/{player_id}", json=state)
+
+    assert response.status_code == 400
+    assert "9999" in response.json()["detail"]
+    assert _collection(test_db, player_id)[state["collection"][0]["id"]] == 2
+
+
+def test_import_rejects_decks_outside_size_limits(client, test_db: Session):
+    player_id, card_ids = _setup(test_db)
+    state = client.get(f"/api/game/state/{player_id}").json()
+    assert all(deck["is_starter"] is False for deck in state["decks"])
+    state["decks"][0]["cards"] = [{"id": card_ids[0], "quantity": 1}]
+    state["decks"][1]["cards"] = [{"id": card_ids[0], "quantity": 105}]
+
+    for deck in state["decks"]:
+        response = client.put(
+            f"/api/game/state/{player_id}", json={**state, "decks": [deck]}
+        )
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Decks must hold 13 to 104 cards"
+    assert set(_decks(test_db, player_id)) == {"Main", "Side"}
+
+    # Starter decks are exempt, as they are everywhere else
+    state["decks"][0]["is_starter"] = True
+    state["decks"] = state["decks"][:1]
+    assert client.put(f"/api/game/state/{player_id}", json=state).is_success
+
+
+def test_import_rejects_invalid_records(client, test_db: Session):
+    response = client.post(
+        "/api/game/state/import",
+        content='{"type": "player", "username": "x"}\n{"type": "spell"}\n',
+        headers={"content-type": "application/x-ndjson"},
+    )
+    assert response.status_code == 400
+    assert "line 2" in response.json()["detail"]
+
+    response = client.post("/api/game/state/import", json={"player": {}})
+    assert response.status_code == 422
+
+
+LAYOUT = [
+    ["safe", "monster", "empty", "trap"],
+    ["empty", "treasure", "empty", "monster"],
+    ["shrine", "empty", "miniboss", "empty"],
+    ["empty", "merchant", "empty", "exit"],
+]
+
+
+def _dungeon_state(dungeon: DungeonInstance) -> tuple:
+    return (
+        dungeon.grid_size,
+        dungeon.layout,
+        dungeon.current_floor,
+        dungeon.position,
+        sorted(dungeon.visited_positions()),
+        dungeon.exit_distances,
+        dungeon.exit_route,
+    )
+
+
+def _stored_dungeon(test_db: Session, player_id: int) -> DungeonInstance:
+    test_db.expire_all()
+    return test_db.scalar(
+        select(DungeonInstance).where(DungeonInstance.player_id == player_id)
+    )
+
+
+def test_import_restores_dungeon(client, test_db: Session):
+    player_id, _ = _setup(test_db)
+    record = {
+        "type": "dungeon",
+        "floor": 3,
+        "position": {"x": 2, "y": 1},
+        "visible_cells": [{"x": 1, "y": 1, "is_visited": True}],
+    }
+
+    def send(record):
+        body = json.dumps({"type": "player", "username": "saver"}) + "\n"
+        return client.post(
+            "/api/game/state/import",
+            content=body + json.dumps(record),
+            headers={"content-type": "application/x-ndjson"},
+        )
+
+    # Without a layout the floor can't be reproduced, so it is skipped
+    response = send(record)
+    assert response.status_code == 200
+    assert response.json()["dungeon"] is False
+    assert _stored_dungeon(test_db, player_id) is None
+
+    response = send({**record, "layout": LAYOUT})
+    assert response.status_code == 200
+    dungeon = _stored_dungeon(test_db, player_id)
+    assert dungeon.current_floor == 3 and dungeon.position == (2, 1)
+    assert dungeon.grid_size == 4 and dungeon.layout_rows() == LAYOUT
+    assert sorted(dungeon.visited_positions()) == [(1, 1), (2, 1)]
+    assert dungeon.exit_route_positions()[-1] == (3, 3)
+
+    response = send({**record, "layout": LAYOUT[:3]})
+    assert response.status_code == 400
+    response = send({**record, "layout": [["lava"]]})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("export", ["stream", "document"])
+def test_dungeon_round_trips_through_export(client, test_db: Session, export):
+    player_id, _ = _setup(test_db)
+    dungeon = DungeonInstance(player_id=player_id, current_floor=4, grid_size=4)
+    dungeon.set_layout(LAYOUT)
+    analyze_dungeon(dungeon)
+    dungeon.start_at(0, 0)
+    for x, y in [(1, 0), (1, 1), (2, 1)]:
+        dungeon.move_to(x, y)
+    test_db.add(dungeon)
+    test_db.commit()
+    before = _dungeon_state(dungeon)
+
+    if export == "stream":
+        exported = client.get(f"/api/game/state/{player_id}/stream").text
+        records = [json.loads(line) for line in exported.splitlines()]
+        records[0]["username"] = "restored"
+        response = client.post(
+            "/api/game/state/import",
+            content="".join(json.dumps(record) + "\n" for record in records),
+            headers={"content-type": "application/x-ndjson"},
+        )
+    else:
+        state = client.get(f"/api/game/state/{player_id}").json()
+        state["player"]["username"] = "restored"
+        response = client.post("/api/game/state/import", json=state)
+
+    assert response.status_code == 200
+    restored = response.json()["player_id"]
+    assert _dungeon_state(_stored_dungeon(test_db, restored)) == before
+
+
+def test_import_statements_do_not_grow_with_decks(client, test_db: Session):
+    player_id, card_ids = _setup(test_db)
+    state = client.get(f"/api/game/state/{player_id}").json()
+    statements = []
+
+    def count(conn, cursor, statement, *args):
+        # SQLite can't keep a batched RETURNING in row order, so new decks
+        # are inserted one by one there (PostgreSQL batches them)
+        if conn.dialect.name == "sqlite" and statement.startswith("INSERT INTO decks"):
+            return
+        statements.append(statement)
+
+    def save(decks: int) -> int:
+        state["decks"] = [
+            {
+                "id": 0,
+                "name": f"Deck {decks}-{i}",
+                "card_count": 13,
+                "cards": [
+                    {"id": card_ids[(i + j) % 20], "quantity": 1} for j in range(13)
+                ],
+            }
+            for i in range(decks)
+        ]
+        statements.clear()
+        event.listen(Engine, "before_cursor_execute", count)
+        try:
+            assert client.put(f"/api/game/state/{player_id}", json=state).is_success
+        finally:
+            event.remove(Engine, "before_cursor_execute", count)
+        return len(statements)
+
+    assert save(2) == save(40)
+    # New decks that reuse removed decks' IDs still get all their cards
+    assert [len(cards) for cards in _decks(test_db, player_id).values()] == [13] * 40
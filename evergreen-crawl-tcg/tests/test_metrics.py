@@ -0,0 +1,88 @@
+import logging
+
+from fastapi import APIRouter, Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.metrics import InstrumentedRoute, MetricsMiddleware, MetricsRegistry
+from app.models.database import get_db
+from app.models.player import Player
+
+
+def _player(test_db: Session) -> int:
+    player = Player(username="measured", gold=10)
+    test_db.add(player)
+    test_db.commit()
+    return player.id
+
+
+def test_response_carries_query_count_and_timings(client, test_db: Session):
+    player_id = _player(test_db)
+
+    response = client.get(f"/api/game/player/{player_id}")
+
+    assert response.status_code == 200
+    assert int(response.headers["x-db-queries"]) >= 2
+    assert "db;dur=" in response.headers["server-timing"]
+    assert "serialize;dur=" in response.headers["server-timing"]
+
+
+def test_metrics_endpoint_reports_per_route(client, test_db: Session):
+    player_id = _player(test_db)
+    client.get(f"/api/game/player/{player_id}")
+
+    body = client.get("/metrics").text
+
+    route = 'method="GET",route="/api/game/player/{player_id}"'
+    assert f'http_requests_total{{{route},status="200"}}' in body
+    assert f"http_request_db_queries_count{{{route}}}" in body
+    assert f'http_request_duration_seconds_bucket{{{route},le="+Inf"}}' in body
+    assert 'route="/metrics"' not in body
+
+
+def _app(registry: MetricsRegistry, slow_request_ms: float = 0.0) -> FastAPI:
+    router = APIRouter(route_class=InstrumentedRoute)
+
+    @router.get("/items/{item_id}")
+    async def read_item(item_id: int, db: AsyncSession = Depends(get_db)):
+        await db.execute(text("SELECT 1"))
+        await db.execute(text("SELECT 2"))
+        return {"id": item_id}
+
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    app.add_middleware(
+        MetricsMiddleware, registry=registry, slow_request_ms=slow_request_ms
+    )
+    return app
+
+
+def test_queries_are_counted_per_route_template(client):
+    registry = MetricsRegistry()
+    app = _app(registry)
+    app.dependency_overrides = client.app.dependency_overrides
+
+    with TestClient(app) as test_client:
+        for item_id in range(3):
+            response = test_client.get(f"/api/items/{item_id}")
+            assert response.headers["x-db-queries"] == "2"
+        test_client.get("/nowhere")
+
+    body = registry.render()
+    route = 'method="GET",route="/api/items/{item_id}"'
+    assert f"http_request_db_queries_sum{{{route}}} 6" in body
+    assert f"http_request_db_queries_count{{{route}}} 3" in body
+    assert 'route="<unmatched>",status="404"' in body
+
+
+def test_slow_requests_are_logged_with_statements(client, caplog):
+    app = _app(MetricsRegistry(), slow_request_ms=0.001)
+    app.dependency_overrides = client.app.dependency_overrides
+
+    with caplog.at_level(logging.WARNING, logger="app.metrics"):
+        TestClient(app).get("/api/items/1")
+
+    assert "Slow request GET /api/items/1" in caplog.text
+    assert "SELECT 1" in caplog.text and "SELECT 2" in caplog.text
@@ -0,0 +1,85 @@
+import random
+from datetime import UTC, datetime
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.models.battler_card import BattlerCard, Rarity
+from app.models.database import Base
+from app.models.player import Player, player_cards
+from app.services.pack_service import open_card_packs
+
+PACK_PRICE = 150
+
+
+def _seed(db: Session, gold: float) -> Player:
+    db.add_all(
+        BattlerCard(name=f"{rarity.value} {i}", power_level=i, rarity=rarity)
+        for rarity in Rarity
+        for i in range(3)
+    )
+    player = Player(username="opener", gold=gold, last_gold_update=datetime.now(UTC))
+    db.add(player)
+    db.commit()
+    return player
+
+
+def _quantities(db: Session, player_id: int) -> dict:
+    rows = db.execute(
+        select(player_cards.c.card_id, player_cards.c.quantity).where(
+            player_cards.c.player_id == player_id
+        )
+    )
+    return dict(rows.all())
+
+
+def test_open_multiple_packs(test_db: Session):
+    """Opening N packs charges once and upserts every rolled card"""
+    player = _seed(test_db, gold=PACK_PRICE * 3)
+
+    cards = open_card_packs(test_db, player, PACK_PRICE, packs=3, rng=random.Random(7))
+    test_db.commit()
+
+    assert len(cards) == 15
+    assert player.gold < PACK_PRICE
+    assert sum(_quantities(test_db, player.id).values()) == 15
+
+
+def test_open_pack_increments_existing_quantities(test_db: Session):
+    """A second pack adds to the quantities from the first"""
+    player = _seed(test_db, gold=PACK_PRICE * 2)
+
+    open_card_packs(test_db, player, PACK_PRICE, rng=random.Random(1))
+    open_card_packs(test_db, player, PACK_PRICE, rng=random.Random(1))
+    test_db.commit()
+
+    quantities = _quantities(test_db, player.id)
+    assert sum(quantities.values()) == 10
+    assert all(quantity % 2 == 0 for quantity in quantities.values())
+
+
+def test_concurrent_purchases_cannot_overspend(tmp_path):
+    """Two sessions with a stale balance only get one pack between them"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'packs.db'}")
+    Base.metadata.create_all(bind=engine)
+    make_session = sessionmaker(bind=engine)
+
+    with make_session() as db:
+        player_id = _seed(db, gold=PACK_PRICE).id
+
+    first, second = make_session(), make_session()
+    try:
+        first_player = first.get(Player, player_id)
+        second_player = second.get(Player, player_id)
+
+        assert open_card_packs(first, first_player, PACK_PRICE) is not None
+        first.commit()
+        assert open_card_packs(second, second_player, PACK_PRICE) is None
+        second.commit()
+
+        assert sum(_quantities(second, player_id).values()) == 5
+        assert second.get(Player, player_id).gold < PACK_PRICE
+    finally:
+        first.close()
+        second.close()
+        engine.dispose()
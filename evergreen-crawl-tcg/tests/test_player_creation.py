@@ -1,11 +1,12 @@
+from datetime import UTC, datetime
+
 import pytest
-from sqlalchemy.orm import Session
 from fastapi.testclient import TestClient
-from datetime import datetime, UTC
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 
-from app.main import app, init_required_data
+from app.main import init_required_data
 from app.models.player import Player
-from app.models.battler_card import BattlerCard, Rarity
 from app.services.game_service import create_starter_deck
 
 
@@ -17,7 +18,6 @@ def test_create_player_with_empty_collection(test_db: Session):
     player = Player(
         username="test_user",
         gold=100,
-        card_collection=[],
         last_gold_update=datetime.now(UTC),
         created_at=datetime.now(UTC),
     )
@@ -27,11 +27,14 @@ def test_create_player_with_empty_collection(test_db: Session):
 
     assert player.id is not None
     assert player.username == "test_user"
-    assert isinstance(player.card_collection, list)
-    assert len(player.card_collection) == 0
+    assert isinstance(player.cards_list, list)
+    assert len(player.cards_list) == 0
 
 
-def test_create_player_with_starter_deck(test_db: Session):
+@pytest.mark.asyncio
+async def test_create_player_with_starter_deck(
+    test_db: Session, async_db: AsyncSession
+):
     """Test creating a player and adding starter deck cards"""
     # Initialize required data first
     init_required_data(test_db)
@@ -40,24 +43,23 @@ def test_create_player_with_starter_deck(test_db: Session):
     player = Player(
         username="test_user_2",
         gold=100,
-        card_collection=[],
         last_gold_update=datetime.now(UTC),
         created_at=datetime.now(UTC),
     )
-    test_db.add(player)
-    test_db.flush()
+    async_db.add(player)
+    await async_db.flush()
+    player_id = player.id
 
     # Create starter deck
-    starter_deck = create_starter_deck(test_db, player.id)
-    test_db.commit()
-    test_db.refresh(player)
+    await create_starter_deck(async_db, player_id)
+    collection = test_db.get(Player, player_id).cards_list
 
-    assert player.id is not None
-    assert isinstance(player.card_collection, list)
-    assert len(player.card_collection) > 0
+    assert player_id is not None
+    assert isinstance(collection, list)
+    assert len(collection) > 0
 
     # Verify card collection structure
-    for card in player.card_collection:
+    for card in collection:
         assert isinstance(card, dict)
         assert "id" in card
         assert "name" in card
@@ -73,9 +75,10 @@ def test_api_create_player(client: TestClient, test_db: Session):
 
     response = client.post("/api/game/start", json={"username": "test_api_user"})
 
-    assert (
-        response.status_code == 200
-    ), f"Response status code was {response.status_code}, expected 200. Response body: {response.text}"
+    assert response.status_code == 200, (
+        f"Response status code was {response.status_code}, expected 200. "
+        f"Response body: {response.text}"
+    )
     data = response.json()
 
     assert "id" in data, f"Expected 'id' in response data, got: {data}"
@@ -83,16 +86,16 @@ def test_api_create_player(client: TestClient, test_db: Session):
         data["username"] == "test_api_user"
     ), f"Expected username 'test_api_user', got: {data['username']}"
     assert isinstance(
-        data["card_collection"], list
-    ), f"Expected card_collection to be a list, got: {type(data['card_collection'])}"
+        data["cards"], list
+    ), f"Expected cards to be a list, got: {type(data['cards'])}"
 
     # Check card collection
     assert (
-        len(data["card_collection"]) > 0
-    ), f"Expected non-empty card collection, got: {data['card_collection']}"
+        len(data["cards"]) > 0
+    ), f"Expected non-empty card collection, got: {data['cards']}"
 
     # Verify card collection structure
-    for i, card in enumerate(data["card_collection"]):
+    for i, card in enumerate(data["cards"]):
         assert isinstance(
             card, dict
         ), f"Card at index {i} should be a dict, got: {type(card)}"
@@ -0,0 +1,82 @@
+from sqlalchemy import event, func, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.models.deck import Deck
+from app.models.player import Player, get_player_collection
+from app.services.card_catalog import card_catalog
+from app.services.game_service import STARTER_DECK_CARDS
+from app.services.provisioning import provision_players
+
+
+def test_provisions_players_with_decks_and_collections(test_db: Session):
+    result = provision_players(test_db, [f"user{i}" for i in range(50)])
+    test_db.commit()
+
+    assert len(result.created) == 50
+    assert result.skipped == []
+    player_id = result.created[0]["id"]
+    collection = get_player_collection(test_db, player_id)
+    assert [card["name"] for card in collection] == [
+        data["name"] for data in STARTER_DECK_CARDS
+    ]
+    deck = test_db.scalar(select(Deck).where(Deck.player_id == player_id))
+    assert deck.is_starter and deck.card_count == len(STARTER_DECK_CARDS)
+    assert test_db.scalar(select(func.count()).select_from(Deck)) == 50
+
+
+def test_statement_count_does_not_grow_with_players(test_db: Session):
+    statements = []
+
+    @event.listens_for(Engine, "before_cursor_execute")
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    try:
+        provision_players(test_db, ["first"])
+        small = len(statements)
+        statements.clear()
+        provision_players(test_db, [f"user{i}" for i in range(500)])
+    finally:
+        event.remove(Engine, "before_cursor_execute", record)
+
+    # Starter cards are created on the first call only
+    assert len(statements) < small
+
+
+def test_existing_and_duplicate_usernames_are_skipped(test_db: Session):
+    test_db.add(Player(username="taken"))
+    test_db.commit()
+
+    result = provision_players(test_db, ["taken", "new", "new"])
+    test_db.commit()
+
+    assert [player["username"] for player in result.created] == ["new"]
+    assert result.skipped == ["taken"]
+    assert test_db.scalar(select(func.count()).select_from(Player)) == 2
+
+
+def test_bulk_endpoint(client):
+    response = client.post(
+        "/api/game/players/bulk", json={"usernames": ["a", "b"], "gold": 500}
+    )
+    assert response.status_code == 200
+    created = response.json()["created"]
+    assert [player["username"] for player in created] == ["a", "b"]
+
+    player = client.get(f"/api/game/player/{created[0]['id']}").json()
+    assert player["gold"] >= 500
+    assert len(player["cards"]) == len(STARTER_DECK_CARDS)
+
+
+def test_provisioning_refreshes_a_warm_catalog(client, test_db: Session):
+    assert card_catalog.snapshot(test_db).cards == ()
+
+    result = provision_players(test_db, ["a", "b"])
+    test_db.commit()
+    player_id = result.created[0]["id"]
+
+    player = client.get(f"/api/game/player/{player_id}").json()
+    assert [card["name"] for card in player["cards"]] == [
+        data["name"] for data in STARTER_DECK_CARDS
+    ]
@@ -0,0 +1,116 @@
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.models.battler_card import BattlerCard, Rarity
+from app.models.card_effect import CardEffect, EffectType
+from app.models.tag import Tag
+from app.services.card_catalog import card_catalog
+from app.services.combat_engine import Monster, compile_effect_table, resolve_fight
+from app.services.rule_compiler import (
+    ALWAYS,
+    NEVER,
+    Condition,
+    parse_condition,
+    rule_cache,
+)
+
+
+def test_parse_condition():
+    assert parse_condition(None) == ALWAYS
+    assert parse_condition("When played with another Water battler.") == Condition(
+        tag="water", count=1
+    )
+    assert parse_condition("with 2 other Fire cards") == Condition(tag="fire", count=2)
+    assert parse_condition("Shadow") == Condition(tag="shadow", count=1)
+    assert parse_condition("if going first and with three Earth battlers") == (
+        Condition(tag="earth", count=3, initiative=True)
+    )
+    assert parse_condition("when the moon is full tonight") == NEVER
+
+
+def _seed(test_db: Session):
+    water, fire = Tag(name="Water"), Tag(name="Fire")
+    caller = BattlerCard(name="Tide Caller", power_level=3, rarity=Rarity.RARE)
+    caller.tags.append(water)
+    caller.effects.append(
+        CardEffect(
+            effect_type=EffectType.CONDITIONAL,
+            speed_value=2,
+            trigger_condition="When played with 2 other Water battlers",
+        )
+    )
+    surfer = BattlerCard(name="Surfer", power_level=1, rarity=Rarity.COMMON)
+    surfer.tags.append(water)
+    scout = BattlerCard(name="Scout", power_level=1, rarity=Rarity.COMMON)
+    scout.tags.append(fire)
+    scout.effects.append(
+        CardEffect(
+            effect_type=EffectType.SPEED,
+            speed_value=4,
+            trigger_condition="going first",
+        )
+    )
+    test_db.add_all([caller, surfer, scout])
+    test_db.commit()
+    return caller.id, surfer.id, scout.id
+
+
+def test_active_effects_for_a_full_deck_run_no_sql(test_db: Session):
+    caller, surfer, scout = _seed(test_db)
+    catalog = card_catalog.snapshot(test_db)
+    deck = [caller] * 40 + [surfer] * 40 + [scout] * 24
+    statements = []
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+
+    event.listen(Engine, "before_cursor_execute", listener)
+    try:
+        first = rule_cache.active_effects(catalog, deck, has_initiative=False)
+        again = rule_cache.active_effects(catalog, deck, has_initiative=True)
+    finally:
+        event.remove(Engine, "before_cursor_execute", listener)
+
+    assert statements == []
+    assert {card_id for card_id, _ in first} == {caller}
+    assert len(again) == 64 and again[0][0] == scout
+    card = catalog.get(caller)
+    assert rule_cache.rules(card) is rule_cache.rules(card)
+
+
+def test_conditions_gate_combat_effects(test_db: Session):
+    caller, surfer, scout = _seed(test_db)
+    table = compile_effect_table(card_catalog.snapshot(test_db))
+    slime = Monster("Slime", 1)
+
+    two_others = [caller, surfer, caller, scout, scout]
+    one_other = [caller, surfer, scout, scout, scout]
+
+    first = resolve_fight(table, two_others, slime, True)
+    second = resolve_fight(table, one_other, slime, False)
+
+    assert [entry["effect"] for entry in first.log] == [
+        "Speed",
+        "Speed",
+        "Conditional",
+        "Conditional",
+    ]
+    assert second.log == []
+
+
+def test_rules_follow_card_changes(test_db: Session):
+    caller, surfer, _ = _seed(test_db)
+    before = card_catalog.snapshot(test_db)
+    compiled = rule_cache.rules(before.get(caller))
+    unchanged = rule_cache.rules(before.get(surfer))
+
+    effect = test_db.query(CardEffect).filter_by(card_id=caller).one()
+    effect.trigger_condition = "with another Fire battler"
+    test_db.commit()
+
+    after = card_catalog.snapshot(test_db)
+    assert after is not before
+    recompiled = rule_cache.rules(after.get(caller))
+    assert recompiled is not compiled
+    assert recompiled.effects[0].condition == Condition(tag="fire", count=1)
+    # Cards that didn't change keep their compiled effects across reloads
+    assert rule_cache.rules(after.get(surfer)).effects is unchanged.effects
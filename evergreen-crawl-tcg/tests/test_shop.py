@@ -0,0 +1,168 @@
+import asyncio
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+
+from app.models.battler_card import BattlerCard, Rarity
+from app.models.player import Player
+from app.models.shop import Shop
+from app.services.shop_service import ShopService, shop_service
+
+
+def _seed_shop(test_db: Session, last_refresh: datetime = None, **prices) -> int:
+    """Seed cards and a shop, returning the featured card's ID"""
+    cards = [
+        BattlerCard(name=f"Card {i}", power_level=i, rarity=Rarity.COMMON)
+        for i in range(5)
+    ]
+    test_db.add_all(cards)
+    test_db.flush()
+    shop = Shop(
+        featured_card_id=cards[0].id,
+        last_refresh=last_refresh or datetime.now(UTC),
+        **prices,
+    )
+    test_db.add(shop)
+    test_db.commit()
+    return cards[0].id
+
+
+def _sessions(async_db: AsyncSession) -> async_sessionmaker:
+    """Separate sessions on the test database, one per simulated request"""
+    return async_sessionmaker(async_db.bind, expire_on_commit=False)
+
+
+class _Statements(list):
+    def __call__(self, *args):
+        self.append(args[2])
+
+    def __enter__(self):
+        event.listen(Engine, "before_cursor_execute", self)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(Engine, "before_cursor_execute", self)
+
+
+def test_warm_shop_is_served_from_memory(client, test_db: Session):
+    featured_id = _seed_shop(test_db)
+    first = client.get("/api/game/shop/1")
+    assert first.status_code == 200
+    assert first.json()["featured_card"]["id"] == featured_id
+    assert first.headers["etag"]
+    assert first.headers["cache-control"].startswith("public, max-age=")
+
+    with _Statements() as statements:
+        again = client.get("/api/game/shop/1")
+
+    assert again.json() == first.json()
+    assert statements == []
+
+
+def test_matching_etag_gets_304(client, test_db: Session):
+    _seed_shop(test_db)
+    etag = client.get("/api/game/shop/1").headers["etag"]
+
+    response = client.get("/api/game/shop/1", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+    response = client.get("/api/game/shop/1", headers={"If-None-Match": '"stale"'})
+    assert response.status_code == 200
+
+
+def test_expired_offer_rotates(client, test_db: Session):
+    _seed_shop(test_db, datetime.now(UTC) - timedelta(days=2))
+
+    response = client.get("/api/game/shop/1")
+
+    shop = test_db.query(Shop).one()
+    assert not shop.should_refresh()
+    assert response.json()["featured_card"]["id"] == shop.featured_card_id
+
+
+@pytest.mark.asyncio
+async def test_concurrent_cold_requests_refresh_once(
+    test_db: Session, async_db: AsyncSession
+):
+    _seed_shop(test_db, datetime.now(UTC) - timedelta(days=2))
+
+    async def fetch():
+        async with _sessions(async_db)() as db:
+            return await shop_service.current(db)
+
+    with _Statements() as statements:
+        offers = await asyncio.gather(*(fetch() for _ in range(10)))
+
+    assert len({offer.etag for offer in offers}) == 1
+    assert sum(statement.startswith("UPDATE shops") for statement in statements) == 1
+
+
+@pytest.mark.asyncio
+async def test_workers_sharing_a_database_rotate_once(
+    test_db: Session, async_db: AsyncSession
+):
+    _seed_shop(test_db, datetime.now(UTC) - timedelta(days=2))
+    workers = [ShopService(), ShopService()]
+
+    async def fetch(worker):
+        async with _sessions(async_db)() as db:
+            return await worker.current(db)
+
+    offers = [await fetch(worker) for worker in workers]
+
+    assert offers[0].etag == offers[1].etag
+
+
+@pytest.mark.asyncio
+async def test_scheduler_loads_offer(
+    test_db: Session, async_db: AsyncSession
+):
+    _seed_shop(test_db)
+    service = ShopService()
+
+    service.start(_sessions(async_db))
+    for _ in range(50):
+        if service._offer is not None:
+            break
+        await asyncio.sleep(0.01)
+    await service.stop()
+
+    assert service._offer is not None
+
+
+def test_featured_purchase_uses_offer_price(client, test_db: Session):
+    featured_id = _seed_shop(test_db)
+    player = Player(username="buyer", gold=500)
+    test_db.add(player)
+    test_db.commit()
+
+    response = client.post(
+        f"/api/game/shop/{player.id}/buy", json={"item_type": "featured"}
+    )
+
+    assert response.status_code == 200
+    assert response.json()["cards_received"][0]["id"] == featured_id
+
+
+@pytest.mark.parametrize("item_type, spent", [("random", 35), ("pack", 240)])
+def test_purchases_charge_offer_prices(client, test_db: Session, item_type, spent):
+    _seed_shop(test_db, random_card_price=35, pack_price=120)
+    player = Player(username="buyer", gold=500, last_gold_update=datetime.now(UTC))
+    test_db.add(player)
+    test_db.commit()
+    player_id = player.id
+
+    response = client.post(
+        f"/api/game/shop/{player_id}/buy",
+        json={"item_type": item_type, "quantity": 2},
+    )
+
+    assert response.status_code == 200
+    # Gold keeps accruing while the request runs, so allow a little drift
+    assert response.json()["gold_remaining"] == pytest.approx(500 - spent, abs=1)
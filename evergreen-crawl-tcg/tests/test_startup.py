@@ -0,0 +1,41 @@
+from sqlalchemy.orm import Session
+
+from app.main import STARTER_CARDS, init_required_data
+from app.models.battler_card import BattlerCard, Rarity
+from app.models.player import Player
+from app.models.shop import Shop
+from app.services.card_catalog import card_catalog
+
+
+def test_seeding_is_idempotent(test_db: Session):
+    init_required_data(test_db)
+    init_required_data(test_db)
+
+    assert test_db.query(BattlerCard).count() == len(STARTER_CARDS)
+    assert test_db.query(Shop).count() == 1
+
+
+def test_seeding_keeps_existing_data(test_db: Session):
+    test_db.add_all(
+        [
+            BattlerCard(name="Basic Mage", power_level=9, rarity=Rarity.RARE),
+            Player(username="survivor", gold=42),
+        ]
+    )
+    test_db.commit()
+
+    init_required_data(test_db)
+    test_db.expire_all()
+
+    mage = test_db.query(BattlerCard).filter_by(name="Basic Mage").one()
+    assert mage.power_level == 9
+    assert test_db.query(Player).filter_by(username="survivor").one().base_gold == 42
+    assert test_db.query(BattlerCard).count() == len(STARTER_CARDS)
+
+
+def test_seeding_new_cards_invalidates_catalog(test_db: Session):
+    assert card_catalog.snapshot(test_db).cards == ()
+
+    init_required_data(test_db)
+
+    assert len(card_catalog.snapshot(test_db).cards) == len(STARTER_CARDS)